@@ -0,0 +1,337 @@
+import logging
+import argparse
+import csv
+import os
+import random
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import MIN_PLAYERS, MAX_PLAYERS
+from enums import Team, Role
+from roles import assign_roles
+
+logger = logging.getLogger(__name__)
+
+DIFFICULTIES = ('easy', 'normal', 'hard')
+
+# ═══════════════════════════════════════════════════════════
+# SIMPLIFIED GAME MODEL
+# ═══════════════════════════════════════════════════════════
+# Rough per-night/per-day rates; the point is comparing role mixes and evil
+# counts against each other, not predicting exact live win rates.
+WOLF_KILL_RATE = 1.0          # The pack kills every night
+FIRE_KILL_RATE = 0.6          # Douse-then-ignite averages out to fewer, burstier deaths
+KILLER_KILL_RATE = 1.0        # Serial Killer stabs every night
+VIGILANTE_SHOT_RATE = 0.35    # Vigilantes/Hunters take someone down
+PROTECT_SAVE_RATE = 0.8       # Chance a protector who guessed the victim actually saves them
+NO_LYNCH_RATE = 0.15          # Village fails to agree on a lynch
+INFORMED_LYNCH_BONUS = 0.35   # Extra pull towards evil while an investigator lives
+MAX_SIM_DAYS = 30
+
+# Columns of a composition / game-state matrix
+V, W, F, K, N, PROT, INV, VIG, JESTER = range(9)
+COLUMNS = ('villager', 'wolf', 'fire', 'killer', 'neutral', 'protector', 'investigator', 'vigilante', 'jester')
+TEAM_COLUMNS = {Team.VILLAGER: V, Team.WOLF: W, Team.FIRE: F, Team.KILLER: K, Team.NEUTRAL: N}
+
+PROTECTIVE_ROLES = {Role.DOCTOR, Role.BODYGUARD, Role.PRIEST, Role.WITCH}
+INVESTIGATIVE_ROLES = {Role.SEER, Role.ORACLE, Role.DETECTIVE, Role.APPRENTICE_SEER}
+SHOOTING_ROLES = {Role.VIGILANTE, Role.HUNTER}
+
+# Winner codes returned by simulate_games (index into OUTCOMES)
+OUTCOMES = (Team.VILLAGER, Team.WOLF, Team.FIRE, Team.KILLER, Team.NEUTRAL, None)
+UNDECIDED = len(OUTCOMES) - 1
+
+
+# ============================================================================
+# ROLE ASSIGNMENT SAMPLING
+# ============================================================================
+
+def sample_compositions(num_players: int, difficulty: str, samples: int, seed: int = 0) -> np.ndarray:
+    """
+    Run the real assign_roles `samples` times and return one composition row per run.
+
+    Each row counts players per team plus the village power roles the model
+    cares about (see COLUMNS).
+    """
+    # assign_roles draws from the module-level RNG; seed it without clobbering the caller's state
+    saved_state = random.getstate()
+    random.seed(seed)
+    try:
+        rows = np.zeros((samples, len(COLUMNS)), dtype=np.int16)
+        for i in range(samples):
+            players = {user_id: SimpleNamespace(user_id=user_id, role=None, executioner_target=None)
+                       for user_id in range(num_players)}
+            game = SimpleNamespace(players=players, settings={'difficulty': difficulty},
+                                   evil_team_type=Team.WOLF, twins_ids=[])
+            if not assign_roles(game):
+                raise ValueError(f"assign_roles failed for {num_players} players")
+
+            row = rows[i]
+            for player in players.values():
+                role = player.role
+                row[TEAM_COLUMNS[role.team]] += 1
+                if role in PROTECTIVE_ROLES:
+                    row[PROT] += 1
+                elif role in INVESTIGATIVE_ROLES:
+                    row[INV] += 1
+                elif role in SHOOTING_ROLES:
+                    row[VIG] += 1
+                elif role == Role.JESTER:
+                    row[JESTER] += 1
+    finally:
+        random.setstate(saved_state)
+    return rows
+
+
+def evil_counts(compositions: np.ndarray) -> np.ndarray:
+    return compositions[:, W] + compositions[:, F] + compositions[:, K]
+
+
+def with_evil_count(compositions: np.ndarray, evil: int) -> np.ndarray:
+    """
+    Rewrite every composition to have exactly `evil` evil players.
+
+    Extra evil players join the composition's largest evil faction and replace
+    plain villagers; surplus ones are turned back into plain villagers.
+    """
+    result = compositions.copy()
+    for _ in range(int(np.abs(evil_counts(compositions) - evil).max(initial=0))):
+        current = evil_counts(result)
+        factions = result[:, [W, F, K]]
+        largest = np.array([W, F, K])[factions.argmax(axis=1)]
+        plain = result[:, V] - result[:, PROT] - result[:, INV] - result[:, VIG]
+        rows = np.arange(len(result))
+
+        grow = (current < evil) & (plain > 0)
+        result[rows[grow], largest[grow]] += 1
+        result[grow, V] -= 1
+
+        shrink = current > evil
+        result[rows[shrink], largest[shrink]] -= 1
+        result[shrink, V] += 1
+    return result
+
+
+# ============================================================================
+# VECTORIZED GAMES
+# ============================================================================
+
+def _pick_team(state: np.ndarray, games: np.ndarray, columns: Sequence[int], rng: np.random.Generator) -> np.ndarray:
+    """For each game index, pick one of `columns` with probability proportional to its alive count (-1 if all empty)"""
+    weights = state[np.ix_(games, columns)].astype(np.float64)
+    totals = weights.sum(axis=1)
+    draws = rng.random(len(games)) * totals
+    picked = (weights.cumsum(axis=1) <= draws[:, None]).sum(axis=1)
+    picked = np.minimum(picked, len(columns) - 1)
+    return np.where(totals > 0, np.asarray(columns)[picked], -1)
+
+
+def _remove(state: np.ndarray, games: np.ndarray, teams: np.ndarray, rng: np.random.Generator):
+    """Kill one player of the given team in each game, keeping the power-role counts consistent"""
+    hit = teams >= 0
+    games, teams = games[hit], teams[hit]
+    state[games, teams] -= 1
+
+    village = games[teams == V]
+    if len(village):
+        alive = state[village, V] + 1
+        draw = rng.random(len(village)) * alive
+        prot, inv, vig = state[village, PROT], state[village, INV], state[village, VIG]
+        state[village[draw < prot], PROT] -= 1
+        state[village[(draw >= prot) & (draw < prot + inv)], INV] -= 1
+        state[village[(draw >= prot + inv) & (draw < prot + inv + vig)], VIG] -= 1
+
+    neutral = games[teams == N]
+    if len(neutral):
+        draw = rng.random(len(neutral)) * (state[neutral, N] + 1)
+        state[neutral[draw < state[neutral, JESTER]], JESTER] -= 1
+
+
+def _night_kill(state: np.ndarray, games: np.ndarray, faction: int, rate: float, rng: np.random.Generator):
+    attacking = games[(state[games, faction] > 0) & (rng.random(len(games)) < rate)]
+    if not len(attacking):
+        return
+    victims = _pick_team(state, attacking, [c for c in (V, W, F, K, N) if c != faction], rng)
+    targets = state[attacking][:, [V, W, F, K, N]].sum(axis=1) - state[attacking, faction]
+    save_chance = PROTECT_SAVE_RATE * state[attacking, PROT] / np.maximum(targets, 1)
+    saved = rng.random(len(attacking)) < save_chance
+    _remove(state, attacking[~saved], victims[~saved], rng)
+
+
+def _check_winners(state: np.ndarray, winners: np.ndarray, games: np.ndarray):
+    """Apply Game.check_win_condition's rules to the undecided games"""
+    s = state[games]
+    villagers, wolves, fire, killers, neutrals = s[:, V], s[:, W], s[:, F], s[:, K], s[:, N]
+    evil = wolves + fire + killers
+
+    outcome = np.full(len(games), UNDECIDED)
+    outcome = np.where((fire > 0) & (fire >= villagers + wolves + killers + neutrals), OUTCOMES.index(Team.FIRE), outcome)
+    outcome = np.where((wolves > 0) & (wolves >= villagers + fire + neutrals), OUTCOMES.index(Team.WOLF), outcome)
+    outcome = np.where((villagers > 0) & (evil == 0), OUTCOMES.index(Team.VILLAGER), outcome)
+    outcome = np.where((killers > 0) & (villagers == 0) & (wolves == 0) & (fire == 0), OUTCOMES.index(Team.KILLER), outcome)
+    outcome = np.where(villagers + evil + neutrals == 0, OUTCOMES.index(Team.VILLAGER), outcome)
+    winners[games] = outcome
+
+
+def simulate_games(compositions: np.ndarray, games: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Play `games` simplified games on compositions drawn (with replacement) from
+    the given rows, all at once. Returns win counts indexed like OUTCOMES.
+    """
+    state = compositions[rng.integers(0, len(compositions), games)].astype(np.int32)
+    winners = np.full(games, UNDECIDED)
+
+    for _ in range(MAX_SIM_DAYS):
+        # Night: each evil faction strikes, then the village's shooters
+        for faction, rate in ((W, WOLF_KILL_RATE), (F, FIRE_KILL_RATE), (K, KILLER_KILL_RATE)):
+            _night_kill(state, np.flatnonzero(winners == UNDECIDED), faction, rate, rng)
+        running = np.flatnonzero(winners == UNDECIDED)
+        shooting = running[(state[running, VIG] > 0) & (rng.random(len(running)) < VIGILANTE_SHOT_RATE)]
+        _remove(state, shooting, _pick_team(state, shooting, [W, F, K, N, V], rng), rng)
+        _check_winners(state, winners, np.flatnonzero(winners == UNDECIDED))
+
+        # Day: lynch, pulled towards evil by the proportion of evil alive and by investigators
+        running = np.flatnonzero(winners == UNDECIDED)
+        if not len(running):
+            break
+        running = running[rng.random(len(running)) >= NO_LYNCH_RATE]
+        s = state[running]
+        evil = s[:, W] + s[:, F] + s[:, K]
+        p_evil = evil / np.maximum(s[:, [V, W, F, K, N]].sum(axis=1), 1)
+        p_evil = np.where(s[:, INV] > 0, p_evil + (1 - p_evil) * INFORMED_LYNCH_BONUS, p_evil)
+        lynch_evil = (rng.random(len(running)) < p_evil) & (evil > 0)
+
+        jesters_before = state[running, JESTER].copy()
+        teams = np.where(lynch_evil,
+                         _pick_team(state, running, [W, F, K], rng),
+                         _pick_team(state, running, [V, N], rng))
+        _remove(state, running, teams, rng)
+        # A lynched Jester wins on the spot
+        jester_lynched = state[running, JESTER] < jesters_before
+        winners[running[jester_lynched]] = OUTCOMES.index(Team.NEUTRAL)
+
+        _check_winners(state, winners, np.flatnonzero(winners == UNDECIDED))
+        if not (winners == UNDECIDED).any():
+            break
+
+    return np.bincount(winners, minlength=len(OUTCOMES))
+
+
+# ============================================================================
+# ANALYSIS
+# ============================================================================
+
+def analyze_win_rates(player_counts: Sequence[int], difficulties: Sequence[str],
+                      samples: int, games: int, seed: int = 0) -> Tuple[List[Dict], Dict[Tuple[int, str], np.ndarray]]:
+    """
+    Win rates per team for every (player count, difficulty) cell.
+
+    Returns the CSV rows and the sampled compositions per cell (reused by
+    suggest_evil_counts).
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    compositions = {}
+    for num_players in player_counts:
+        for difficulty in difficulties:
+            cell = sample_compositions(num_players, difficulty, samples, seed=seed * 1000 + num_players)
+            compositions[(num_players, difficulty)] = cell
+            wins = simulate_games(cell, games, rng)
+            evil = evil_counts(cell)
+            for outcome, count in zip(OUTCOMES, wins):
+                rows.append({
+                    'players': num_players,
+                    'difficulty': difficulty,
+                    'team': outcome.name if outcome else 'UNDECIDED',
+                    'win_rate': round(count / games, 4),
+                    'games': games,
+                    'avg_evil': round(float(evil.mean()), 2),
+                })
+            logger.info(f"⚖️ {num_players} players / {difficulty}: village {wins[0] / games:.1%}")
+    return rows, compositions
+
+
+def suggest_evil_counts(compositions: Dict[Tuple[int, str], np.ndarray], games: int,
+                        target: float = 0.5, seed: int = 0) -> List[Dict]:
+    """
+    Replay each player count's normal-difficulty role mixes with every evil count
+    and flag the one whose village win rate is closest to `target`.
+    """
+    rng = np.random.default_rng(seed + 1)
+    rows = []
+    for (num_players, difficulty), cell in sorted(compositions.items()):
+        if difficulty != 'normal':
+            continue
+        candidates = []
+        for evil in range(1, num_players // 2 + 1):
+            wins = simulate_games(with_evil_count(cell, evil), games, rng)
+            candidates.append((evil, wins[0] / games, 1 - (wins[0] + wins[UNDECIDED]) / games))
+        best = min(candidates, key=lambda c: abs(c[1] - target))[0]
+        for evil, village_rate, evil_rate in candidates:
+            rows.append({
+                'players': num_players,
+                'evil_count': evil,
+                'village_win_rate': round(village_rate, 4),
+                'other_win_rate': round(evil_rate, 4),
+                'suggested': int(evil == best),
+            })
+    return rows
+
+
+def write_csv(path: str, rows: List[Dict]):
+    if not rows:
+        return
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Monte Carlo role-balance analysis of assign_roles")
+    parser.add_argument('--min-players', type=int, default=MIN_PLAYERS)
+    parser.add_argument('--max-players', type=int, default=MAX_PLAYERS)
+    parser.add_argument('--difficulty', choices=DIFFICULTIES, action='append',
+                        help="Difficulty to analyze (repeatable, default: all)")
+    parser.add_argument('--samples', type=int, default=20000,
+                        help="Real assign_roles runs per cell")
+    parser.add_argument('--games', type=int, default=200000,
+                        help="Simplified games per cell")
+    parser.add_argument('--target', type=float, default=0.5,
+                        help="Village win rate the suggested evil counts aim for")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out-dir', default='balance_results')
+    args = parser.parse_args(argv)
+
+    # assign_roles logs every assignment (and every duplicate) through the root logger
+    logging.getLogger().setLevel(logging.CRITICAL)
+    logger.setLevel(logging.INFO)
+
+    started = time.perf_counter()
+    player_counts = range(args.min_players, args.max_players + 1)
+    difficulties = args.difficulty or list(DIFFICULTIES)
+    win_rows, compositions = analyze_win_rates(player_counts, difficulties, args.samples, args.games, args.seed)
+
+    if 'normal' not in difficulties:
+        for num_players in player_counts:
+            compositions[(num_players, 'normal')] = sample_compositions(num_players, 'normal', args.samples, args.seed)
+    evil_rows = suggest_evil_counts(compositions, args.games, args.target, args.seed)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    write_csv(os.path.join(args.out_dir, 'win_rates.csv'), win_rows)
+    write_csv(os.path.join(args.out_dir, 'evil_counts.csv'), evil_rows)
+
+    simulated = args.games * (len(win_rows) // len(OUTCOMES) + sum(n // 2 for n in player_counts))
+    logger.info(f"✅ {simulated:,} simplified games in {time.perf_counter() - started:.1f}s, results in {args.out_dir}/")
+    for row in evil_rows:
+        if row['suggested']:
+            logger.info(f"   {row['players']:>2} players: {row['evil_count']} evil (village wins {row['village_win_rate']:.1%})")
+
+
+logger.info("Balance module loaded successfully")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+import logging
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from enums import GamePhase
+from simulator import GameSimulator, RandomPolicy, SimCallbackQuery, load_engine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = (5, 10, 20, 40)
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+# A case is a regression when its median is this much slower than the baseline
+DEFAULT_THRESHOLD = 0.20
+
+# Timing budget per case: ROUNDS rounds of at least MIN_ROUND_TIME seconds each
+ROUNDS = 5
+MIN_ROUND_TIME = 0.05
+# Cases that rebuild their game before every iteration run a fixed count instead
+FRESH_ITERATIONS = 20
+
+
+@dataclass
+class Case:
+    """
+    One timed operation on a synthetic game of `players` players.
+
+    setup() builds the state and run(state) is the timed part. With fresh=True
+    run() mutates the game, so setup() is called (untimed) before every iteration.
+    """
+    name: str
+    players: int
+    setup: Callable[[], Awaitable[Any]]
+    run: Callable[[Any], Any]
+    fresh: bool = False
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}[{self.players}]"
+
+
+# ============================================================================
+# SYNTHETIC GAMES
+# ============================================================================
+
+class Fixtures:
+    """Builds games through the simulator, so they hold real roles, menus and night actions"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._seed = 0
+
+    def simulator(self, players: int) -> GameSimulator:
+        self._seed += 1
+        return GameSimulator(self.engine, self._seed, players, RandomPolicy(act_rate=1.0))
+
+    async def night(self, players: int, acted: bool = False):
+        """A first-night game, optionally after every player tapped a random action"""
+        sim = self.simulator(players)
+        game = sim.new_game()
+        await sim.start(game)
+        if acted:
+            await sim.players_act(game)
+        return sim, game
+
+    async def voting(self, players: int):
+        """A day-one voting phase where everyone has voted for a random other player"""
+        sim, game = await self.night(players)
+        game.phase = GamePhase.VOTING
+        game.advance_phase_epoch()
+        rng = random.Random(players)
+        alive = game.get_alive_players()
+        for voter in alive:
+            target = rng.choice([p for p in alive if p is not voter])
+            game.votes[voter.user_id] = target.user_id
+            voter.has_voted = True
+        return sim, game
+
+    def discard(self, game):
+        self.engine.game.remove_game(game.group_id)
+
+
+def _game_results(game, rng: random.Random) -> List[Dict[str, Any]]:
+    """end_game's ranking payload for a finished-looking game"""
+    return [{
+        'user_id': p.user_id,
+        'username': p.username,
+        'first_name': p.first_name,
+        'won': rng.random() < 0.5,
+        'team': p.role.team.name,
+        'role': p.role.name,
+        'is_alive': rng.random() < 0.4,
+        'actions': {'lynch_evil': rng.randint(0, 2), 'survival_bonus': 1},
+    } for p in game.players.values()]
+
+
+# ============================================================================
+# CASES
+# ============================================================================
+
+def build_cases(engine, sizes: Sequence[int]) -> Tuple[List[Case], Fixtures]:
+    fixtures = Fixtures(engine)
+    handlers = engine.handlers
+    mechanics = engine.mechanics
+    # Imported after load_engine() so the ranking database lives in its temp directory
+    from roles import get_role_action_buttons, get_voting_buttons
+    from callbacks import encode_callback
+    from ranking import GameResult, ranking_manager, record_batch_game_results
+
+    cases: List[Case] = []
+    for players in sizes:
+        async def night(players=players):
+            return await fixtures.night(players)
+
+        async def acted_night(players=players):
+            return await fixtures.night(players, acted=True)
+
+        async def voting(players=players):
+            return await fixtures.voting(players)
+
+        async def vote_taps(players=players):
+            sim, game = await fixtures.voting(players)
+            game.votes.clear()
+            alive = game.get_alive_players()
+            taps = []
+            for i, voter in enumerate(alive):
+                voter.has_voted = False
+                target = alive[(i + 1) % len(alive)]
+                data = encode_callback('vote', target.user_id, game.phase_epoch)
+                taps.append(_tap(sim, voter, data))
+            return sim, game, taps
+
+        async def dispatch(state):
+            sim, game, taps = state
+            for update in taps:
+                await handlers.handle_callback_query(update, sim.context)
+
+        async def ranking_results(players=players):
+            sim, game = await fixtures.night(players)
+            rng = random.Random(players)
+            results = _game_results(game, rng)
+            fixtures.discard(game)
+            return results
+
+        def update_stats(results):
+            for data in results:
+                ranking_manager.update_player_stats(GameResult(
+                    user_id=data['user_id'], username=data['username'], first_name=data['first_name'],
+                    won=data['won'], team=data['team'], role=data['role'], is_alive=data['is_alive'],
+                    actions=data['actions'], penalties={}
+                ))
+
+        batch_ids = iter(range(sys.maxsize))
+
+        def record_batch(results):
+            return record_batch_game_results(f"bench-{next(batch_ids)}", len(results), results)
+
+        cases += [
+            Case('handle_callback_query', players, vote_taps, dispatch, fresh=True),
+            Case('get_role_action_buttons', players, night,
+                 lambda state: [get_role_action_buttons(p, state[1], state[1].phase) for p in state[1].get_alive_players()]),
+            Case('get_voting_buttons', players, voting,
+                 lambda state: [get_voting_buttons(state[1], p.user_id) for p in state[1].get_alive_players()]),
+            Case('players_with_pending_action', players, acted_night,
+                 lambda state: mechanics.players_with_pending_action(state[1])),
+            Case('check_win_condition', players, night, lambda state: state[1].check_win_condition()),
+            Case('get_alive_players', players, night, lambda state: state[1].get_alive_players()),
+            Case('process_night_actions', players, acted_night,
+                 lambda state: mechanics.process_night_actions(state[0].context, state[1]), fresh=True),
+            Case('process_voting_results', players, voting,
+                 lambda state: mechanics.process_voting_results(state[0].context, state[1]), fresh=True),
+            Case('update_player_stats', players, ranking_results, update_stats),
+            Case('record_batch_game_results', players, ranking_results, record_batch),
+        ]
+    return cases, fixtures
+
+
+def _tap(sim: GameSimulator, player, data: str) -> SimpleNamespace:
+    user = SimpleNamespace(id=player.user_id, username=player.username, first_name=player.first_name)
+    query = SimCallbackQuery(sim.bot, user, player.user_id, player.last_action_message_id or 0, data)
+    return SimpleNamespace(callback_query=query, effective_user=user, effective_chat=query.message.chat)
+
+
+# ============================================================================
+# TIMING
+# ============================================================================
+
+async def _call(run: Callable[[Any], Any], state: Any):
+    result = run(state)
+    if inspect.isawaitable(result):
+        await result
+
+
+async def time_case(case: Case, fixtures: Fixtures) -> Dict[str, Any]:
+    """Per-iteration timings in microseconds: median and min over ROUNDS rounds"""
+    per_round = []
+    iterations = 0
+
+    if case.fresh:
+        for _ in range(ROUNDS):
+            elapsed = 0.0
+            for _ in range(FRESH_ITERATIONS):
+                state = await case.setup()
+                started = time.perf_counter()
+                await _call(case.run, state)
+                elapsed += time.perf_counter() - started
+                _discard(fixtures, state)
+            per_round.append(elapsed / FRESH_ITERATIONS)
+            iterations += FRESH_ITERATIONS
+    else:
+        state = await case.setup()
+        number = 1
+        while True:
+            started = time.perf_counter()
+            for _ in range(number):
+                await _call(case.run, state)
+            elapsed = time.perf_counter() - started
+            if elapsed >= MIN_ROUND_TIME or number >= 1 << 20:
+                break
+            number *= 2
+        per_round.append(elapsed / number)
+        for _ in range(ROUNDS - 1):
+            started = time.perf_counter()
+            for _ in range(number):
+                await _call(case.run, state)
+            per_round.append((time.perf_counter() - started) / number)
+        iterations = number * ROUNDS
+        _discard(fixtures, state)
+
+    return {
+        'median_us': round(statistics.median(per_round) * 1e6, 2),
+        'min_us': round(min(per_round) * 1e6, 2),
+        'iterations': iterations,
+    }
+
+
+def _discard(fixtures: Fixtures, state: Any):
+    game = state[1] if isinstance(state, tuple) and len(state) > 1 else None
+    if game is not None and hasattr(game, 'group_id'):
+        fixtures.discard(game)
+
+
+async def run_benchmarks(sizes: Sequence[int] = DEFAULT_SIZES, pattern: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    # Snapshots stay on: they are part of every phase transition's cost
+    engine = load_engine(persist_snapshots=True)
+    # Synthetic games may be larger than a real lobby allows
+    engine.game.MAX_PLAYERS = max(engine.game.MAX_PLAYERS, *sizes)
+
+    cases, fixtures = build_cases(engine, sizes)
+    results = {}
+    for case in cases:
+        if pattern and pattern not in case.name:
+            continue
+        results[case.key] = await time_case(case, fixtures)
+        logger.info(f"⏱️ {case.key:<36} {results[case.key]['median_us']:>12.1f} µs")
+    return results
+
+
+# ============================================================================
+# BASELINES
+# ============================================================================
+
+def save_baseline(path: str, results: Dict[str, Dict[str, Any]]):
+    with open(path, 'w') as f:
+        json.dump({
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'results': results,
+        }, f, indent=2, sort_keys=True)
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> Tuple[List[str], int]:
+    """Report lines for every case (marking those more than `threshold` slower than the baseline) and the regression count"""
+    lines = []
+    regressions = 0
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            lines.append(f"   {key:<36} {result['median_us']:>12.1f} µs   (new)")
+            continue
+        change = result['median_us'] / previous['median_us'] - 1 if previous['median_us'] else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  ❌ REGRESSION"
+            regressions += 1
+        elif change < -threshold:
+            flag = "  ✅ faster"
+        lines.append(f"   {key:<36} {result['median_us']:>12.1f} µs  {change:+7.1%}{flag}")
+    lines.append(f"{regressions} regression(s) above {threshold:.0%}")
+    return lines, regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time the bot's hot paths on synthetic games")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="Player counts")
+    parser.add_argument('--filter', help="Only run cases whose name contains this")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON to compare against / save to")
+    parser.add_argument('--save', action='store_true', help="Write these results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown that counts as a regression (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.CRITICAL)
+    logger.setLevel(logging.INFO)
+
+    results = asyncio.run(run_benchmarks(args.sizes, args.filter))
+
+    regressions = 0
+    if os.path.exists(args.baseline) and not args.save:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        lines, regressions = compare(results, baseline, args.threshold)
+        print(f"Compared with {args.baseline}:")
+        print('\n'.join(lines))
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"Saved baseline to {args.baseline}")
+
+    return 1 if regressions else 0
+
+
+logger.info("Benchmarks module loaded successfully")
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import logging
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+logger = logging.getLogger(__name__)
+
+# Telegram rejects callback_data longer than 64 bytes
+MAX_CALLBACK_BYTES = 64
+
+# Separates the optional phase epoch from the rest of the payload
+EPOCH_SEPARATOR = ":"
+
+
+class CallbackPayload(NamedTuple):
+    """Typed view of a game button's callback_data: <action>[_<target>][:<epoch>]"""
+    action: str
+    target: Optional[int] = None
+    epoch: Optional[int] = None
+
+    @property
+    def is_skip(self) -> bool:
+        """A target-less "<action>_skip" button"""
+        return self.target is None and self.action.endswith('_skip')
+
+    @property
+    def body(self) -> str:
+        """callback_data without the epoch stamp (the legacy '_'-joined format)"""
+        return self.action if self.target is None else f"{self.action}_{self.target}"
+
+
+def encode_callback(action: str, target: Optional[int] = None, epoch: Optional[int] = None) -> str:
+    """
+    Build callback_data for a game button.
+
+    Raises:
+        ValueError: if the encoded data exceeds Telegram's 64-byte limit
+    """
+    data = action if target is None else f"{action}_{target}"
+    if epoch is not None:
+        data = f"{data}{EPOCH_SEPARATOR}{epoch}"
+
+    if len(data.encode('utf-8')) > MAX_CALLBACK_BYTES:
+        raise ValueError(f"callback_data too long ({len(data.encode('utf-8'))} bytes): {data}")
+    return data
+
+
+def decode_callback(data: str) -> CallbackPayload:
+    """Parse callback_data produced by encode_callback (or the equivalent f-strings)"""
+    epoch = None
+    if EPOCH_SEPARATOR in data:
+        data, _, epoch_str = data.rpartition(EPOCH_SEPARATOR)
+        epoch = int(epoch_str) if epoch_str.isdigit() else None
+
+    action, _, last = data.rpartition('_')
+    if action and last.isdigit():
+        return CallbackPayload(action, int(last), epoch)
+    return CallbackPayload(data, None, epoch)
+
+
+def stamp_keyboard(markup: InlineKeyboardMarkup, epoch: int) -> InlineKeyboardMarkup:
+    """Return a copy of markup whose callback buttons carry the given phase epoch"""
+    return InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton(button.text, callback_data=encode_callback(*decode_callback(button.callback_data)[:2], epoch))
+            if button.callback_data else button
+            for button in row
+        ]
+        for row in markup.inline_keyboard
+    ])
+
+
+CallbackHandler = Callable[..., Awaitable]
+
+
+class CallbackRouter:
+    """
+    Maps a callback action (the payload without its target id) to its handler,
+    so dispatch is a single dict lookup instead of an if/elif chain.
+    """
+
+    def __init__(self):
+        self._routes: Dict[str, CallbackHandler] = {}
+
+    def register(self, *actions: str):
+        """Decorator registering a handler for one or more actions"""
+        def decorator(handler: CallbackHandler) -> CallbackHandler:
+            for action in actions:
+                self.add(action, handler)
+            return handler
+        return decorator
+
+    def add(self, action: str, handler: CallbackHandler):
+        if action in self._routes:
+            logger.warning(f"Callback action '{action}' registered twice, overriding")
+        self._routes[action] = handler
+
+    def resolve(self, action: str) -> Optional[CallbackHandler]:
+        return self._routes.get(action)
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+
+# Global router for in-game action buttons
+callback_router = CallbackRouter()
+
+logger.info("Callbacks module loaded successfully")
@@ -150,6 +150,66 @@ def get_gif_path(category: str, key: str) -> str:
         return path
     return None
 
+# ═══════════════════════════════════════════════════════════
+# PHASE SCHEDULER
+# ═══════════════════════════════════════════════════════════
+# How many games may run an expired-phase transition at the same time
+MAX_CONCURRENT_TRANSITIONS = 10
+# Seconds before re-arming a deadline that fired while another transition held the game
+DEADLINE_RETRY_SECONDS = 1
+
+# ═══════════════════════════════════════════════════════════
+# OUTBOUND RATE LIMITS (Telegram Bot API)
+# ═══════════════════════════════════════════════════════════
+GLOBAL_MESSAGES_PER_SECOND = 30
+GROUP_MESSAGES_PER_MINUTE = 20
+GROUP_MESSAGE_BURST = 5
+PRIVATE_MESSAGES_PER_SECOND = 1
+PRIVATE_MESSAGE_BURST = 3
+MAX_RETRY_AFTER_ATTEMPTS = 3
+
+# ═══════════════════════════════════════════════════════════
+# DM FAN-OUT
+# ═══════════════════════════════════════════════════════════
+# Concurrent per-player DMs when sending roles/menus, and how long a phase
+# waits for them before its timer starts anyway
+DM_FANOUT_CONCURRENCY = 10
+DM_DELIVERY_DEADLINE = 15
+
+# ═══════════════════════════════════════════════════════════
+# MEDIA CACHE
+# ═══════════════════════════════════════════════════════════
+# Telegram file_ids of uploaded GIFs/images, stored next to the rankings DB
+MEDIA_CACHE_DB_PATH = "werewolf_media.db"
+
+# ═══════════════════════════════════════════════════════════
+# RANKINGS DATABASE
+# ═══════════════════════════════════════════════════════════
+RANKINGS_DB_PATH = "werewolf_rankings.db"
+# Read-only connections shared by /stats, /leaderboard etc. (WAL lets them run during writes)
+DB_READ_POOL_SIZE = 4
+# Milliseconds a connection waits on a lock before raising "database is locked"
+DB_BUSY_TIMEOUT_MS = 5000
+# Prepared statements cached per connection
+DB_STATEMENT_CACHE_SIZE = 128
+
+# ═══════════════════════════════════════════════════════════
+# GAME SNAPSHOTS
+# ═══════════════════════════════════════════════════════════
+# Running games are saved here at every phase change and resumed after a restart
+SNAPSHOT_DB_PATH = "werewolf_snapshots.db"
+# Grace period (seconds) before an already-expired phase is advanced after restore
+SNAPSHOT_RESUME_GRACE = 5
+
+# ═══════════════════════════════════════════════════════════
+# EVENT LOOP MONITOR
+# ═══════════════════════════════════════════════════════════
+# How often the loop is probed, and the lag (ms) that gets logged as a warning
+LOOP_LAG_SAMPLE_INTERVAL = 0.5
+LOOP_LAG_WARN_MS = 100
+# Seconds between lag summaries in the log
+LOOP_LAG_REPORT_INTERVAL = 300
+
 # ═══════════════════════════════════════════════════════════
 # LOGGING CONFIGURATION
 # ═══════════════════════════════════════════════════════════
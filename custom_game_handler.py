@@ -4,7 +4,7 @@ from telegram.constants import ChatType
 from telegram.ext import ContextTypes
 from datetime import datetime
 from collections import Counter
-from game import active_games, Game, GamePhase, Player, Role, Team
+from game import active_games, remove_game, Game, GamePhase, Player, Role, Team
 
 logger = logging.getLogger(__name__)
 
@@ -482,8 +482,7 @@ async def auto_start_custom_game(context: ContextTypes.DEFAULT_TYPE):
             text="❌ **Game configuration error**\n\nGame cancelled.",
             parse_mode='Markdown'
         )
-        if chat_id in active_games:
-            del active_games[chat_id]
+        remove_game(chat_id)
         return
     
     config = custom_game_configs[chat_id]
@@ -508,8 +507,7 @@ async def auto_start_custom_game(context: ContextTypes.DEFAULT_TYPE):
         )
         
         # Cleanup
-        if chat_id in active_games:
-            del active_games[chat_id]
+        remove_game(chat_id)
         if chat_id in custom_game_configs:
             del custom_game_configs[chat_id]
         
@@ -527,8 +525,7 @@ async def auto_start_custom_game(context: ContextTypes.DEFAULT_TYPE):
                 text="❌ **Failed to assign roles**\n\nGame cancelled.",
                 parse_mode='Markdown'
             )
-            if chat_id in active_games:
-                del active_games[chat_id]
+            remove_game(chat_id)
             if chat_id in custom_game_configs:
                 del custom_game_configs[chat_id]
             return
@@ -539,8 +536,7 @@ async def auto_start_custom_game(context: ContextTypes.DEFAULT_TYPE):
             text=f"❌ **Role assignment error**\n\n{str(e)}\n\nGame cancelled.",
             parse_mode='Markdown'
         )
-        if chat_id in active_games:
-            del active_games[chat_id]
+        remove_game(chat_id)
         if chat_id in custom_game_configs:
             del custom_game_configs[chat_id]
         return
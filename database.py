@@ -0,0 +1,132 @@
+import logging
+import asyncio
+import functools
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, List
+
+from config import DB_READ_POOL_SIZE, DB_BUSY_TIMEOUT_MS, DB_STATEMENT_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionManager:
+    """
+    Long-lived SQLite connections for one database file.
+
+    - One writer connection, serialized by a lock; every write() block is one transaction
+    - A small pool of read-only connections; in WAL mode readers never wait for the writer
+    - WAL journal, synchronous=NORMAL, busy timeout and a per-connection statement cache
+    - run_write()/run_read() let coroutines await database work on dedicated threads
+      (one writer thread, so writes queue up instead of contending for the lock)
+    """
+
+    def __init__(self, db_path: str, read_pool_size: int = DB_READ_POOL_SIZE):
+        self.db_path = db_path
+        self._write_lock = threading.RLock()
+        self._writer = self._connect()
+        self._writer.execute('PRAGMA journal_mode=WAL')
+
+        self._read_pool_size = read_pool_size
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._all_readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+        self._read_executor = ThreadPoolExecutor(max_workers=read_pool_size, thread_name_prefix="db-read")
+
+        logger.info(f"Opened {db_path} (WAL, pool of {read_pool_size} readers)")
+
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        if read_only:
+            uri = Path(self.db_path).absolute().as_uri() + '?mode=ro'
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                                   cached_statements=DB_STATEMENT_CACHE_SIZE)
+            conn.row_factory = sqlite3.Row
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                   cached_statements=DB_STATEMENT_CACHE_SIZE)
+        conn.execute(f'PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        """Exclusive use of the writer connection; commits on success, rolls back on error"""
+        with self._write_lock:
+            try:
+                yield self._writer
+                self._writer.commit()
+            except Exception:
+                self._writer.rollback()
+                raise
+
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a read-only connection (rows are sqlite3.Row)"""
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            # End the implicit read transaction so the WAL can be checkpointed
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._readers_lock:
+            if len(self._all_readers) < self._read_pool_size:
+                conn = self._connect(read_only=True)
+                self._all_readers.append(conn)
+                return conn
+
+        return self._readers.get()
+
+    # ------------------------------------------------------------------
+    # Off-loop execution
+    # ------------------------------------------------------------------
+    async def run_write(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn on the writer thread and await its result"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._write_executor, functools.partial(fn, *args, **kwargs))
+
+    async def run_read(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn on a reader thread and await its result"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._read_executor, functools.partial(fn, *args, **kwargs))
+
+    def submit_write(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Queue fn on the writer thread without waiting (usable from sync code)"""
+        future = self._write_executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    @staticmethod
+    def _log_failure(future: Future):
+        if not future.cancelled() and future.exception():
+            logger.error(f"Background database write failed: {future.exception()}")
+
+    def close(self):
+        """Finish queued work and close every connection (call once at shutdown)"""
+        self._write_executor.shutdown(wait=True)
+        self._read_executor.shutdown(wait=True)
+        with self._readers_lock:
+            for conn in self._all_readers:
+                conn.close()
+            self._all_readers.clear()
+            self._readers = queue.Queue()
+        with self._write_lock:
+            self._writer.close()
+        logger.info(f"Closed {self.db_path}")
+
+
+logger.info("Database module loaded successfully")
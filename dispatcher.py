@@ -0,0 +1,266 @@
+import logging
+import asyncio
+import itertools
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from config import (
+    GLOBAL_MESSAGES_PER_SECOND,
+    GROUP_MESSAGES_PER_MINUTE,
+    GROUP_MESSAGE_BURST,
+    PRIVATE_MESSAGES_PER_SECOND,
+    PRIVATE_MESSAGE_BURST,
+    MAX_RETRY_AFTER_ATTEMPTS
+)
+
+logger = logging.getLogger(__name__)
+
+# Priority classes - lower value is sent first
+PRIORITY_ACTION = 0   # Messages carrying buttons (action menus, votes, lobby)
+PRIORITY_NORMAL = 1   # Plain text announcements and results
+PRIORITY_FLAVOR = 2   # GIFs and images (narrative flavor)
+
+PRIORITY_NAMES = {
+    PRIORITY_ACTION: "action",
+    PRIORITY_NORMAL: "normal",
+    PRIORITY_FLAVOR: "flavor",
+}
+
+# Only endpoints that post into a chat count against Telegram's flood limits
+RATE_LIMITED_PREFIXES = ("send", "edit", "delete", "copy", "forward", "pin", "unpin")
+
+
+class TokenBucket:
+    """Classic token bucket with an optional hard pause (used after RetryAfter)"""
+
+    __slots__ = ("rate", "capacity", "tokens", "last", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        if now > self.last:
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available (0 if available now)"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.blocked_until
+
+
+class _Waiter:
+    __slots__ = ("key", "chat_id", "future", "enqueued_at")
+
+    def __init__(self, priority: int, seq: int, chat_id: Optional[int], future: asyncio.Future):
+        self.key = (priority, seq)
+        self.chat_id = chat_id
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class OutboundDispatcher(BaseRateLimiter):
+    """
+    Single owner of every outbound Bot API call.
+
+    Installed on the Application via ApplicationBuilder().rate_limiter(), so every
+    context.bot.send_* / edit_* call in mechanics.py, handlers.py and ranking.py
+    flows through it without changing call sites.
+
+    - Global bucket (~30 msg/s) plus per-chat buckets (groups ~20/min, DMs ~1/s)
+    - Priority classes: button menus go ahead of plain text, which goes ahead of GIFs.
+      Callers may override with rate_limit_args={'priority': PRIORITY_*}
+    - RetryAfter pauses the offending chat (or everything) and re-queues the request
+    - A throttled chat never blocks requests for other chats
+    """
+
+    def __init__(self):
+        self._global = TokenBucket(GLOBAL_MESSAGES_PER_SECOND, GLOBAL_MESSAGES_PER_SECOND)
+        self._chats: Dict[int, TokenBucket] = {}
+        self._waiting: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._wake: Optional[asyncio.Event] = None
+        self._pump_task: Optional[asyncio.Task] = None
+
+        self._sent = 0
+        self._retry_after = 0
+        self._max_wait = 0.0
+
+    # ------------------------------------------------------------------
+    # BaseRateLimiter interface
+    # ------------------------------------------------------------------
+    async def initialize(self) -> None:
+        self._ensure_pump()
+        logger.info("Outbound dispatcher started")
+
+    async def shutdown(self) -> None:
+        if self._pump_task:
+            self._pump_task.cancel()
+            try:
+                await self._pump_task
+            except asyncio.CancelledError:
+                pass
+            self._pump_task = None
+        for waiter in self._waiting:
+            if not waiter.future.done():
+                waiter.future.cancel()
+        self._waiting.clear()
+        logger.info(f"Outbound dispatcher stopped ({self._sent} requests sent)")
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Any]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[Dict[str, Any]],
+    ) -> Any:
+        if not endpoint.startswith(RATE_LIMITED_PREFIXES):
+            return await callback(*args, **kwargs)
+
+        chat_id = data.get("chat_id")
+        priority = self._classify(endpoint, data, rate_limit_args)
+
+        for attempt in range(MAX_RETRY_AFTER_ATTEMPTS + 1):
+            await self._acquire(chat_id, priority)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                self._retry_after += 1
+                retry_after = e.retry_after
+                if hasattr(retry_after, "total_seconds"):
+                    retry_after = retry_after.total_seconds()
+                retry_after = float(retry_after)
+
+                if attempt >= MAX_RETRY_AFTER_ATTEMPTS:
+                    logger.error(f"❌ Giving up on {endpoint} to {chat_id} after {attempt + 1} RetryAfter errors")
+                    raise
+
+                # Pause only the offending chat; without a chat id the whole bot is throttled
+                bucket = self._chat_bucket(chat_id) if chat_id is not None else self._global
+                bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + retry_after)
+                logger.warning(f"⏳ RetryAfter {retry_after:.0f}s on {endpoint} to {chat_id}, re-queued")
+
+    # ------------------------------------------------------------------
+    # Queueing
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _classify(endpoint: str, data: Dict[str, Any], rate_limit_args: Optional[Dict[str, Any]]) -> int:
+        if rate_limit_args and "priority" in rate_limit_args:
+            return rate_limit_args["priority"]
+        if data.get("reply_markup"):
+            return PRIORITY_ACTION
+        if endpoint in ("sendAnimation", "sendPhoto", "sendVideo", "sendDocument"):
+            return PRIORITY_FLAVOR
+        return PRIORITY_NORMAL
+
+    def _chat_bucket(self, chat_id: Optional[int]) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if isinstance(chat_id, int) and chat_id < 0:
+                bucket = TokenBucket(GROUP_MESSAGES_PER_MINUTE / 60, GROUP_MESSAGE_BURST)
+            else:
+                bucket = TokenBucket(PRIVATE_MESSAGES_PER_SECOND, PRIVATE_MESSAGE_BURST)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _ensure_pump(self):
+        if self._pump_task is None or self._pump_task.done():
+            self._wake = asyncio.Event()
+            self._pump_task = asyncio.get_running_loop().create_task(self._pump())
+
+    async def _acquire(self, chat_id: Optional[int], priority: int):
+        self._ensure_pump()
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.append(_Waiter(priority, next(self._seq), chat_id, future))
+        if len(self._waiting) % 50 == 0:
+            logger.warning(f"📬 Outbound queue depth {len(self._waiting)}: {self.get_metrics()['queue_depth_by_priority']}")
+        self._wake.set()
+        await future
+
+    async def _pump(self):
+        """Grant send slots to the highest-priority waiter whose chat has a token"""
+        while True:
+            self._wake.clear()
+            self._waiting = [w for w in self._waiting if not w.future.done()]
+
+            delay = None
+            if self._waiting:
+                now = time.monotonic()
+                delay = self._global.wait_time(now)
+                if delay <= 0:
+                    best = None
+                    delay = float("inf")
+                    for waiter in self._waiting:
+                        wait = self._chat_bucket(waiter.chat_id).wait_time(now)
+                        if wait > 0:
+                            delay = min(delay, wait)
+                        elif best is None or waiter.key < best.key:
+                            best = waiter
+
+                    if best:
+                        self._global.consume()
+                        self._chat_bucket(best.chat_id).consume()
+                        self._waiting.remove(best)
+                        self._sent += 1
+                        self._max_wait = max(self._max_wait, now - best.enqueued_at)
+                        best.future.set_result(None)
+                        continue
+
+                if len(self._chats) > 1000:
+                    self._prune(now)
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _prune(self, now: float):
+        busy = {w.chat_id for w in self._waiting}
+        for chat_id in [c for c, b in self._chats.items() if c not in busy and b.is_idle(now)]:
+            del self._chats[chat_id]
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth and throughput counters"""
+        by_priority = {name: 0 for name in PRIORITY_NAMES.values()}
+        for waiter in self._waiting:
+            name = PRIORITY_NAMES.get(waiter.key[0], str(waiter.key[0]))
+            by_priority[name] = by_priority.get(name, 0) + 1
+
+        now = time.monotonic()
+        return {
+            "queue_depth": len(self._waiting),
+            "queue_depth_by_priority": by_priority,
+            "sent": self._sent,
+            "retry_after": self._retry_after,
+            "max_wait_seconds": round(self._max_wait, 3),
+            "paused_chats": sum(1 for b in self._chats.values() if b.blocked_until > now),
+        }
+
+
+# Global instance
+outbound_dispatcher = OutboundDispatcher()
+
+logger.info("Dispatcher module loaded successfully")
@@ -1,5 +1,6 @@
 import logging
 from enum import Enum
+from typing import Callable, Dict, FrozenSet, NamedTuple, Optional, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
@@ -66,4 +67,103 @@ class Role(Enum):
         self.role_name = name
         self.team = team
 
+    @property
+    def capability(self) -> 'RoleCapability':
+        return ROLE_CAPABILITIES[self]
+
+class ActionType(Enum):
+    """Kinds of night (and detective day) actions recorded in Game.night_actions"""
+    WOLF_HUNT = "wolf_hunt"
+    SHAMAN_BLOCK = "shaman_block"
+    SEER = "seer"
+    ORACLE = "oracle"
+    DETECTIVE = "detective"
+    DOCTOR = "doctor"
+    BODYGUARD = "bodyguard"
+    PRIEST = "priest"
+    VIGILANTE_KILL = "vigilante_kill"
+    SERIAL_KILLER_KILL = "serial_killer_kill"
+    WITCH_HEAL = "witch_heal"
+    WITCH_POISON = "witch_poison"
+    PLAGUE_INFECT = "plague_doctor_infect"
+    ARSONIST_DOUSE = "arsonist_douse"
+    ARSONIST_DOUSE_SECOND = "arsonist_douse_second"
+    FIRE_STARTER_DOUSE = "fire_starter_douse"
+    FIRE_STARTER_BLOCK = "fire_starter_block"
+    ACCELERANT_BOOST = "accelerant_expert_used"
+    IGNITE = "ignite"
+    WEBKEEPER_MARK = "webkeeper_mark"
+    STRAY_OBSERVE = "stray_observe"
+    THIEF_STEAL = "thief_steal"
+    GRAVE_ROBBER_BORROW = "grave_robber_borrow"
+
+
+# ============================================================================
+# ROLE CAPABILITIES
+# ============================================================================
+
+class RoleCapability(NamedTuple):
+    """
+    When a role gets an action menu, so "does this player still have something
+    to do" can be answered without building the keyboard.
+
+    disabled_by names player flags that switch the action off while set; a tuple
+    of names only does so once all of them are set (the witch's two potions).
+    nights filters night actions by day_number, and acts_as names the player
+    attribute holding the role whose capability applies instead.
+    """
+    phases: FrozenSet[GamePhase] = frozenset()
+    one_shot: bool = False
+    disabled_by: Tuple[Union[str, Tuple[str, ...]], ...] = ()
+    nights: Optional[Callable[[int], bool]] = None
+    acts_as: Optional[str] = None
+
+    def is_disabled(self, player) -> bool:
+        for flag in self.disabled_by:
+            if isinstance(flag, tuple):
+                if all(getattr(player, name) for name in flag):
+                    return True
+            elif getattr(player, flag):
+                return True
+        return False
+
+
+NIGHT_ONLY = frozenset({GamePhase.NIGHT})
+DAY_ONLY = frozenset({GamePhase.DAY})
+
+# Mirrors the branches of roles.get_role_action_buttons; roles missing here have no menu
+ROLE_CAPABILITIES: Dict[Role, RoleCapability] = {
+    Role.WEREWOLF: RoleCapability(NIGHT_ONLY),
+    Role.ALPHA_WOLF: RoleCapability(NIGHT_ONLY),
+    Role.WOLF_SHAMAN: RoleCapability(NIGHT_ONLY),
+    Role.SERIAL_KILLER: RoleCapability(NIGHT_ONLY),
+    Role.SEER: RoleCapability(NIGHT_ONLY),
+    Role.ORACLE: RoleCapability(NIGHT_ONLY),
+    Role.DOCTOR: RoleCapability(NIGHT_ONLY),
+    Role.BODYGUARD: RoleCapability(NIGHT_ONLY),
+    Role.PRIEST: RoleCapability(NIGHT_ONLY),
+    Role.VIGILANTE: RoleCapability(NIGHT_ONLY, disabled_by=('vigilante_killed_innocent',)),
+    Role.WITCH: RoleCapability(NIGHT_ONLY, one_shot=True, disabled_by=(('witch_heal_used', 'witch_poison_used'),)),
+    Role.ARSONIST: RoleCapability(NIGHT_ONLY),
+    Role.BLAZEBRINGER: RoleCapability(NIGHT_ONLY),
+    Role.ACCELERANT_EXPERT: RoleCapability(NIGHT_ONLY, one_shot=True, disabled_by=('accelerant_used',)),
+    Role.CUPID: RoleCapability(NIGHT_ONLY, one_shot=True, nights=lambda night: night == 0),
+    Role.PLAGUE_DOCTOR: RoleCapability(NIGHT_ONLY, nights=lambda night: night % 3 == 1),
+    Role.WEBKEEPER: RoleCapability(NIGHT_ONLY, disabled_by=('has_acted',)),
+    Role.STRAY: RoleCapability(NIGHT_ONLY, disabled_by=('has_acted',)),
+    Role.MIRROR_PHANTOM: RoleCapability(NIGHT_ONLY, one_shot=True, disabled_by=('mirror_ability_used',)),
+    Role.THIEF: RoleCapability(NIGHT_ONLY, one_shot=True, disabled_by=('thief_ability_used', 'has_acted')),
+    # Borrowing needs someone dead and a fresh night; acting with the borrowed role is checked by the caller
+    Role.GRAVE_ROBBER: RoleCapability(NIGHT_ONLY),
+    Role.DOPPELGANGER: RoleCapability(NIGHT_ONLY, acts_as='doppelganger_copied_role'),
+    Role.DETECTIVE: RoleCapability(DAY_ONLY, disabled_by=('detective_acted_today',)),
+    Role.MAYOR: RoleCapability(DAY_ONLY, one_shot=True, disabled_by=('is_mayor_revealed',)),
+}
+NO_CAPABILITY = RoleCapability()
+for _role in Role:
+    ROLE_CAPABILITIES.setdefault(_role, NO_CAPABILITY)
+
+# Copied roles a Doppelganger gets a menu for
+DOPPELGANGER_ACTION_ROLES = frozenset({Role.SEER, Role.DOCTOR, Role.BODYGUARD, Role.WEREWOLF, Role.ALPHA_WOLF})
+
 logger.info("Enums module loaded successfully")
@@ -1,66 +1,212 @@
 import logging
 import asyncio
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Any, Optional, Dict, List, Set
 from enums import GamePhase, Team, Role
+from night_actions import NightActions
 from telegram import User
 from config import MAX_PLAYERS, MIN_PLAYERS
 
 logger = logging.getLogger(__name__)
 
+class RoleState:
+    """
+    Base for per-role state components.
+
+    Subclasses declare FIELDS (attribute -> default). A component is only
+    created the first time one of its fields is written, so players that never
+    hold the role pay nothing for it.
+    """
+    __slots__ = ()
+    FIELDS: Dict[str, Any] = {}
+
+    def __init__(self):
+        for name, default in self.FIELDS.items():
+            setattr(self, name, default)
+
+
+class WitchState(RoleState):
+    FIELDS = {'witch_heal_used': False, 'witch_poison_used': False}
+    __slots__ = tuple(FIELDS)
+
+class HunterState(RoleState):
+    FIELDS = {'hunter_can_shoot': False}
+    __slots__ = tuple(FIELDS)
+
+class VigilanteState(RoleState):
+    FIELDS = {'vigilante_killed_innocent': False}
+    __slots__ = tuple(FIELDS)
+
+class DetectiveState(RoleState):
+    FIELDS = {'detective_acted_today': False}
+    __slots__ = tuple(FIELDS)
+
+class CupidState(RoleState):
+    FIELDS = {'cupid_acted': False}
+    __slots__ = tuple(FIELDS)
+
+class DoppelgangerState(RoleState):
+    FIELDS = {'doppelganger_copied_role': None, 'doppelganger_target_id': None}
+    __slots__ = tuple(FIELDS)
+
+class FireState(RoleState):
+    FIELDS = {
+        'accelerant_used': False,
+        'accelerant_boost': False,
+        'accelerant_boost_next_night': False,
+        'douse_count_tonight': 0,
+        'max_douses_tonight': 1,
+    }
+    __slots__ = tuple(FIELDS)
+
+class GraveRobberState(RoleState):
+    FIELDS = {
+        'grave_robber_can_act': True,
+        'grave_robber_borrowed_role': None,
+        'grave_robber_can_borrow_tonight': True,
+        'grave_robber_act_tonight': False,
+    }
+    __slots__ = tuple(FIELDS)
+
+class WebkeeperState(RoleState):
+    FIELDS = {'webkeeper_marked_target': None}
+    __slots__ = tuple(FIELDS)
+
+class StrayState(RoleState):
+    FIELDS = {'stray_observed_target': None}
+    __slots__ = tuple(FIELDS)
+
+class MirrorPhantomState(RoleState):
+    FIELDS = {'mirror_ability_used': False, 'mirror_stolen_role': None, 'mirror_win_condition': None}
+    __slots__ = tuple(FIELDS)
+
+class ThiefState(RoleState):
+    FIELDS = {'thief_ability_used': False, 'thief_stolen_role': None, 'thief_objective_complete': False}
+    __slots__ = tuple(FIELDS)
+
+
+ROLE_STATE_COMPONENTS = (
+    WitchState, HunterState, VigilanteState, DetectiveState, CupidState, DoppelgangerState,
+    FireState, GraveRobberState, WebkeeperState, StrayState, MirrorPhantomState, ThiefState,
+)
+
+
 class Player:
     """Represents a player in the Werewolf game"""
     
+    __slots__ = (
+        'user_id', 'username', 'first_name', '_role', '_is_alive',
+        'has_acted', 'has_acted_this_phase', 'votes_received', 'has_voted', 'voted_for',
+        'game_actions', '_death_announced', 'afk_count', 'warned_afk', 'last_action_message_id',
+        # Statuses any player can carry, whatever their role
+        'is_mayor_revealed', 'lover_id', 'executioner_target', 'is_blessed', '_is_doused',
+        '_is_plagued', 'night_visits', 'visited_players', 'achieved_objective', 'died_from_grief',
+        # Role-specific state: RoleState subclass -> component
+        '_components',
+        # Game whose alive/team index follows this player's role and is_alive
+        '_game',
+    )
+    
     def __init__(self, user_id: int, username: str, first_name: str):
+        self._game: Optional['Game'] = None
         self.user_id = user_id
         self.username = username or ""
         self.first_name = first_name
-        self.role: Optional[Role] = None
-        self.is_alive = True
+        self._role: Optional[Role] = None
+        self._is_alive = True
         self.has_acted = False
+        self.has_acted_this_phase = False
         self.votes_received = 0
         self.has_voted = False
         self.voted_for: Optional[int] = None
-        self.game_actions = {}
+        self.game_actions: Dict[str, int] = {}
         self._death_announced = False
+        self.afk_count = 0
+        self.warned_afk = False
+        self.last_action_message_id: Optional[int] = None
 
-        # Role-specific attributes
         self.is_mayor_revealed = False
         self.lover_id: Optional[int] = None
         self.executioner_target: Optional[int] = None
-        self.witch_heal_used = False
-        self.witch_poison_used = False
-        self.hunter_can_shoot = False
-        self.vigilante_killed_innocent = False
-        self.doppelganger_copied_role: Optional[Role] = None
         self.is_blessed = False
-        self.is_doused = False
-        self.accelerant_used = False
-        self.accelerant_boost_next_night = False
-        self.douse_count_tonight = 0
-        self.max_douses_tonight = 1
-        self.is_plagued = False
+        self._is_doused = False
+        self._is_plagued = False
         self.night_visits: List[int] = []
-        self.grave_robber_can_act = True
-        self.grave_robber_borrowed_role = None
-        self.grave_robber_can_borrow_tonight = True
-        self.grave_robber_act_tonight = False
-        self.afk_count = 0
-        self.warned_afk = False
-        self.webkeeper_marked_target = None        
-        # Stray attributes
-        self.stray_observed_target = None        
-        # Mirror Phantom attributes
-        self.mirror_ability_used = False
-        self.mirror_stolen_role = None
-        self.mirror_win_condition = None        
-        # Thief attributes
-        self.thief_ability_used = False
-        self.thief_stolen_role = None
-        self.thief_objective_complete = False
+        self.visited_players: List[int] = []
+        self.achieved_objective = False
+        self.died_from_grief = False
+
+        self._components: Optional[Dict[type, RoleState]] = None
         
         logger.debug(f"Created player: {first_name} ({user_id})")
 
+    @property
+    def role(self) -> Optional[Role]:
+        return self._role
+
+    @role.setter
+    def role(self, role: Optional[Role]):
+        old_role = self._role
+        self._role = role
+        if self._game is not None and self._is_alive and old_role is not role:
+            self._game._move_alive_player(self, old_role)
+
+    @property
+    def is_alive(self) -> bool:
+        return self._is_alive
+
+    @is_alive.setter
+    def is_alive(self, alive: bool):
+        was_alive = self._is_alive
+        self._is_alive = alive
+        if self._game is None or was_alive == alive:
+            return
+        if alive:
+            self._game.reindex_players()
+        else:
+            self._game._unindex_player(self)
+
+    # Douse and plague marks change other players' action menus, so they bump the roster version too
+    @property
+    def is_doused(self) -> bool:
+        return self._is_doused
+
+    @is_doused.setter
+    def is_doused(self, doused: bool):
+        if doused != self._is_doused:
+            self._is_doused = doused
+            self._roster_changed()
+
+    @property
+    def is_plagued(self) -> bool:
+        return self._is_plagued
+
+    @is_plagued.setter
+    def is_plagued(self, plagued: bool):
+        if plagued != self._is_plagued:
+            self._is_plagued = plagued
+            self._roster_changed()
+
+    def _roster_changed(self):
+        if self._game is not None:
+            self._game.roster_version += 1
+
+    def component(self, component_type: type) -> RoleState:
+        """Get (creating on first use) this player's state for a role"""
+        if self._components is None:
+            self._components = {}
+        state = self._components.get(component_type)
+        if state is None:
+            state = self._components[component_type] = component_type()
+        return state
+
+    def role_state_items(self):
+        """(attribute, value) pairs of every role component this player has"""
+        for state in (self._components or {}).values():
+            for name in state.FIELDS:
+                yield name, getattr(state, name)
+
     @property
     def mention(self) -> str:
         return f"[{self.first_name}](tg://user?id={self.user_id})"
@@ -69,6 +215,24 @@ class Player:
     def display_name(self) -> str:
         return f"{self.role.emoji} {self.mention}" if self.role else self.mention
 
+
+def _role_state_property(component_type: type, name: str) -> property:
+    default = component_type.FIELDS[name]
+
+    def fget(player: Player):
+        state = player._components.get(component_type) if player._components else None
+        return default if state is None else getattr(state, name)
+
+    def fset(player: Player, value):
+        setattr(player.component(component_type), name, value)
+
+    return property(fget, fset, doc=f"{component_type.__name__}.{name}")
+
+# Expose component fields under their flat names (player.witch_heal_used, ...)
+for _component_type in ROLE_STATE_COMPONENTS:
+    for _name in _component_type.FIELDS:
+        setattr(Player, _name, _role_state_property(_component_type, _name))
+
 class Game:
     """Represents a Werewolf game instance"""
     
@@ -81,8 +245,9 @@ class Game:
         self.day_number = 0
         self.votes: Dict[int, int] = {}
         self.lobby_message_id: Optional[int] = None    
-        self.night_actions: Dict[str, Dict] = {}
+        self.night_actions = NightActions()
         self.evil_team_type: Team = Team.WOLF
+        self.winner: Optional[Team] = None
         self.start_time: Optional[datetime] = None
         self.game_start_time: Optional[datetime] = None
         self.phase_end_time: Optional[datetime] = None
@@ -105,8 +270,26 @@ class Game:
         
         # ✅ NEW: Phase transition safety
         self._phase_lock = asyncio.Lock()
+        # Task holding _phase_lock and how many nested transitions it has open
+        # (a deadline's timeout processing starts the next phase under the same lock)
+        self._phase_lock_owner: Optional[asyncio.Task] = None
+        self._phase_lock_depth = 0
+        # Only set while phase state is swapped (see changing_phase), not for the whole transition
         self._phase_transitioning = False
-        self._expected_phase_for_buttons: Dict[int, GamePhase] = {}  # message_id -> phase
+        # Bumped on every phase start; stamped into button callback_data to reject stale clicks
+        self.phase_epoch = 0
+
+        # Alive index, kept current by the Player.role / Player.is_alive setters
+        self._alive: Dict[int, Player] = {}
+        self._alive_by_team: Dict[Team, Dict[int, Player]] = {team: {} for team in Team}
+        self._alive_by_role: Dict[Role, Dict[int, Player]] = {}
+        # Bumped whenever the alive set, a role or a douse/plague mark changes
+        self.roster_version = 0
+        # Action/vote keyboards built this phase epoch (see roles.get_role_action_buttons)
+        self.keyboard_cache: Dict[tuple, Any] = {}
+        # Players whose menu for this phase was not delivered by the fan-out deadline;
+        # check_game_timers does not count them as AFK
+        self.undelivered_menus: Set[int] = set()
         
         logger.info(f"Created new game in group {group_id} ({group_name})")
 
@@ -119,6 +302,9 @@ class Game:
         if user.id not in self.players:
             player = Player(user.id, user.username or "", user.first_name)
             self.players[user.id] = player
+            player._game = self
+            self._index_player(player)
+            player_game_index[user.id] = self.group_id
             logger.info(f"Player {player.first_name} ({user.id}) joined game in group {self.group_id}")
             return True
         
@@ -129,6 +315,10 @@ class Game:
         """Remove a player from the game"""
         if user_id in self.players and self.phase == GamePhase.LOBBY:
             player = self.players.pop(user_id)
+            self._unindex_player(player)
+            player._game = None
+            if player_game_index.get(user_id) == self.group_id:
+                del player_game_index[user_id]
             logger.info(f"Player {player.first_name} ({user_id}) left game in group {self.group_id}")
             return True
         
@@ -142,117 +332,132 @@ class Game:
         return can_start
 
     def get_alive_players(self) -> List[Player]:
-        """Get all alive players"""
-        alive = [p for p in self.players.values() if p.is_alive]
-        logger.debug(f"Alive players: {len(alive)}")
-        return alive
+        """Get all alive players (in join order)"""
+        return list(self._alive.values())
 
     def get_players_by_team(self, team: Team) -> List[Player]:
         """Get all alive players from specific team"""
-        team_players = [p for p in self.get_alive_players() if p.role and p.role.team == team]
-        logger.debug(f"Team {team.value} players: {len(team_players)}")
-        return team_players
+        return list(self._alive_by_team[team].values())
+
+    def get_alive_count(self, team: Optional[Team] = None) -> int:
+        """Number of alive players, overall or on one team"""
+        return len(self._alive) if team is None else len(self._alive_by_team[team])
+
+    def _index_player(self, player: Player):
+        self.roster_version += 1
+        if player.is_alive:
+            self._alive[player.user_id] = player
+            self._index_role(player, player.role)
+
+    def _unindex_player(self, player: Player):
+        self.roster_version += 1
+        self._alive.pop(player.user_id, None)
+        self._unindex_role(player, player.role)
+
+    def _index_role(self, player: Player, role: Optional[Role]):
+        if role:
+            self._alive_by_team[role.team][player.user_id] = player
+            self._alive_by_role.setdefault(role, {})[player.user_id] = player
+
+    def _unindex_role(self, player: Player, role: Optional[Role]):
+        if role:
+            self._alive_by_team[role.team].pop(player.user_id, None)
+            self._alive_by_role.get(role, {}).pop(player.user_id, None)
+
+    def _move_alive_player(self, player: Player, old_role: Optional[Role]):
+        """An alive player's role changed (conversion, stolen or borrowed role)"""
+        self.roster_version += 1
+        self._unindex_role(player, old_role)
+        self._index_role(player, player.role)
+        logger.debug(f"Re-indexed {player.first_name}: {old_role.role_name if old_role else None} -> "
+                      f"{player.role.role_name if player.role else None}")
+
+    def reindex_players(self):
+        """Rebuild the alive index from scratch (revives, restored snapshots)"""
+        self.roster_version += 1
+        self._alive.clear()
+        for roster in self._alive_by_team.values():
+            roster.clear()
+        self._alive_by_role.clear()
+        for player in self.players.values():
+            player._game = self
+            self._index_player(player)
     
-    async def begin_phase_transition(self) -> bool:
+    async def begin_phase_transition(self, wait: bool = True) -> bool:
         """
-        Acquire phase transition lock. Returns True if acquired, False if already transitioning.
-        Must be called before any phase transition.
+        Acquire the phase transition lock, which serializes every phase change.
+        Re-entrant for the task that already holds it. With wait=False, returns
+        False instead of waiting when another task is mid-transition.
         """
-        if self._phase_transitioning:
+        task = asyncio.current_task()
+        if self._phase_lock_owner is task:
+            self._phase_lock_depth += 1
+            return True
+        if not wait and self._phase_lock.locked():
             logger.warning(f"Phase transition already in progress for game {self.group_id}")
             return False
         
         await self._phase_lock.acquire()
-        self._phase_transitioning = True
+        self._phase_lock_owner = task
+        self._phase_lock_depth = 1
         logger.debug(f"Phase transition lock acquired for game {self.group_id}")
         return True
     
     def end_phase_transition(self):
-        """Release phase transition lock after transition is complete"""
-        if self._phase_lock.locked():
+        """Release one level of the phase transition lock"""
+        if self._phase_lock_owner is not asyncio.current_task():
+            return
+        self._phase_lock_depth -= 1
+        if self._phase_lock_depth == 0:
+            self._phase_lock_owner = None
             self._phase_lock.release()
-        self._phase_transitioning = False
-        logger.debug(f"Phase transition lock released for game {self.group_id}")
+            logger.debug(f"Phase transition lock released for game {self.group_id}")
+
+    @contextmanager
+    def changing_phase(self):
+        """Mark the swap of phase state (phase, epoch, per-phase flags); button presses are refused meanwhile"""
+        self._phase_transitioning = True
+        try:
+            yield
+        finally:
+            self._phase_transitioning = False
     
     def is_transitioning(self) -> bool:
         """Check if game is currently transitioning between phases"""
         return self._phase_transitioning
     
-    def register_button_phase(self, message_id: int, expected_phase: GamePhase):
-        """Register expected phase for button message to validate stale clicks"""
-        self._expected_phase_for_buttons[message_id] = expected_phase
-        logger.debug(f"Registered button message {message_id} for phase {expected_phase.value}")
-    
-    def validate_button_phase(self, message_id: int) -> bool:
-        """Validate that button click is for current phase (not stale)"""
-        expected = self._expected_phase_for_buttons.get(message_id)
-        if expected is None:
-            # No registration means it's an old button or invalid
-            logger.warning(f"Button message {message_id} not registered")
-            return False
-        
-        if expected != self.phase:
-            logger.warning(f"Stale button click: expected {expected.value}, current {self.phase.value}")
-            return False
-        
-        return True
+    def advance_phase_epoch(self) -> int:
+        """Start a new button epoch; buttons stamped with an older epoch become stale"""
+        self.phase_epoch += 1
+        self.keyboard_cache.clear()
+        logger.debug(f"Game {self.group_id} entered phase epoch {self.phase_epoch} ({self.phase.value})")
+        return self.phase_epoch
     
-    def cleanup_old_button_registrations(self):
-        """Remove button registrations that are no longer relevant"""
-        # Keep only registrations for current phase
-        to_remove = [msg_id for msg_id, phase in self._expected_phase_for_buttons.items() 
-                     if phase != self.phase]
-        for msg_id in to_remove:
-            del self._expected_phase_for_buttons[msg_id]
-        if to_remove:
-            logger.debug(f"Cleaned up {len(to_remove)} old button registrations")
+    def is_stale_epoch(self, epoch: Optional[int]) -> bool:
+        """Check a button's stamped epoch against the current one (unstamped buttons pass)"""
+        return epoch is not None and epoch != self.phase_epoch
 
     def check_win_condition(self) -> Optional[Team]:
         if hasattr(self, 'waiting_for_hunter') and self.waiting_for_hunter:
             logger.info("Skipping win condition check - waiting for Hunter revenge")
             return None
-        alive_players = self.get_alive_players()
     
-        if not alive_players:
+        if not self._alive:
             return Team.VILLAGER
     
-        villager_count = 0
-        wolf_count = 0
-        fire_count = 0
-        serial_killer_count = 0
-        neutral_count = 0
-    
-        for player in alive_players:
-            if not player.role:
-                continue
-           
-            try:
-                team = player.role.team
-                if isinstance(team, str):
-                    team = Team[team.upper()]
-            except (AttributeError, KeyError):
-                logger.error(f"Invalid team for player {player.first_name}: {player.role}")
-        
-            if player.role.team == Team.VILLAGER:
-                villager_count += 1
-            elif player.role.team == Team.WOLF:
-                wolf_count += 1
-            elif player.role.team == Team.FIRE:
-                fire_count += 1
-            elif player.role.team == Team.KILLER:
-                serial_killer_count += 1
-            elif player.role.team == Team.NEUTRAL:
-                neutral_count += 1
+        villager_count = len(self._alive_by_team[Team.VILLAGER])
+        wolf_count = len(self._alive_by_team[Team.WOLF])
+        fire_count = len(self._alive_by_team[Team.FIRE])
+        serial_killer_count = len(self._alive_by_team[Team.KILLER])
+        neutral_count = len(self._alive_by_team[Team.NEUTRAL])
     
         if serial_killer_count > 0 and villager_count == 0 and wolf_count == 0 and fire_count == 0:
             return Team.KILLER
     
-        for player in alive_players:
-            if player.role == Role.JESTER and getattr(player, 'achieved_objective', False):
-                return Team.NEUTRAL
-        
-            if player.role == Role.EXECUTIONER and getattr(player, 'achieved_objective', False):
-                return Team.NEUTRAL
+        for role in (Role.JESTER, Role.EXECUTIONER):
+            for player in self._alive_by_role.get(role, {}).values():
+                if player.achieved_objective:
+                    return Team.NEUTRAL
     
         evil_count = wolf_count + fire_count + serial_killer_count
         if villager_count > 0 and evil_count == 0:
@@ -271,4 +476,37 @@ class Game:
 # Global game storage
 active_games: Dict[int, Game] = {}
 
+# Reverse index: user_id -> group_id of the game the user is playing in
+player_game_index: Dict[int, int] = {}
+
+def get_game_for_player(user_id: int) -> Optional[Game]:
+    """Find the active game a user is playing in (O(1) via player_game_index)"""
+    group_id = player_game_index.get(user_id)
+    if group_id is None:
+        return None
+    
+    game = active_games.get(group_id)
+    if not game or user_id not in game.players:
+        # Stale entry left behind by a game that was torn down elsewhere
+        player_game_index.pop(user_id, None)
+        return None
+    return game
+
+def remove_game(group_id: int) -> Optional[Game]:
+    """Remove a game from active_games and drop its players from the reverse index"""
+    game = active_games.pop(group_id, None)
+    if game:
+        for user_id in game.players:
+            if player_game_index.get(user_id) == group_id:
+                del player_game_index[user_id]
+        logger.info(f"Removed game {group_id} and {len(game.players)} player index entries")
+        
+        # Finished or aborted, the game's buffered action counters go out in one write
+        from ranking import ranking_manager, action_tracker
+        ranking_manager.db.submit_write(action_tracker.flush, list(game.players))
+        
+        from snapshots import snapshot_store
+        snapshot_store.delete(group_id)
+    return game
+
 logger.info("Game module loaded successfully")
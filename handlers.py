@@ -6,13 +6,15 @@ from telegram.ext import MessageHandler, filters
 import re
 import asyncio
 import random
-from typing import List
+from typing import Optional
 from datetime import datetime
-from game import active_games, Game, GamePhase, Player, Team, Role
-from roles import assign_roles, get_role_action_buttons, get_voting_buttons
+from game import active_games, get_game_for_player, remove_game, Game, GamePhase, Player, Team, Role
+from enums import ActionType
+from roles import assign_roles, get_voting_buttons
 from mechanics import (
     start_night_phase, start_day_phase, start_voting_phase,
-    process_voting_results, send_role_assignments, player_has_pending_action, kill_player, send_gif_message, end_game
+    process_voting_results, send_role_assignments, player_has_pending_action, kill_player, send_gif_message, end_game,
+    schedule_phase_deadline, cancel_phase_deadline, players_with_pending_action
 )
 from custom_game_handler import (
     custom_game_command,
@@ -30,6 +32,9 @@ from ranking import (
     get_player_quick_stats
 )
 
+from config import MAX_CONCURRENT_TRANSITIONS, DEADLINE_RETRY_SECONDS
+from callbacks import CallbackPayload, callback_router, decode_callback, stamp_keyboard
+
 logger = logging.getLogger(__name__)
 
 def escape_markdown_v2(text: str) -> str:
@@ -238,8 +243,7 @@ async def auto_start_game(context: ContextTypes.DEFAULT_TYPE):
         )
         
         # Terminate the game
-        # Terminate the game
-        del active_games[chat_id]
+        remove_game(chat_id)
 
 # Clean up any custom game config
         from custom_game_handler import custom_game_configs
@@ -279,7 +283,7 @@ async def auto_start_game(context: ContextTypes.DEFAULT_TYPE):
             text="❌ Failed to assign roles. Game cancelled.",
             parse_mode='Markdown'
         )
-        del active_games[chat_id]
+        remove_game(chat_id)
         return
     
     game.phase = GamePhase.NIGHT
@@ -890,7 +894,7 @@ async def end_game_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         from mechanics import cleanup_game_buttons
         await cleanup_game_buttons(context, game)
     
-        del active_games[chat.id]
+        remove_game(chat.id)
         await cleanup_custom_game(chat.id)
 
     # FIX: Use correct variable name
@@ -1253,11 +1257,9 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
     await query.answer()
     user = query.from_user
     data = query.data
-    parts = data.split('_')
     doused_targets = []
 
     logger.info(f"📞 CALLBACK DEBUG: Received data: '{data}' from {user.first_name}")
-    logger.info(f"📞 CALLBACK DEBUG: Parts after split: {parts}")
 
     # ============================================================================
     # EARLY ROUTING (no game required)
@@ -1284,11 +1286,7 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
     # ============================================================================
     # GAME & PLAYER VALIDATION
     # ============================================================================
-    game = None
-    for g in active_games.values():
-        if user.id in g.players:
-            game = g
-            break
+    game = get_game_for_player(user.id)
     
     if not game:
         await query.edit_message_text("You are not in a game.")
@@ -1303,166 +1301,38 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
     # ============================================================================
     # ✅ NEW: PHASE TRANSITION GUARD
     # ============================================================================
+    # Only set while phase/epoch/per-phase flags are swapped; announcements and menus go out after it clears
     if game.is_transitioning():
-        await query.edit_message_text(
-            "⏳ The game is transitioning between phases. Please wait a moment..."
+        # Reply instead of editing so the freshly sent action menu keeps its buttons
+        await query.message.reply_text(
+            "⏳ The game is transitioning between phases. Please tap again in a moment..."
         )
         logger.info(f"Blocked callback from {user.first_name} during phase transition")
         return
 
     # ============================================================================
-    # ✅ NEW: BUTTON PHASE VALIDATION (prevent stale clicks)
+    # BUTTON EPOCH VALIDATION (prevent stale clicks)
     # ============================================================================
-    if hasattr(player, 'last_action_message_id') and player.last_action_message_id:
-        # Check if this button is from the current phase
-        if query.message and query.message.message_id == player.last_action_message_id:
-            if not game.validate_button_phase(player.last_action_message_id):
-                await query.edit_message_text(
-                    "⏰ This action is no longer available.\n"
-                    "The game phase has changed since this button was sent."
-                )
-                logger.warning(
-                    f"Rejected stale button click from {user.first_name} "
-                    f"(message {player.last_action_message_id})"
-                )
-                return
+    payload = decode_callback(data)
+    if game.is_stale_epoch(payload.epoch):
+        await query.edit_message_text(
+            "⏰ This action is no longer available.\n"
+            "The game phase has changed since this button was sent."
+        )
+        logger.warning(
+            f"Rejected stale button click from {user.first_name} "
+            f"(epoch {payload.epoch}, current {game.phase_epoch})"
+        )
+        return
 
     # ============================================================================
-    # EXISTING ACTION ROUTING (unchanged)
+    # ACTION ROUTING (see CALLBACK ROUTES near the end of this module)
     # ============================================================================
-    action = parts[0]
+    handler = callback_router.resolve(payload.action)
 
     try:
-        if action == "wolf" and parts[1] == "hunt":
-            await handle_wolf_hunt(query, context, game, player, parts)
-        elif action == "arsonist" and parts[1] == "ignite":
-            await handle_arsonist_ignite(query, context, game, player, parts)
-        elif action == "arsonist" and parts[1] == "douse":
-            await handle_arsonist_douse(query, context, game, player, parts)
-        elif data == "fire_starter_block_menu":  
-            await handle_fire_starter_block_menu(query, context, game, player)
-        elif data == "accelerant_expert_use":
-            await handle_accelerant_expert_use(query, context, game, player, parts)
-        elif data == "accelerant_expert_skip":
-            player.has_acted = True
-            await query.edit_message_text("You have skipped using your accelerant.")
-        elif action == "serial" and parts[1] == "killer" and parts[2] == "kill":
-            await handle_serial_killer_kill(query, context, game, player, parts)
-        elif data == "serial_killer_skip":
-            player.has_acted = True
-            await query.edit_message_text("You chose not to kill anyone tonight.")      
-        elif data == "fire_starter_ignite":
-            await handle_fire_team_ignite(query, context, game, player, "fire_starter")
-        elif data == "accelerant_expert_ignite":
-            await handle_fire_team_ignite(query, context, game, player, "accelerant_expert")
-        elif data.startswith("arsonist_douse_second_"):
-            await handle_arsonist_douse_second_choice(query, context, game, player, parts)
-        elif data.startswith("arsonist_douse_third_"):
-            await handle_arsonist_douse_third_choice(query, context, game, player, parts)
-        elif data == "fire_starter_action_choice":
-            await handle_fire_starter_action_choice(query, context, game, player)
-        elif data == "fire_starter_action_douse":
-            await handle_fire_starter_douse_menu(query, context, game, player)
-        elif data.startswith("fire_starter_douse_"):
-            await handle_fire_starter_douse_choice(query, context, game, player, parts)
-        elif data == "fire_starter_skip":
-            player.has_acted = True
-            await query.edit_message_text("You have skipped your action.")
-        elif data.startswith("fire_starter_block_"):
-            await handle_fire_starter_block(query, context, game, player, parts)
-        elif data == "fire_starter_action_block": 
-            await handle_fire_starter_block_menu(query, context, game, player)
-        elif data == "fire_starter_block_skip": 
-            player.has_acted = True
-            await query.edit_message_text("You chose not to block anyone tonight.")
-        elif action == "shaman" and parts[1] == "block":
-            await handle_shaman_block(query, context, game, player, parts)
-        elif action == "seer" and parts[1] == "check":
-            await handle_seer_check(query, context, game, player, parts)
-        elif action == "doctor" and parts[1] == "heal":
-            await handle_doctor_heal(query, context, game, player, parts)
-        elif data == "witch_heal_menu":
-            await handle_witch_heal_menu(query, context, game, player)
-        elif data == "witch_poison_menu":
-            await handle_witch_poison_menu(query, context, game, player)
-        elif data == "witch_heal_skip":
-            player.has_acted = True
-            await query.edit_message_text("You chose not to use your heal potion.")
-        elif data == "witch_poison_skip":
-            player.has_acted = True
-            await query.edit_message_text("You chose not to use your poison.")
-        elif data.startswith("witch_heal_") and data != "witch_heal_menu":
-            await handle_witch_heal_choice(query, context, game, player, parts)
-        elif data.startswith("witch_poison_") and data != "witch_poison_menu":
-            await handle_witch_poison_choice(query, context, game, player, parts)
-        elif data.startswith("grave_robber_borrow_"):
-            await handle_grave_robber_borrow(query, context, game, player, parts)
-        elif data == "grave_robber_skip_borrow":
-            player.has_acted = True
-            await query.edit_message_text("You chose not to borrow any role tonight.")
-        elif data == "plague_doctor_skip":
-            player.has_acted = True
-            await query.edit_message_text("You chose not to infect anyone tonight.")
-            return
-        elif data.startswith("cupid_choose_"):
-            await handle_cupid_choose(query, context, game, player, parts)
-        elif data.startswith("doppelganger_choose_"):
-            await handle_doppelganger_choose(query, context, game, player, parts)
-        elif data.startswith("plague_doctor_infect_"):
-            parts = data.split("_")
-            if len(parts) == 4 and parts[3].isdigit():
-                await handle_plague_doctor_infect(query, context, game, player, parts)
-            else:
-                await query.edit_message_text("Invalid infection selection.")
-        elif action == "bodyguard" and parts[1] == "protect":
-            await handle_bodyguard_protect(query, context, game, player, parts)
-        elif action == "priest" and parts[1] == "bless":
-            await handle_priest_bless(query, context, game, player, parts)
-        elif action == "vigilante" and parts[1] == "kill":
-            await handle_vigilante_kill(query, context, game, player, parts)
-        elif action == "vote":
-            await handle_vote(query, context, game, player, parts)
-        elif action == "detective" and parts[1] == "check":
-            await handle_detective_check(query, context, game, player, parts)
-        elif action == "detective" and parts[1] == "check" and parts[2] == "skip":
-            player.detective_acted_today = True
-            await query.edit_message_text("You chose not to investigate anyone today.")
-        elif action == "oracle" and parts[1] == "check":
-            await handle_oracle_check(query, context, game, player, parts)
-        elif action == "hunter" and parts[1] == "shoot":
-            await handle_hunter_shoot(query, context, game, player, parts)
-        elif data == "doctor_heal_skip":
-            player.has_acted = True
-            await query.edit_message_text("You chose not to heal anyone tonight.")
-        elif data == "bodyguard_protect_skip":
-            player.has_acted = True
-            await query.edit_message_text("You chose not to guard anyone tonight.")
-        elif data == "priest_bless_skip":
-            player.has_acted = True
-            await query.edit_message_text("You chose not to bless anyone tonight.")
-        elif data.startswith("webkeeper_mark_"):
-            await handle_webkeeper_mark(query, context, game, player, parts)
-        elif data == "webkeeper_skip":
-            player.has_acted = True
-            await query.edit_message_text("You chose not to mark anyone tonight.")
-        elif data.startswith("stray_observe_"):
-            await handle_stray_observe(query, context, game, player, parts)
-        elif data == "stray_skip":
-            player.has_acted = True
-            await query.edit_message_text("You chose not to observe anyone tonight.")
-        elif data == "reveal_mayor":
-            if player.role == Role.MAYOR and not player.is_mayor_revealed:
-                player.is_mayor_revealed = True
-                await context.bot.send_message(
-                    chat_id=game.group_id,
-                    text=f"👑 {player.mention} has revealed themselves as the **Mayor**!\nTheir vote now counts **double** in lynching decisions.",
-                    parse_mode='Markdown'
-                )
-                await query.edit_message_text(
-                    "👑 You have revealed yourself as Mayor!\nYour vote now counts double."
-                )
-            else:
-                await query.edit_message_text("You cannot reveal mayor status.")
+        if handler:
+            await handler(query, context, game, player, payload)
         else:
             await query.edit_message_text(f"Unknown action: {data}")
     except Exception as e:
@@ -1473,8 +1343,7 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
 
 
 def has_night_action(player: Player, game: Game) -> bool:
-    buttons = get_role_action_buttons(player, game, game.phase)
-    return bool(buttons)
+    return player_has_pending_action(player, game)
 
 def log_insomniac_visit(visitor: Player, target: Player, logger):
     """Log a visit to track for Insomniac and Plague Doctor mechanics"""
@@ -1482,14 +1351,8 @@ def log_insomniac_visit(visitor: Player, target: Player, logger):
         return False
     
     # Track who visited the target
-    if not hasattr(target, 'night_visits'):
-        logger.warning(f"Initializing missing night_visits for {target.first_name}")
-        target.night_visits = []
     
     # Track who the visitor visited (NEW)
-    if not hasattr(visitor, 'visited_players'):
-        logger.warning(f"Initializing missing visited_players for {visitor.first_name}")
-        visitor.visited_players = []
     
     if visitor.user_id not in target.night_visits:
         target.night_visits.append(visitor.user_id)
@@ -1498,7 +1361,7 @@ def log_insomniac_visit(visitor: Player, target: Player, logger):
         if target.role == Role.INSOMNIAC:
             logger.debug(f"Logged Insomniac visit: {visitor.first_name} -> {target.first_name}")
         
-        if getattr(target, 'is_plagued', False):
+        if target.is_plagued:
             logger.debug(f"Logged plague visit: {visitor.first_name} -> plagued {target.first_name}")
         
         return True
@@ -1506,12 +1369,12 @@ def log_insomniac_visit(visitor: Player, target: Player, logger):
     return False
 
 
-async def handle_seer_check(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: List[str]):
-    if len(parts) < 3:
+async def handle_seer_check(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
+    if payload.target is None:
         await query.edit_message_text("Invalid selection.")
         return
     try:
-        target_id = int(parts[2])
+        target_id = payload.target
         target_player = game.players.get(target_id)
         if not target_player or not target_player.is_alive:
             await query.edit_message_text("Invalid target for checking.")
@@ -1519,30 +1382,30 @@ async def handle_seer_check(query: CallbackQuery, context: ContextTypes.DEFAULT_
         log_insomniac_visit(player, target_player, logger)        
         await query.edit_message_text(f"🔮 You focus your vision on {target_player.first_name}...\n\nYour vision will come at dawn.")
         player.has_acted = True
-        game.night_actions[f"seer_{player.user_id}"] = {"actor": player.user_id, "target": target_id}
+        game.night_actions.set(ActionType.SEER, player.user_id, target_id)
         logger.info(f"Seer {player.first_name} checked {target_player.first_name} in game {game.group_id}")
     except Exception as e:
         logger.error(f"handle_seer_check error: {e}")
         await query.edit_message_text("An error occurred during checking.")
 
-async def handle_vigilante_kill(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: List[str]):
-    if len(parts) < 3:
+async def handle_vigilante_kill(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
+    if payload.target is None and not payload.is_skip:
         await query.edit_message_text("Invalid vigilante kill selection.")
         return
     try:
-        if parts[2] == "skip":
-            game.night_actions.pop(f"vigilante_kill_{player.user_id}", None)
+        if payload.is_skip:
+            game.night_actions.remove(ActionType.VIGILANTE_KILL, player.user_id)
             await query.edit_message_text("You chose to skip the vigilante kill.")
             player.has_acted = True
             return
-        target_id = int(parts[2])
+        target_id = payload.target
         target_player = game.players.get(target_id)
         if not target_player or not target_player.is_alive:
             await query.edit_message_text("Invalid target selected.")
             return
         log_insomniac_visit(player, target_player, logger)
 
-        game.night_actions[f"vigilante_kill_{player.user_id}"] = {"actor": player.user_id, "target": target_id}
+        game.night_actions.set(ActionType.VIGILANTE_KILL, player.user_id, target_id)
         await query.edit_message_text(f"You chose to kill {target_player.first_name}.")
         player.has_acted = True
         logger.info(f"Vigilante {player.user_id} chose to kill {target_id}")
@@ -1550,8 +1413,8 @@ async def handle_vigilante_kill(query: CallbackQuery, context: ContextTypes.DEFA
         logger.error(f"handle_vigilante_kill error: {e}")
         await query.edit_message_text("An error occurred while processing the vigilante kill.")
 
-async def handle_priest_bless(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: list):
-    if len(parts) < 3:
+async def handle_priest_bless(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
+    if payload.target is None:
         await query.edit_message_text("Invalid blessing selection.")
         return
 
@@ -1561,7 +1424,7 @@ async def handle_priest_bless(query: CallbackQuery, context: ContextTypes.DEFAUL
             await query.edit_message_text("You cannot perform this action.")
             return
 
-        target_id = int(parts[2])
+        target_id = payload.target
         target_player = game.players.get(target_id)
 
         if not target_player or not target_player.is_alive:
@@ -1570,7 +1433,7 @@ async def handle_priest_bless(query: CallbackQuery, context: ContextTypes.DEFAUL
         log_insomniac_visit(player, target_player, logger)
 
         # Save blessing action (to be processed in night resolution)
-        game.night_actions[f"priest_{player.user_id}"] = {"actor": player.user_id, "target": target_id}
+        game.night_actions.set(ActionType.PRIEST, player.user_id, target_id)
 
         # Inform priest
         await query.edit_message_text(f"You have chosen to bless {target_player.first_name}.")
@@ -1582,25 +1445,25 @@ async def handle_priest_bless(query: CallbackQuery, context: ContextTypes.DEFAUL
         logger.error(f"Error handling priest bless: {e}")
         await query.edit_message_text("An error occurred processing your blessing.")
 
-async def handle_wolf_hunt(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: List[str]):
-    if len(parts) < 3:
+async def handle_wolf_hunt(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
+    if payload.target is None and not payload.is_skip:
         await query.edit_message_text("Invalid hunt selection.")
         return
     try:
-        if parts[2] == "skip":
-            game.night_actions[f"wolf_hunt_{player.user_id}"] = {"actor": player.user_id, "target": None}
+        if payload.is_skip:
+            game.night_actions.set(ActionType.WOLF_HUNT, player.user_id, None)
             await query.edit_message_text("You skipped the hunt.")
             player.has_acted = True
             await notify_universal_action(context, game, player, "skipped the hunt")
             return
-        target_id = int(parts[2])
+        target_id = payload.target
         target_player = game.players.get(target_id)
         if not target_player or not target_player.is_alive:
             await query.edit_message_text("Invalid hunt target.")
             player.has_acted = True
             return
         log_insomniac_visit(player, target_player, logger)
-        game.night_actions[f"wolf_hunt_{player.user_id}"] = {"actor": player.user_id, "target": target_id}
+        game.night_actions.set(ActionType.WOLF_HUNT, player.user_id, target_id)
         
         from config import ACTION_GIFS
         from mechanics import send_gif_message
@@ -1621,8 +1484,8 @@ async def handle_wolf_hunt(query: CallbackQuery, context: ContextTypes.DEFAULT_T
         logger.error(f"handle_wolf_hunt error: {e}")
         await query.edit_message_text("An error occurred during hunting.")
 
-async def handle_shaman_block(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: list):
-    if len(parts) < 3:
+async def handle_shaman_block(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
+    if payload.target is None:
         await query.answer("Invalid selection.")
         return
 
@@ -1632,7 +1495,7 @@ async def handle_shaman_block(query: CallbackQuery, context: ContextTypes.DEFAUL
         return
 
     try:
-        target_id = int(parts[2])
+        target_id = payload.target
         target_player = game.players.get(target_id)
         # Check target validity
         if not target_player or not target_player.is_alive:
@@ -1642,7 +1505,7 @@ async def handle_shaman_block(query: CallbackQuery, context: ContextTypes.DEFAUL
         log_insomniac_visit(player, target_player, logger)
 
         # Register block action if not already blocked or blocked by other effects
-        game.night_actions[f"shaman_block_{player.user_id}"] = {"actor": player.user_id, "target": target_id}
+        game.night_actions.set(ActionType.SHAMAN_BLOCK, player.user_id, target_id)
         
         # Mark player as having acted this phase - prevents timeout penalties
         player.has_acted = True
@@ -1657,7 +1520,7 @@ async def handle_shaman_block(query: CallbackQuery, context: ContextTypes.DEFAUL
         logger.error(f"Error in shaman_block handler: {e}")
         await query.answer("An error occurred processing your selection.")
 
-async def handle_cupid_choose(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: List[str]):
+async def handle_cupid_choose(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
     """Handle Cupid choosing lovers"""
     if player.role != Role.CUPID or not player.is_alive:
         await query.edit_message_text("You cannot perform this action.")
@@ -1667,7 +1530,7 @@ async def handle_cupid_choose(query: CallbackQuery, context: ContextTypes.DEFAUL
     # (removed: if game.day_number != 1: ...)
     
     try:
-        chosen_id = int(parts[2])
+        chosen_id = payload.target
         chosen_player = game.players.get(chosen_id)
         
         if not chosen_player or not chosen_player.is_alive:
@@ -1693,7 +1556,7 @@ async def handle_cupid_choose(query: CallbackQuery, context: ContextTypes.DEFAUL
             await query.edit_message_text(
                 f"You chose {chosen_player.first_name} as the first lover.\n"
                 f"Now choose the second lover:",
-                reply_markup=InlineKeyboardMarkup(buttons)
+                reply_markup=stamp_keyboard(InlineKeyboardMarkup(buttons), game.phase_epoch)
             )
         
         # Second lover chosen
@@ -1745,8 +1608,8 @@ async def handle_cupid_choose(query: CallbackQuery, context: ContextTypes.DEFAUL
         logger.error(f"handle_cupid_choose error: {e}")
         await query.edit_message_text("An error occurred.")
 
-async def handle_arsonist_douse(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: list):
-    if len(parts) < 3:
+async def handle_arsonist_douse(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
+    if payload.target is None and not payload.is_skip:
         await query.edit_message_text("Invalid selection.")
         player.has_acted = True
         return
@@ -1756,9 +1619,7 @@ async def handle_arsonist_douse(query: CallbackQuery, context: ContextTypes.DEFA
             await query.edit_message_text("You cannot perform this action.")
             return
 
-        target_str = parts[2]
-        
-        if target_str == "skip":
+        if payload.is_skip:
     # FIXED: Reset douse tracking when skipping
             player.has_acted = True
             player.douse_count_tonight = 0  # ADD THIS
@@ -1767,21 +1628,20 @@ async def handle_arsonist_douse(query: CallbackQuery, context: ContextTypes.DEFA
             await query.edit_message_text("You chose not to douse anyone tonight.")
             return
 
-        target_id = int(target_str)
+        target_id = payload.target
         target_player = game.players.get(target_id)
         log_insomniac_visit(player, target_player, logger)
         if not target_player or not target_player.is_alive:
             await query.edit_message_text("Invalid target for dousing.")
             return
 
-        if getattr(target_player, 'is_doused', False):
+        if target_player.is_doused:
             await query.edit_message_text(f"{target_player.first_name} is already doused.")
             return
 
         # Record the douse
         player.douse_count_tonight += 1
-        douse_key = f"arsonist_douse_{player.user_id}_{player.douse_count_tonight}"
-        game.night_actions[douse_key] = {"actor": player.user_id, "target": target_id}
+        game.night_actions.add(ActionType.ARSONIST_DOUSE, player.user_id, target_id, number=player.douse_count_tonight)
         target_player.is_doused = True
         
         log_insomniac_visit(player, target_player, logger)
@@ -1795,8 +1655,7 @@ async def handle_arsonist_douse(query: CallbackQuery, context: ContextTypes.DEFA
         else:
             # All douses completed
             player.has_acted = True
-            if hasattr(player, 'accelerant_boost_next_night'):
-                player.accelerant_boost_next_night = False
+            player.accelerant_boost_next_night = False
             
             total_doused = player.douse_count_tonight
             await query.edit_message_text(f"🔥 You have completed all {total_doused} douses tonight!")
@@ -1809,24 +1668,19 @@ async def send_next_arsonist_douse_menu(query: CallbackQuery, context: ContextTy
     """Send the next douse selection menu"""
     
     # Get already doused targets from night actions
-    doused_targets = set()
-    for i in range(1, player.douse_count_tonight + 1):
-        action_key = f"arsonist_douse_{i}"
-        if action_key in game.night_actions:
-            doused_targets.add(game.night_actions[action_key]["target"])
+    doused_targets = {action.target for action in game.night_actions.by_actor(player.user_id, ActionType.ARSONIST_DOUSE)}
     
     # Get available targets (alive, not already doused, not self)
     available_targets = [
         p for p in game.get_alive_players() 
         if p.user_id != player.user_id 
         and p.user_id not in doused_targets 
-        and not getattr(p, 'is_doused', False)
+        and not p.is_doused
     ]
     
     if not available_targets:
         player.has_acted = True
-        if hasattr(player, 'accelerant_boost_next_night'):
-            player.accelerant_boost_next_night = False
+        player.accelerant_boost_next_night = False
         await query.edit_message_text("No more valid targets to douse.")
         return
     
@@ -1841,7 +1695,7 @@ async def send_next_arsonist_douse_menu(query: CallbackQuery, context: ContextTy
     await query.edit_message_text(
         f"🔥 Choose your {next_douse_num}{get_ordinal_suffix(next_douse_num)} douse target:\n"
         f"({player.douse_count_tonight}/{player.max_douses_tonight} completed)",
-        reply_markup=InlineKeyboardMarkup(buttons)
+        reply_markup=stamp_keyboard(InlineKeyboardMarkup(buttons), game.phase_epoch)
     )
 
 def get_ordinal_suffix(num: int) -> str:
@@ -1853,13 +1707,7 @@ def get_ordinal_suffix(num: int) -> str:
     return suffix
 
 
-async def handle_arsonist_ignite(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: list):
-    # Validate input (expect ['arsonist', 'ignite'])
-    if len(parts) < 2:
-        await query.edit_message_text("Invalid ignite command.")
-        player.has_acted = True
-        return
-
+async def handle_arsonist_ignite(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
     try:
         # Verify the player is alive and Arsonist
         if player.role != Role.ARSONIST or not player.is_alive:
@@ -1867,7 +1715,7 @@ async def handle_arsonist_ignite(query: CallbackQuery, context: ContextTypes.DEF
             return
 
         # Record the ignite action
-        game.night_actions[f"arsonist_ignite_{player.user_id}"] = {"actor": player.user_id}
+        game.night_actions.set(ActionType.IGNITE, player.user_id, role_type="arsonist")
 
         # Mark the game as ignited to process deaths in night actions
         game.arsonist_ignited = True
@@ -1889,7 +1737,7 @@ async def handle_fire_starter_action_choice(query: CallbackQuery, context: Conte
     
     await query.edit_message_text(
         "🔥 Choose your night action:",
-        reply_markup=InlineKeyboardMarkup(buttons)
+        reply_markup=stamp_keyboard(InlineKeyboardMarkup(buttons), game.phase_epoch)
     )
 
 async def handle_fire_starter_douse_menu(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player):
@@ -1901,30 +1749,27 @@ async def handle_fire_starter_douse_menu(query: CallbackQuery, context: ContextT
     buttons.append([InlineKeyboardButton("❌ Skip Dousing", callback_data="fire_starter_douse_skip")])
     await query.edit_message_text(
         "Select a player to douse or skip:",
-        reply_markup=InlineKeyboardMarkup(buttons)
+        reply_markup=stamp_keyboard(InlineKeyboardMarkup(buttons), game.phase_epoch)
     )
 
-async def handle_fire_starter_douse_choice(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: List[str]):
-    logger.info(f"🔥 FIRE STARTER DEBUG: Called with parts: {parts}")
+async def handle_fire_starter_douse_choice(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
+    logger.info(f"🔥 FIRE STARTER DEBUG: Called with payload: {payload}")
     logger.info(f"🔥 FIRE STARTER DEBUG: Player role: {player.role}, alive: {player.is_alive}")
     
-    if len(parts) < 4:
-        logger.error(f"❌ FIRE STARTER: Invalid parts length: {len(parts)}")
+    if payload.target is None and not payload.is_skip:
+        logger.error(f"❌ FIRE STARTER: No target in {payload}")
         await query.edit_message_text("Invalid selection.")
         return
 
-    target_str = parts[3]
-    logger.info(f"🔥 FIRE STARTER: Target string: '{target_str}'")
-    
-    if target_str == "skip":
-        game.night_actions.pop(f"fire_starter_douse_{player.user_id}", None)
+    if payload.is_skip:
+        game.night_actions.remove(ActionType.FIRE_STARTER_DOUSE, player.user_id)
         player.has_acted = True
         await notify_universal_action(context, game, player, "skipped dousing")
         await query.edit_message_text("You chose not to douse anyone tonight.")
         return
 
     try:
-        target_id = int(target_str)
+        target_id = payload.target
         logger.info(f"🔥 FIRE STARTER: Target ID: {target_id}")
         target_player = game.players.get(target_id)
         log_insomniac_visit(player, target_player, logger)
@@ -1943,9 +1788,6 @@ async def handle_fire_starter_douse_choice(query: CallbackQuery, context: Contex
             return
             
         # Initialize is_doused if missing
-        if not hasattr(target_player, 'is_doused'):
-            logger.warning(f"⚠️ FIRE STARTER: Initializing missing is_doused for {target_player.first_name}")
-            target_player.is_doused = False
             
         logger.info(f"🔥 FIRE STARTER: Target is_doused: {target_player.is_doused}")
             
@@ -1955,23 +1797,20 @@ async def handle_fire_starter_douse_choice(query: CallbackQuery, context: Contex
             return
 
         # Record the action
-        game.night_actions[f"fire_starter_douse_{player.user_id}"] = {"actor": player.user_id, "target": target_id}
+        game.night_actions.set(ActionType.FIRE_STARTER_DOUSE, player.user_id, target_id)
         await query.edit_message_text(f"You have chosen to douse {target_player.first_name}.")
         player.has_acted = True
         
         logger.info(f"✅ FIRE STARTER: Successfully doused {target_player.first_name}")
 
-    except ValueError as e:
-        logger.error(f"❌ FIRE STARTER: Cannot convert '{target_str}' to int: {e}")
-        await query.edit_message_text("Invalid player ID.")
     except Exception as e:
         logger.error(f"❌ FIRE STARTER: Unexpected error: {e}")
         import traceback
         traceback.print_exc()
         await query.edit_message_text("An error occurred processing your douse choice.")
 
-async def handle_fire_starter_block(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: list):
-    if len(parts) < 4:  # ✅ Changed from < 3 to < 4
+async def handle_fire_starter_block(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
+    if payload.target is None:
         await query.edit_message_text("Invalid selection.")
         player.has_acted = True
         return
@@ -1981,7 +1820,7 @@ async def handle_fire_starter_block(query: CallbackQuery, context: ContextTypes.
         return
 
     try:
-        target_id = int(parts[3]) 
+        target_id = payload.target
         target_player = game.players.get(target_id)
 
         if not target_player or not target_player.is_alive:
@@ -1990,7 +1829,7 @@ async def handle_fire_starter_block(query: CallbackQuery, context: ContextTypes.
             return
 
         # Register block action
-        game.night_actions[f"fire_starter_block_{player.user_id}"] = {"actor": player.user_id, "target": target_id}
+        game.night_actions.set(ActionType.FIRE_STARTER_BLOCK, player.user_id, target_id)
         player.has_acted = True
 
         await query.edit_message_text(f"You have chosen to block {target_player.first_name} tonight.")
@@ -2002,13 +1841,13 @@ async def handle_fire_starter_block(query: CallbackQuery, context: ContextTypes.
         logger.error(f"handle_fire_starter_block error: {e}")
         await query.edit_message_text("An error occurred processing your action.")
 
-async def handle_serial_killer_kill(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: List[str]):
-    if len(parts) < 4:
+async def handle_serial_killer_kill(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
+    if payload.target is None:
         await query.edit_message_text("Invalid selection.")
         return
 
     try:
-        target_id = int(parts[3])
+        target_id = payload.target
         target_player = game.players.get(target_id)
         
         if not target_player or not target_player.is_alive:
@@ -2017,7 +1856,7 @@ async def handle_serial_killer_kill(query: CallbackQuery, context: ContextTypes.
 
         log_insomniac_visit(player, target_player, logger)
         
-        game.night_actions[f"serial_killer_kill_{player.user_id}"] = {"actor": player.user_id, "target": target_id}
+        game.night_actions.set(ActionType.SERIAL_KILLER_KILL, player.user_id, target_id)
         await query.edit_message_text(f"You have chosen to kill {target_player.first_name}.")
         player.has_acted = True
         
@@ -2029,7 +1868,7 @@ async def handle_serial_killer_kill(query: CallbackQuery, context: ContextTypes.
 async def handle_fire_team_ignite(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, role_type: str):
     """Handle ignite action from any fire team member"""
     try:
-        game.night_actions[f"{role_type}_ignite_{player.user_id}"] = {"actor": player.user_id}
+        game.night_actions.set(ActionType.IGNITE, player.user_id, role_type=role_type)
         game.arsonist_ignited = True
         
         await query.edit_message_text("🔥 You have ignited the fire! All doused players will burn tonight.")
@@ -2040,8 +1879,8 @@ async def handle_fire_team_ignite(query: CallbackQuery, context: ContextTypes.DE
         logger.error(f"handle_fire_team_ignite error: {e}")
         await query.edit_message_text("An error occurred.")
 
-async def handle_accelerant_expert_use(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: List[str]):
-    if getattr(player, "accelerant_used", False):
+async def handle_accelerant_expert_use(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
+    if player.accelerant_used:
         await query.edit_message_text("You have already used your accelerant.")
         return
 
@@ -2059,31 +1898,30 @@ async def handle_accelerant_expert_use(query: CallbackQuery, context: ContextTyp
         arsonist.accelerant_boost_next_night = True
         arsonist.max_douses_tonight = 1  # Reset until next night
         
-    game.night_actions[f"accelerant_expert_used_{player.user_id}"] = {"actor": player.user_id}
+    game.night_actions.set(ActionType.ACCELERANT_BOOST, player.user_id)
     await query.edit_message_text("💨 Accelerant activated! Arsonist can make 3 douses next night.")
 
-async def handle_arsonist_douse_second_choice(query, context, game, player, parts):
+async def handle_arsonist_douse_second_choice(query, context, game, player, payload: CallbackPayload):
     doused_targets = []
-    if len(parts) < 3:
+    if payload.target is None and not payload.is_skip:
         await query.edit_message_text("Invalid selection.")
         return
 
-    selection = parts[2]
-    if selection == "skip":
-        game.night_actions.pop("arsonist_douse_second", None)
+    if payload.is_skip:
+        game.night_actions.remove(ActionType.ARSONIST_DOUSE_SECOND, player.user_id)
         player.has_acted = True
         await query.edit_message_text("You chose to skip the second douse.")
         return
 
     try:
-        target_id = int(selection)
+        target_id = payload.target
         target_player = game.players.get(target_id)
         
         if not target_player or not target_player.is_alive or target_player.is_doused:
             await query.edit_message_text("Invalid target selected.")
             return
 
-        game.night_actions["arsonist_douse_second"] = {"actor": player.user_id, "target": target_id}
+        game.night_actions.set(ActionType.ARSONIST_DOUSE_SECOND, player.user_id, target_id)
         target_player.is_doused = True
         player.has_acted = True
         player.accelerant_boost_next_night = False  # Clear boost after use
@@ -2110,17 +1948,17 @@ async def handle_fire_starter_block_menu(query: CallbackQuery, context: ContextT
     
     await query.edit_message_text(
         "Select a player to block or skip:",
-        reply_markup=InlineKeyboardMarkup(buttons)
+        reply_markup=stamp_keyboard(InlineKeyboardMarkup(buttons), game.phase_epoch)
     )
 
-async def handle_webkeeper_mark(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: List[str]):
+async def handle_webkeeper_mark(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
     """Handle Webkeeper marking a target for protection"""
     if player.role != Role.WEBKEEPER or not player.is_alive:
         await query.edit_message_text("You cannot perform this action.")
         return
     
     try:
-        target_id = int(parts[2])
+        target_id = payload.target
         target_player = game.players.get(target_id)
         
         if not target_player or not target_player.is_alive:
@@ -2129,7 +1967,7 @@ async def handle_webkeeper_mark(query: CallbackQuery, context: ContextTypes.DEFA
         
         # Mark the target
         player.webkeeper_marked_target = target_id
-        game.night_actions[f"webkeeper_mark_{player.user_id}"] = {"actor": player.user_id, "target": target_id}
+        game.night_actions.set(ActionType.WEBKEEPER_MARK, player.user_id, target_id)
         player.has_acted = True
         
         await query.edit_message_text(f"🕷️ You have woven your web around {target_player.first_name}.")
@@ -2140,14 +1978,14 @@ async def handle_webkeeper_mark(query: CallbackQuery, context: ContextTypes.DEFA
         await query.edit_message_text("An error occurred.")
 
 
-async def handle_stray_observe(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: List[str]):
+async def handle_stray_observe(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
     """Handle Stray observing who visited a target"""
     if player.role != Role.STRAY or not player.is_alive:
         await query.edit_message_text("You cannot perform this action.")
         return
     
     try:
-        target_id = int(parts[2])
+        target_id = payload.target
         target_player = game.players.get(target_id)
         
         if not target_player or not target_player.is_alive:
@@ -2156,7 +1994,7 @@ async def handle_stray_observe(query: CallbackQuery, context: ContextTypes.DEFAU
         
         # Store observation
         player.stray_observed_target = target_id
-        game.night_actions[f"stray_observe_{player.user_id}"] = {"actor": player.user_id, "target": target_id}
+        game.night_actions.set(ActionType.STRAY_OBSERVE, player.user_id, target_id)
         player.has_acted = True
         
         await query.edit_message_text(f"🐾 You observe {target_player.first_name} from the shadows...")
@@ -2167,18 +2005,18 @@ async def handle_stray_observe(query: CallbackQuery, context: ContextTypes.DEFAU
         await query.edit_message_text("An error occurred.")
 
 
-async def handle_thief_steal(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: List[str]):
+async def handle_thief_steal(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
     """Handle Thief stealing an ability with probability-based success"""
     if player.role != Role.THIEF or not player.is_alive:
         await query.edit_message_text("You cannot perform this action.")
         return
     
-    if getattr(player, 'thief_ability_used', False):
+    if player.thief_ability_used:
         await query.edit_message_text("You have already used your theft ability.")
         return
     
     try:
-        target_id = int(parts[2])
+        target_id = payload.target
         target_player = game.players.get(target_id)
         
         if not target_player or not target_player.is_alive:
@@ -2252,13 +2090,8 @@ async def handle_thief_steal(query: CallbackQuery, context: ContextTypes.DEFAULT
         success = roll <= success_chance
         
         # Record attempt regardless of outcome
-        game.night_actions[f"thief_steal_{player.user_id}"] = {
-            "actor": player.user_id, 
-            "target": target_id,
-            "success": success,
-            "roll": roll,
-            "chance": success_chance
-        }
+        game.night_actions.set(ActionType.THIEF_STEAL, player.user_id, target_id,
+                               success=success, roll=roll, chance=success_chance)
         player.has_acted = True
         player.thief_ability_used = True
         
@@ -2287,13 +2120,13 @@ async def handle_thief_steal(query: CallbackQuery, context: ContextTypes.DEFAULT
         await query.edit_message_text("An error occurred.")
 
 
-async def handle_grave_robber_borrow(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: list):
+async def handle_grave_robber_borrow(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
     """Handle borrowing a new role"""
     if not player.grave_robber_can_borrow_tonight:
         await query.edit_message_text("You cannot borrow a role tonight.")
         return
     
-    target_id = int(parts[3])  # grave_robber_borrow_{user_id}
+    target_id = payload.target  # grave_robber_borrow_{user_id}
     target_player = next((p for p in game.dead_players if p.user_id == target_id), None)
     
     if not target_player or not target_player.role:
@@ -2314,14 +2147,11 @@ async def handle_grave_robber_borrow(query: CallbackQuery, context: ContextTypes
     player.grave_robber_can_borrow_tonight = False
     player.grave_robber_act_tonight = False  # Can act next night
     player.has_acted = True
-    game.night_actions[f"grave_robber_borrow_{player.user_id}_{target_id}"] = {
-            "actor": player.user_id, 
-            "target": target_id
-        }
+    game.night_actions.add(ActionType.GRAVE_ROBBER_BORROW, player.user_id, target_id)
     
     await query.edit_message_text(f"⚰️ You will borrow {target_player.first_name}'s power tomorrow night.")
 
-async def handle_doppelganger_choose(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: List[str]):
+async def handle_doppelganger_choose(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
     """Handle Doppelganger choosing their target"""
     if player.role != Role.DOPPELGANGER or not player.is_alive:
         await query.edit_message_text("You cannot perform this action.")
@@ -2331,12 +2161,12 @@ async def handle_doppelganger_choose(query: CallbackQuery, context: ContextTypes
         await query.edit_message_text("You can only choose your target on the first night.")
         return
     
-    if hasattr(player, 'doppelganger_target_id') and player.doppelganger_target_id:
+    if player.doppelganger_target_id:
         await query.edit_message_text("You have already chosen your target.")
         return
     
     try:
-        target_id = int(parts[2])
+        target_id = payload.target
         target_player = game.players.get(target_id)
         
         if not target_player or not target_player.is_alive:
@@ -2362,20 +2192,20 @@ async def handle_doppelganger_choose(query: CallbackQuery, context: ContextTypes
         logger.error(f"handle_doppelganger_choose error: {e}")
         await query.edit_message_text("An error occurred.")
 
-async def handle_oracle_check(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: List[str]):
-    if len(parts) < 3:
+async def handle_oracle_check(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
+    if payload.target is None:
         await query.edit_message_text("Invalid oracle check selection.")
         player.has_acted = True
         return
 
     try:
-        target_id = int(parts[2])
+        target_id = payload.target
         target_player = game.players.get(target_id)
         if not target_player or not target_player.is_alive:
             await query.edit_message_text("Invalid target for oracle check.")
             player.has_acted = True
             return
-        game.night_actions[f"oracle_{player.user_id}"] = {"actor": player.user_id, "target": target_id}
+        game.night_actions.set(ActionType.ORACLE, player.user_id, target_id)
 
         await query.edit_message_text(f"🌟 You commune with the spirits about {target_player.first_name}...\n\nYour divination will come at dawn.")
         player.has_acted = True
@@ -2402,22 +2232,22 @@ async def handle_witch_heal_menu(query: CallbackQuery, context: ContextTypes.DEF
     buttons.append([InlineKeyboardButton("❌ Skip", callback_data="witch_heal_skip")])
     await query.edit_message_text(
         "Choose a player to revive or skip:",
-        reply_markup=InlineKeyboardMarkup(buttons),
+        reply_markup=stamp_keyboard(InlineKeyboardMarkup(buttons), game.phase_epoch),
         parse_mode='Markdown'
     )
 
-async def handle_witch_heal_choice(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: list):
+async def handle_witch_heal_choice(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
     if player.witch_heal_used:
         await query.edit_message_text("You have already used your heal potion.")
         return
 
     try:
-        if parts[2] == "skip":
+        if payload.is_skip:
             player.has_acted = True
             await query.edit_message_text("You chose not to use your heal potion.")
             return
             
-        target_id = int(parts[2])
+        target_id = payload.target
         target = game.players.get(target_id)
         
         if not target or target.is_alive:
@@ -2429,7 +2259,7 @@ async def handle_witch_heal_choice(query: CallbackQuery, context: ContextTypes.D
         player.has_acted = True
         
         # Add heal action to night actions
-        game.night_actions[f"witch_heal_{player.user_id}"] = {"actor": player.user_id, "target": target_id}
+        game.night_actions.set(ActionType.WITCH_HEAL, player.user_id, target_id)
         
         await query.edit_message_text(f"You have chosen to revive {target.first_name}.")
         logger.info(f"Witch {player.first_name} chose to revive {target.first_name} in game {game.group_id}")
@@ -2450,22 +2280,22 @@ async def handle_witch_poison_menu(query: CallbackQuery, context: ContextTypes.D
     buttons.append([InlineKeyboardButton("❌ Skip", callback_data="witch_poison_skip")])
     await query.edit_message_text(
         "Choose a player to poison or skip:",
-        reply_markup=InlineKeyboardMarkup(buttons),
+        reply_markup=stamp_keyboard(InlineKeyboardMarkup(buttons), game.phase_epoch),
         parse_mode='Markdown'
     )
 
-async def handle_witch_poison_choice(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: list):
+async def handle_witch_poison_choice(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
     if player.witch_poison_used:
         await query.edit_message_text("You have already used your poison.")
         return
 
     try:
-        if parts[2] == "skip":
+        if payload.is_skip:
             player.has_acted = True
             await query.edit_message_text("You chose not to use your poison.")
             return
             
-        target_id = int(parts[2])
+        target_id = payload.target
         target = game.players.get(target_id)
         log_insomniac_visit(player, target, logger)
         if not target or not target.is_alive:
@@ -2477,7 +2307,7 @@ async def handle_witch_poison_choice(query: CallbackQuery, context: ContextTypes
         player.has_acted = True
         
         # Add poison action to night actions for processing
-        game.night_actions[f"witch_poison_{player.user_id}"] = {"actor": player.user_id, "target": target_id}
+        game.night_actions.set(ActionType.WITCH_POISON, player.user_id, target_id)
         
         await query.edit_message_text(f"You have poisoned {target.first_name}.")
         logger.info(f"Witch {player.first_name} poisoned {target.first_name} in game {game.group_id}")
@@ -2486,25 +2316,25 @@ async def handle_witch_poison_choice(query: CallbackQuery, context: ContextTypes
         logger.error(f"Witch poison error: {e}")
         await query.edit_message_text("An error occurred during poisoning.")
 
-async def handle_plague_doctor_infect(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: List[str]):
-    if len(parts) < 4 or not parts[3].isdigit():
+async def handle_plague_doctor_infect(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
+    if payload.target is None:
         await query.edit_message_text("Invalid infection selection.")
         return
 
     try:
-        target_id = int(parts[3])
+        target_id = payload.target
         target_player = game.players.get(target_id)
         log_insomniac_visit(player, target_player, logger)   
         if not target_player or not target_player.is_alive:
             await query.edit_message_text("Invalid target for infection.")
             return
 
-        if getattr(target_player, 'is_plagued', False):
+        if target_player.is_plagued:
             await query.edit_message_text(f"{target_player.first_name} is already infected.")
             return
 
         # Record the infection action (will be processed in night resolution)
-        game.night_actions[f"plague_doctor_infect_{player.user_id}"] = {"actor": player.user_id, "target": target_id}
+        game.night_actions.set(ActionType.PLAGUE_INFECT, player.user_id, target_id)
         
         await query.edit_message_text(f"You have infected {target_player.first_name} with the plague.")
         player.has_acted = True
@@ -2515,32 +2345,32 @@ async def handle_plague_doctor_infect(query: CallbackQuery, context: ContextType
         logger.error(f"Error in plague doctor infect handler: {e}")
         await query.edit_message_text("An error occurred while processing your infection.")
 
-async def handle_bodyguard_protect(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: list):
-    if len(parts) < 3:
+async def handle_bodyguard_protect(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
+    if payload.target is None:
         await query.edit_message_text("Invalid selection.")
         player.has_acted = True
         return
     try:
-        target_id = int(parts[2])
+        target_id = payload.target
         target_player = game.players.get(target_id)
         if not target_player or not target_player.is_alive:
             await query.edit_message_text("Invalid target.")
             player.has_acted = True
             return
-        game.night_actions[f"bodyguard_{player.user_id}"] = {"actor": player.user_id, "target": target_id}
+        game.night_actions.set(ActionType.BODYGUARD, player.user_id, target_id)
         await query.edit_message_text(f"You have chosen to protect {target_player.first_name}.")
         player.has_acted = True
         log_insomniac_visit(player, target_player, logger)
     except Exception as e:
         await query.edit_message_text("An error occurred while choosing target.")
 
-async def handle_detective_check(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: list):
-    if len(parts) < 3:
+async def handle_detective_check(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
+    if payload.target is None:
         await query.edit_message_text("Invalid selection.")
         player.has_acted = True
         return
     try:
-        target_id = int(parts[2])
+        target_id = payload.target
         target_player = game.players.get(target_id)
         if not target_player or not target_player.is_alive:
             await query.edit_message_text("Invalid target for investigation.")
@@ -2548,7 +2378,7 @@ async def handle_detective_check(query: CallbackQuery, context: ContextTypes.DEF
             return
 
         # Record the detective's action to night actions
-        game.night_actions[f"detective_{player.user_id}"] = {"actor": player.user_id, "target": target_id}
+        game.night_actions.set(ActionType.DETECTIVE, player.user_id, target_id)
         
         await query.edit_message_text(f"🕵️ You begin investigating {target_player.first_name}...\n\nYour findings will be ready when voting begins.")
         player.has_acted = True
@@ -2560,21 +2390,21 @@ async def handle_detective_check(query: CallbackQuery, context: ContextTypes.DEF
         logger.error(f"handle_detective_check error: {e}")
         await query.edit_message_text("An error occurred while investigating.")
 
-async def handle_doctor_heal(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: List[str]):
-    if len(parts) < 3:
+async def handle_doctor_heal(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
+    if payload.target is None and not payload.is_skip:
         await query.edit_message_text("Invalid heal selection.")
         return
     try:
-        if parts[2] == "skip":
-            game.night_actions.pop(f"doctor_{player.user_id}", None)
+        if payload.is_skip:
+            game.night_actions.remove(ActionType.DOCTOR, player.user_id)
             await query.edit_message_text("You chose not to heal anyone.")
             return
-        target_id = int(parts[2])
+        target_id = payload.target
         target_player = game.players.get(target_id)
         if not target_player or not target_player.is_alive:
             await query.edit_message_text("Invalid heal target.")
             return
-        game.night_actions[f"doctor_{player.user_id}"] = {"actor": player.user_id, "target": target_id}
+        game.night_actions.set(ActionType.DOCTOR, player.user_id, target_id)
         await query.edit_message_text(f"You have chosen to heal {target_player.first_name}.")
         player.has_acted = True
         logger.info(f"Doctor {player.first_name} chose to heal {target_player.first_name} in game {game.group_id}")
@@ -2592,13 +2422,8 @@ async def handle_team_message_universal(update: Update, context: ContextTypes.DE
         return
         
     # Find the game this player is in
-    game = None
-    player = None
-    for g in active_games.values():
-        if user.id in g.players:
-            game = g
-            player = g.players[user.id]
-            break
+    game = get_game_for_player(user.id)
+    player = game.players.get(user.id) if game else None
     
     if not game or not player:
         return  # Player not in any game
@@ -2665,10 +2490,7 @@ def get_team_members(player: Player, game: Game) -> dict:
     
     # 🐺 WOLF TEAM
     if player.role and player.role.team == Team.WOLF:
-        teammates = [p for p in game.get_alive_players() 
-                    if p.user_id != player.user_id 
-                    and p.role 
-                    and p.role.team == Team.WOLF]
+        teammates = [p for p in game.get_players_by_team(Team.WOLF) if p.user_id != player.user_id]
         return {
             'members': teammates,
             'emoji': '🐺',
@@ -2679,10 +2501,7 @@ def get_team_members(player: Player, game: Game) -> dict:
     
     # 🔥 FIRE TEAM
     elif player.role and player.role.team == Team.FIRE:
-        teammates = [p for p in game.get_alive_players() 
-                    if p.user_id != player.user_id 
-                    and p.role 
-                    and p.role.team == Team.FIRE]
+        teammates = [p for p in game.get_players_by_team(Team.FIRE) if p.user_id != player.user_id]
         return {
             'members': teammates,
             'emoji': '🔥',
@@ -2692,7 +2511,7 @@ def get_team_members(player: Player, game: Game) -> dict:
         }
     
     # 💕 LOVERS
-    elif hasattr(player, 'lover_id') and player.lover_id:
+    elif player.lover_id:
         lover = game.players.get(player.lover_id)
         teammates = [lover] if lover and lover.is_alive else []
         return {
@@ -2755,12 +2574,12 @@ async def notify_universal_action(context: ContextTypes.DEFAULT_TYPE, game: Game
         except Exception as e:
             logger.error(f"Failed to notify {team_data['team_type']} {teammate.first_name}: {e}")
 
-async def handle_vote(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: List[str]):
-    if len(parts) < 2:
+async def handle_vote(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
+    if payload.target is None and payload.action != "vote_abstain":
         await query.edit_message_text("Invalid vote.")
         return
     try:
-        if parts[1] == "abstain":
+        if payload.action == "vote_abstain":
             if player.has_voted:
                 await query.edit_message_text("You have already voted.")
                 return
@@ -2778,7 +2597,7 @@ async def handle_vote(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE,
                 logger.error(f"Failed to announce abstention: {e}")
             return
             
-        target_id = int(parts[1])
+        target_id = payload.target
         if player.has_voted:
             await query.edit_message_text("You have already voted.")
             return
@@ -2808,7 +2627,7 @@ async def handle_vote(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE,
         logger.error(f"handle_vote error: {e}")
         await query.edit_message_text("An error occurred during voting.")
 
-async def handle_hunter_shoot(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, parts: List[str]):
+async def handle_hunter_shoot(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
     """Handle Hunter shooting target (lynch revenge or other scenarios)"""
     
     # ✅ PREVENT DUPLICATE SHOTS
@@ -2816,7 +2635,7 @@ async def handle_hunter_shoot(query: CallbackQuery, context: ContextTypes.DEFAUL
         await query.answer("You already took your shot!", show_alert=True)
         return
         
-    if len(parts) < 3:
+    if payload.target is None:
         await query.edit_message_text("Invalid shoot selection.")
         return
     
@@ -2824,7 +2643,7 @@ async def handle_hunter_shoot(query: CallbackQuery, context: ContextTypes.DEFAUL
         # Check if this is a lynch revenge scenario
         is_lynch_revenge = hasattr(game, 'waiting_for_hunter') and game.waiting_for_hunter
         
-        target_id = int(parts[2])
+        target_id = payload.target
         target_player = game.players.get(target_id)
         
         if not target_player or not target_player.is_alive:
@@ -2855,8 +2674,6 @@ async def handle_hunter_shoot(query: CallbackQuery, context: ContextTypes.DEFAUL
 
         # Track stats (if not custom game)
         if not getattr(game, 'custom_game', False):
-            if not hasattr(player, 'game_actions'):
-                player.game_actions = {}
         
             if target_player.role.team != Team.VILLAGER:
                 player.game_actions['hunter_revenge_evil'] = player.game_actions.get('hunter_revenge_evil', 0) + 1
@@ -2866,27 +2683,36 @@ async def handle_hunter_shoot(query: CallbackQuery, context: ContextTypes.DEFAUL
         # Check if other hunters still need to shoot
         hunters_left = [
             p for p in game.get_alive_players()
-            if p.role == Role.HUNTER and getattr(p, "hunter_can_shoot", False) and not p.has_acted
+            if p.role == Role.HUNTER and p.hunter_can_shoot and not p.has_acted
         ]
         
         if not hunters_left:
-            # All hunters done - clear phase timer
-            game.phase_end_time = None
-
-            alive_players = game.get_alive_players()
-            if len(alive_players) == 2:
-                from mechanics import handle_two_player_resolution
-                game_ended = await handle_two_player_resolution(context, game)
-                if game_ended:
+            # Advance under the transition lock, unless a deadline moved the game on while we waited
+            epoch = game.phase_epoch
+            await game.begin_phase_transition()
+            try:
+                if game.phase_epoch != epoch or game.phase == GamePhase.ENDED:
                     return
-            
-            # Check win condition
-            winner = game.check_win_condition()
-            if winner:
-                await end_game(context, game, winner)
-            else:
-                await asyncio.sleep(3)
-                await start_night_phase(context, game)
+
+                # All hunters done - clear phase timer
+                cancel_phase_deadline(context, game)
+
+                alive_players = game.get_alive_players()
+                if len(alive_players) == 2:
+                    from mechanics import handle_two_player_resolution
+                    game_ended = await handle_two_player_resolution(context, game)
+                    if game_ended:
+                        return
+                
+                # Check win condition
+                winner = game.check_win_condition()
+                if winner:
+                    await end_game(context, game, winner)
+                else:
+                    await asyncio.sleep(3)
+                    await start_night_phase(context, game)
+            finally:
+                game.end_phase_transition()
         else:
             # Remind remaining hunters
             for h in hunters_left:
@@ -2916,224 +2742,378 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
     except Exception:
         pass
 
-async def check_game_timers(context: ContextTypes.DEFAULT_TYPE):
+# Caps how many games run their expired-phase transitions at once
+_transition_semaphore: Optional[asyncio.Semaphore] = None
+
+def get_transition_semaphore() -> asyncio.Semaphore:
+    global _transition_semaphore
+    if _transition_semaphore is None:
+        _transition_semaphore = asyncio.Semaphore(MAX_CONCURRENT_TRANSITIONS)
+    return _transition_semaphore
+
+async def handle_phase_deadline(context: ContextTypes.DEFAULT_TYPE):
+    """
+    One-shot job fired at a game's phase_end_time (see schedule_phase_deadline).
+    Each game's deadline runs as its own job task, so a slow 20-player transition
+    never delays another group. Concurrency is capped by MAX_CONCURRENT_TRANSITIONS
+    and failures are contained to the game that raised them.
+    """
+    chat_id = context.job.data['chat_id']
+    game = active_games.get(chat_id)
+    if not game:
+        logger.debug(f"Phase deadline fired for finished game {chat_id}")
+        return
+    
+    # Another transition holds the game: keep this deadline alive by re-arming it shortly.
+    # If that transition arms a fresh deadline meanwhile, the retry is replaced.
+    if not await game.begin_phase_transition(wait=False):
+        if game.phase_end_time and datetime.now().timestamp() + 0.1 >= game.phase_end_time:
+            logger.info(f"Deadline for game {chat_id} fired mid-transition, retrying in {DEADLINE_RETRY_SECONDS}s")
+            schedule_phase_deadline(context, game, DEADLINE_RETRY_SECONDS)
+        return
+    
+    try:
+        async with get_transition_semaphore():
+            await process_phase_timeout(context, game)
+    except Exception as e:
+        logger.error(f"❌ Phase transition failed for game {chat_id}: {e}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+    finally:
+        game.end_phase_transition()
+
+async def process_phase_timeout(context: ContextTypes.DEFAULT_TYPE, game: Game):
+    """Handle an expired phase timer: Hunter timeouts, AFK accounting and phase advancement"""
     current_time = datetime.now().timestamp()
-    for game in list(active_games.values()):
-        if not game.phase_end_time or current_time < game.phase_end_time:
-            continue  # Timer not expired yet
-
-        # ============================================================================
-        # ✅ FIX 1: HUNTER LYNCH REVENGE TIMEOUT - CHECK THIS FIRST
-        # ============================================================================
-        if hasattr(game, 'waiting_for_hunter') and game.waiting_for_hunter:
-            hunter_id = getattr(game, 'hunter_user_id', None)
-            if hunter_id:
-                hunter = game.players.get(hunter_id)
+    # Small tolerance: the job queue may fire a few ms before the stored timestamp
+    if not game.phase_end_time or current_time + 0.1 < game.phase_end_time:
+        return  # Timer not expired yet (deadline was rescheduled)
+
+    # ============================================================================
+    # ✅ FIX 1: HUNTER LYNCH REVENGE TIMEOUT - CHECK THIS FIRST
+    # ============================================================================
+    if hasattr(game, 'waiting_for_hunter') and game.waiting_for_hunter:
+        hunter_id = getattr(game, 'hunter_user_id', None)
+        if hunter_id:
+            hunter = game.players.get(hunter_id)
+            
+            if hunter and not hunter.has_acted:
+                # Hunter hasn't shot yet - TIMEOUT
+                logger.warning(f"Hunter {hunter.first_name} timed out on revenge shot")
                 
-                if hunter and not hunter.has_acted:
-                    # Hunter hasn't shot yet - TIMEOUT
-                    logger.warning(f"Hunter {hunter.first_name} timed out on revenge shot")
+                alive_players = game.get_alive_players()
+                if alive_players:
+                    target = random.choice(alive_players)
                     
-                    alive_players = game.get_alive_players()
-                    if alive_players:
-                        target = random.choice(alive_players)
-                        
-                        # Kill the target first
-                        await kill_player(context, game, target, death_type="hunter")
-                        
-                        # NOW kill the hunter
-                        await kill_player(context, game, hunter, death_type="lynch")
-                        
-                        await context.bot.send_message(
-                            chat_id=game.group_id,
-                            text=f"🏹⏰ Time ran out! {hunter.mention}'s final arrow flies wild and strikes {target.mention}!",
-                            parse_mode='Markdown'
-                        )
-                    else:
-                        # No targets - just kill hunter
-                        await kill_player(context, game, hunter, death_type="lynch")
-                        
-                        await context.bot.send_message(
-                            chat_id=game.group_id,
-                            text=f"🏹⏰ {hunter.mention}'s final moment passes...",
-                            parse_mode='Markdown'
-                        )
+                    # Kill the target first
+                    await kill_player(context, game, target, death_type="hunter")
                     
-                    # Clean up flags
-                    game.waiting_for_hunter = False
-                    game.hunter_user_id = None
-                    game.phase_end_time = None
+                    # NOW kill the hunter
+                    await kill_player(context, game, hunter, death_type="lynch")
                     
-                    # NOW check win condition
-                    winner = game.check_win_condition()
-                    if winner:
-                        await end_game(context, game, winner)
-                    else:
-                        await asyncio.sleep(3)
-                        await start_night_phase(context, game)
-                    
-                    continue  # Skip rest of timer logic for this game
+                    await context.bot.send_message(
+                        chat_id=game.group_id,
+                        text=f"🏹⏰ Time ran out! {hunter.mention}'s final arrow flies wild and strikes {target.mention}!",
+                        parse_mode='Markdown'
+                    )
                 else:
-                    # Hunter already acted or is dead - clean up and proceed normally
-                    game.waiting_for_hunter = False
-                    game.hunter_user_id = None
-
-        # ============================================================================
-        # ✅ FIX 2: NORMAL HUNTER SHOOT DURING DAY PHASE (non-lynch scenario)
-        # ============================================================================
-        if game.phase == GamePhase.DAY:
-            hunters_pending = [
-                p for p in game.get_alive_players()
-                if p.role == Role.HUNTER and getattr(p, "hunter_can_shoot", False) and not p.has_acted
-            ]
-            if hunters_pending:
-                # Extend timer by 5 seconds and remind hunters
-                game.phase_end_time = current_time + 5
-                for hunter in hunters_pending:
-                    try:
-                        await context.bot.send_message(
-                            chat_id=hunter.user_id,
-                            text="🏹 **5 seconds remaining!** Take your final shot!",
-                            parse_mode='Markdown'
-                        )
-                    except Exception as e:
-                        logger.error(f"Failed to remind Hunter {hunter.first_name}: {e}")
-                continue  # Skip phase advancement until hunter acts or times out
-
-        # ============================================================================
-        # NORMAL TIMEOUT HANDLING - NOTIFY MISSING PLAYERS
-        # ============================================================================
-        expected_actors = [
-            p for p in game.get_alive_players() if player_has_pending_action(p, game)
-        ]
-        
-        afk_players_to_kick = []
-        
-        for player in expected_actors:
-            # Player acted - reset AFK counter
-            if getattr(player, "has_acted", False):
-                player.afk_count = 0
-                player.warned_afk = False
-                continue
-            
-            # Player didn't act - increment AFK
-            if game.settings.get('afk_kick', True):
-                player.afk_count += 1
-                logger.info(f"Player {player.first_name} missed action. AFK count: {player.afk_count}")
+                    # No targets - just kill hunter
+                    await kill_player(context, game, hunter, death_type="lynch")
+                    
+                    await context.bot.send_message(
+                        chat_id=game.group_id,
+                        text=f"🏹⏰ {hunter.mention}'s final moment passes...",
+                        parse_mode='Markdown'
+                    )
                 
-                afk_threshold = game.settings.get('afk_threshold', 3)
+                # Clean up flags
+                game.waiting_for_hunter = False
+                game.hunter_user_id = None
+                game.phase_end_time = None
                 
-                # Warn at threshold - 1
-                if player.afk_count == afk_threshold - 1 and not player.warned_afk:
-                    player.warned_afk = True
-                    try:
-                        await context.bot.send_message(
-                            chat_id=player.user_id,
-                            text=f"⚠️ **AFK WARNING**\n\n"
-                                 f"You've been inactive for {player.afk_count} round(s).\n"
-                                 f"Miss one more action and you'll be removed from the game!",
-                            parse_mode='Markdown'
-                        )
-                        logger.info(f"Sent AFK warning to {player.first_name}")
-                    except Exception as e:
-                        logger.error(f"Failed to send AFK warning to {player.first_name}: {e}")
+                # NOW check win condition
+                winner = game.check_win_condition()
+                if winner:
+                    await end_game(context, game, winner)
+                else:
+                    await asyncio.sleep(3)
+                    await start_night_phase(context, game)
                 
-                # Kick at threshold
-                elif player.afk_count >= afk_threshold:
-                    afk_players_to_kick.append(player)
+                return  # Skip rest of timer logic for this game
+            else:
+                # Hunter already acted or is dead - clean up and proceed normally
+                game.waiting_for_hunter = False
+                game.hunter_user_id = None
+
+    # ============================================================================
+    # ✅ FIX 2: NORMAL HUNTER SHOOT DURING DAY PHASE (non-lynch scenario)
+    # ============================================================================
+    if game.phase == GamePhase.DAY:
+        hunters_pending = [
+            p for p in game.get_alive_players()
+            if p.role == Role.HUNTER and p.hunter_can_shoot and not p.has_acted
+        ]
+        if hunters_pending:
+            # Extend timer by 5 seconds and remind hunters
+            schedule_phase_deadline(context, game, 5)
+            for hunter in hunters_pending:
+                try:
+                    await context.bot.send_message(
+                        chat_id=hunter.user_id,
+                        text="🏹 **5 seconds remaining!** Take your final shot!",
+                        parse_mode='Markdown'
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to remind Hunter {hunter.first_name}: {e}")
+            return  # Skip phase advancement until hunter acts or times out
+
+    # ============================================================================
+    # NORMAL TIMEOUT HANDLING - NOTIFY MISSING PLAYERS
+    # ============================================================================
+    # Day actions (Mayor reveal, Detective) are optional, so the day deadline never counts toward AFK
+    expected_actors = players_with_pending_action(game) if game.phase != GamePhase.DAY else []
+    
+    afk_players_to_kick = []
+    
+    for player in expected_actors:
+        # Player acted - reset AFK counter
+        if player.has_acted:
+            player.afk_count = 0
+            player.warned_afk = False
+            continue
+        
+        # Player didn't act - increment AFK, unless their menu never reached them
+        if player.user_id in game.undelivered_menus:
+            logger.info(f"Player {player.first_name} missed action but their menu was not delivered; not counted as AFK")
+        elif game.settings.get('afk_kick', True):
+            player.afk_count += 1
+            logger.info(f"Player {player.first_name} missed action. AFK count: {player.afk_count}")
             
-            # Handle Grave Robber stuck state
-            if player.role == Role.GRAVE_ROBBER and getattr(player, 'grave_robber_act_tonight', False):
-                player.grave_robber_act_tonight = False
-                player.grave_robber_can_borrow_tonight = True
-                player.grave_robber_borrowed_role = None
-                logger.info(f"Reset stuck Grave Robber {player.first_name}")
+            afk_threshold = game.settings.get('afk_threshold', 3)
             
-            # Notify player of timeout
-            try:
-                if hasattr(player, "last_action_message_id"):
-                    await context.bot.edit_message_reply_markup(
+            # Warn at threshold - 1
+            if player.afk_count == afk_threshold - 1 and not player.warned_afk:
+                player.warned_afk = True
+                try:
+                    await context.bot.send_message(
                         chat_id=player.user_id,
-                        message_id=player.last_action_message_id,
-                        reply_markup=None
+                        text=f"⚠️ **AFK WARNING**\n\n"
+                             f"You've been inactive for {player.afk_count} round(s).\n"
+                             f"Miss one more action and you'll be removed from the game!",
+                        parse_mode='Markdown'
                     )
-                await context.bot.send_message(
+                    logger.info(f"Sent AFK warning to {player.first_name}")
+                except Exception as e:
+                    logger.error(f"Failed to send AFK warning to {player.first_name}: {e}")
+            
+            # Kick at threshold
+            elif player.afk_count >= afk_threshold:
+                afk_players_to_kick.append(player)
+        
+        # Handle Grave Robber stuck state
+        if player.role == Role.GRAVE_ROBBER and player.grave_robber_act_tonight:
+            player.grave_robber_act_tonight = False
+            player.grave_robber_can_borrow_tonight = True
+            player.grave_robber_borrowed_role = None
+            logger.info(f"Reset stuck Grave Robber {player.first_name}")
+        
+        # Notify player of timeout
+        try:
+            if player.last_action_message_id:
+                await context.bot.edit_message_reply_markup(
                     chat_id=player.user_id,
-                    text="⏰ Time's up! You missed your action."
+                    message_id=player.last_action_message_id,
+                    reply_markup=None
                 )
-            except Exception as e:
-                logger.error(f"Failed to notify player {player.first_name} of timeout: {e}")
+            await context.bot.send_message(
+                chat_id=player.user_id,
+                text="⏰ Time's up! You missed your action."
+            )
+        except Exception as e:
+            logger.error(f"Failed to notify player {player.first_name} of timeout: {e}")
 
-        # ============================================================================
-        # AFK KICK PROCESSING
-        # ============================================================================
-        for afk_player in afk_players_to_kick:
-            logger.info(f"Kicking AFK player: {afk_player.first_name} ({afk_player.afk_count} strikes)")
-            
-            try:
-                await context.bot.send_message(
-                    chat_id=afk_player.user_id,
-                    text=f"🚫 **Removed for Inactivity**\n\n"
-                         f"You've been inactive for {afk_player.afk_count} consecutive rounds.\n"
-                         f"You have been removed from the game.",
-                    parse_mode='Markdown'
-                )
-            except Exception as e:
-                logger.error(f"Failed to notify kicked player {afk_player.first_name}: {e}")
-            
-            # Kill the AFK player
-            await kill_player(context, game, afk_player, "afk")
-            
-            # Notify group
+    # ============================================================================
+    # AFK KICK PROCESSING
+    # ============================================================================
+    for afk_player in afk_players_to_kick:
+        logger.info(f"Kicking AFK player: {afk_player.first_name} ({afk_player.afk_count} strikes)")
+        
+        try:
             await context.bot.send_message(
-                chat_id=game.group_id,
-                text=f"⏰ {afk_player.mention} was removed from the game due to inactivity (AFK).",
+                chat_id=afk_player.user_id,
+                text=f"🚫 **Removed for Inactivity**\n\n"
+                     f"You've been inactive for {afk_player.afk_count} consecutive rounds.\n"
+                     f"You have been removed from the game.",
                 parse_mode='Markdown'
             )
+        except Exception as e:
+            logger.error(f"Failed to notify kicked player {afk_player.first_name}: {e}")
         
-        # Check win condition after AFK kicks
-        if afk_players_to_kick:
-            winner = game.check_win_condition()
-            if winner:
-                await end_game(context, game, winner)
-                continue
-
-        # ============================================================================
-        # CLEAR PHASE END TIME
-        # ============================================================================
-        game.phase_end_time = None
-
-        # ============================================================================
-        # PROCEED TO NEXT PHASE
-        # ============================================================================
-        if game.phase == GamePhase.NIGHT:
-            await start_day_phase(context, game)
-            
-        elif game.phase == GamePhase.DAY:
-            await start_voting_phase(context, game)
-            
-        elif game.phase == GamePhase.VOTING:
-            # Remove vote buttons from all players
-            for player in game.get_alive_players():
-                try:
-                    if hasattr(player, "last_action_message_id"):
-                        await context.bot.edit_message_reply_markup(
-                            chat_id=player.user_id,
-                            message_id=player.last_action_message_id,
-                            reply_markup=None
-                        )
-                        logger.debug(f"Removed vote buttons for {player.first_name}")
-                    
-                    # Notify if they didn't vote
-                    if not player.has_voted:
-                        await context.bot.send_message(
-                            chat_id=player.user_id,
-                            text="⏰ Time's up! Your vote was not recorded (counted as abstain)."
-                        )
-                except Exception as e:
-                    logger.error(f"Failed to remove vote buttons for {player.first_name}: {e}")
+        # Kill the AFK player
+        await kill_player(context, game, afk_player, "afk")
+        
+        # Notify group
+        await context.bot.send_message(
+            chat_id=game.group_id,
+            text=f"⏰ {afk_player.mention} was removed from the game due to inactivity (AFK).",
+            parse_mode='Markdown'
+        )
+    
+    # Check win condition after AFK kicks
+    if afk_players_to_kick:
+        winner = game.check_win_condition()
+        if winner:
+            await end_game(context, game, winner)
+            return
+
+    # ============================================================================
+    # CLEAR PHASE END TIME
+    # ============================================================================
+    game.phase_end_time = None
+
+    # ============================================================================
+    # PROCEED TO NEXT PHASE
+    # ============================================================================
+    if game.phase == GamePhase.NIGHT:
+        await start_day_phase(context, game)
+        
+    elif game.phase == GamePhase.DAY:
+        await start_voting_phase(context, game)
+        
+    elif game.phase == GamePhase.VOTING:
+        # Remove vote buttons from all players
+        for player in game.get_alive_players():
+            try:
+                if player.last_action_message_id:
+                    await context.bot.edit_message_reply_markup(
+                        chat_id=player.user_id,
+                        message_id=player.last_action_message_id,
+                        reply_markup=None
+                    )
+                    logger.debug(f"Removed vote buttons for {player.first_name}")
+                
+                # Notify if they didn't vote
+                if not player.has_voted:
+                    await context.bot.send_message(
+                        chat_id=player.user_id,
+                        text="⏰ Time's up! Your vote was not recorded (counted as abstain)."
+                    )
+            except Exception as e:
+                logger.error(f"Failed to remove vote buttons for {player.first_name}: {e}")
+
+        await process_voting_results(context, game)
+
+# ============================================================================
+# CALLBACK ROUTES
+# ============================================================================
+# Every in-game button action maps to one handler(query, context, game, player, payload),
+# keyed by the callback action without its target id (see callbacks.decode_callback).
+
+def _skip_action(message: str, flag: str = 'has_acted'):
+    """Build a handler that marks the player's action as skipped"""
+    async def handler(query, context, game, player, payload):
+        setattr(player, flag, True)
+        await query.edit_message_text(message)
+    return handler
+
+async def handle_mayor_reveal(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, game: Game, player: Player, payload: CallbackPayload):
+    if player.role == Role.MAYOR and not player.is_mayor_revealed:
+        player.is_mayor_revealed = True
+        await context.bot.send_message(
+            chat_id=game.group_id,
+            text=f"👑 {player.mention} has revealed themselves as the **Mayor**!\nTheir vote now counts **double** in lynching decisions.",
+            parse_mode='Markdown'
+        )
+        await query.edit_message_text(
+            "👑 You have revealed yourself as Mayor!\nYour vote now counts double."
+        )
+    else:
+        await query.edit_message_text("You cannot reveal mayor status.")
+
+async def handle_plague_doctor_infect_route(query, context, game, player, payload: CallbackPayload):
+    if payload.target is not None:
+        await handle_plague_doctor_infect(query, context, game, player, payload)
+    else:
+        await query.edit_message_text("Invalid infection selection.")
 
-            await process_voting_results(context, game)
+def register_callback_routes():
+    route = callback_router.add
+    
+    # Wolves
+    route("wolf_hunt", handle_wolf_hunt)
+    route("wolf_hunt_skip", handle_wolf_hunt)
+    route("shaman_block", handle_shaman_block)
+    route("shaman_block_skip", _skip_action("You chose not to block anyone tonight."))
+    
+    # Fire team
+    route("arsonist_ignite", handle_arsonist_ignite)
+    route("arsonist_douse", handle_arsonist_douse)
+    route("arsonist_douse_skip", handle_arsonist_douse)
+    route("arsonist_douse_second", handle_arsonist_douse_second_choice)
+    route("arsonist_douse_second_skip", handle_arsonist_douse_second_choice)
+    route("arsonist_skip", _skip_action("You chose not to douse anyone tonight."))
+    route("accelerant_expert_use", handle_accelerant_expert_use)
+    route("accelerant_expert_skip", _skip_action("You have skipped using your accelerant."))
+    route("fire_starter_ignite", lambda q, c, g, p, payload: handle_fire_team_ignite(q, c, g, p, "fire_starter"))
+    route("accelerant_expert_ignite", lambda q, c, g, p, payload: handle_fire_team_ignite(q, c, g, p, "accelerant_expert"))
+    route("fire_starter_action_choice", lambda q, c, g, p, payload: handle_fire_starter_action_choice(q, c, g, p))
+    route("fire_starter_action_douse", lambda q, c, g, p, payload: handle_fire_starter_douse_menu(q, c, g, p))
+    route("fire_starter_action_block", lambda q, c, g, p, payload: handle_fire_starter_block_menu(q, c, g, p))
+    route("fire_starter_block_menu", lambda q, c, g, p, payload: handle_fire_starter_block_menu(q, c, g, p))
+    route("fire_starter_douse", handle_fire_starter_douse_choice)
+    route("fire_starter_douse_skip", handle_fire_starter_douse_choice)
+    route("fire_starter_block", handle_fire_starter_block)
+    route("fire_starter_block_skip", _skip_action("You chose not to block anyone tonight."))
+    route("fire_starter_skip", _skip_action("You have skipped your action."))
+    
+    # Killers
+    route("serial_killer_kill", handle_serial_killer_kill)
+    route("serial_killer_skip", _skip_action("You chose not to kill anyone tonight."))
+    route("webkeeper_mark", handle_webkeeper_mark)
+    route("webkeeper_skip", _skip_action("You chose not to mark anyone tonight."))
+    
+    # Village night roles
+    route("seer_check", handle_seer_check)
+    route("oracle_check", handle_oracle_check)
+    route("doctor_heal", handle_doctor_heal)
+    route("doctor_heal_skip", handle_doctor_heal)
+    route("bodyguard_protect", handle_bodyguard_protect)
+    route("bodyguard_protect_skip", _skip_action("You chose not to guard anyone tonight."))
+    route("priest_bless", handle_priest_bless)
+    route("priest_bless_skip", _skip_action("You chose not to bless anyone tonight."))
+    route("vigilante_kill", handle_vigilante_kill)
+    route("vigilante_kill_skip", handle_vigilante_kill)
+    route("witch_heal_menu", lambda q, c, g, p, payload: handle_witch_heal_menu(q, c, g, p))
+    route("witch_poison_menu", lambda q, c, g, p, payload: handle_witch_poison_menu(q, c, g, p))
+    route("witch_heal", handle_witch_heal_choice)
+    route("witch_poison", handle_witch_poison_choice)
+    route("witch_heal_skip", _skip_action("You chose not to use your heal potion."))
+    route("witch_poison_skip", _skip_action("You chose not to use your poison."))
+    route("plague_doctor_infect", handle_plague_doctor_infect_route)
+    route("plague_doctor_skip", _skip_action("You chose not to infect anyone tonight."))
+    route("stray_observe", handle_stray_observe)
+    route("stray_skip", _skip_action("You chose not to observe anyone tonight."))
+    route("grave_robber_borrow", handle_grave_robber_borrow)
+    route("grave_robber_skip_borrow", _skip_action("You chose not to borrow any role tonight."))
+    route("hunter_shoot", handle_hunter_shoot)
+    
+    # Setup choices
+    route("cupid_choose", handle_cupid_choose)
+    route("doppelganger_choose", handle_doppelganger_choose)
+    route("thief_steal", handle_thief_steal)
+    route("thief_skip", _skip_action("You chose not to steal anything tonight."))
+    
+    # Day and voting
+    route("detective_check", handle_detective_check)
+    route("detective_check_skip", _skip_action("You chose not to investigate anyone today.", 'detective_acted_today'))
+    route("reveal_mayor", handle_mayor_reveal)
+    route("mayor_reveal", handle_mayor_reveal)
+    route("vote", handle_vote)
+    route("vote_abstain", handle_vote)
+    
+    logger.info(f"Registered {len(callback_router)} callback routes")
+
+register_callback_routes()
 
 def setup_handlers(app):
     app.add_handler(CommandHandler("start", start_command))
@@ -3155,7 +3135,6 @@ def setup_handlers(app):
     app.add_handler(MessageHandler(filters.TEXT & filters.ChatType.PRIVATE & ~filters.COMMAND,handle_team_message_universal))
     app.add_handler(CallbackQueryHandler(handle_callback_query))
     app.add_error_handler(error_handler)
-    app.job_queue.run_repeating(check_game_timers, interval=30, first=30)
 
 async def on_startup(context: ContextTypes.DEFAULT_TYPE):
     logger.info("Werewolf bot started successfully.")
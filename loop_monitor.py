@@ -0,0 +1,91 @@
+import logging
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from config import LOOP_LAG_SAMPLE_INTERVAL, LOOP_LAG_WARN_MS, LOOP_LAG_REPORT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """
+    Measures event loop responsiveness.
+
+    A background task sleeps for a fixed interval and records how late it wakes
+    up; anything blocking the loop (a synchronous DB commit, heavy CPU work)
+    shows up directly as lag.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+        self._samples = 0
+        self._total_lag = 0.0
+        self._max_lag = 0.0
+        self._slow_samples = 0
+
+        # Reset after every periodic report
+        self._window_samples = 0
+        self._window_total = 0.0
+        self._window_max = 0.0
+        self._last_report = time.monotonic()
+
+    def start(self):
+        """Start sampling on the running loop (idempotent)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"Event loop lag monitor started ({self.interval}s interval)")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self._record(max(0.0, time.monotonic() - expected))
+
+    def _record(self, lag: float):
+        self._samples += 1
+        self._total_lag += lag
+        self._max_lag = max(self._max_lag, lag)
+        self._window_samples += 1
+        self._window_total += lag
+        self._window_max = max(self._window_max, lag)
+
+        if lag * 1000 >= LOOP_LAG_WARN_MS:
+            self._slow_samples += 1
+            logger.warning(f"🐢 Event loop lagged {lag * 1000:.0f}ms")
+
+        now = time.monotonic()
+        if now - self._last_report >= LOOP_LAG_REPORT_INTERVAL:
+            avg = self._window_total / max(self._window_samples, 1)
+            logger.info(f"🩺 Event loop lag: avg {avg * 1000:.1f}ms, max {self._window_max * 1000:.0f}ms "
+                        f"over {self._window_samples} samples")
+            self._window_samples = 0
+            self._window_total = 0.0
+            self._window_max = 0.0
+            self._last_report = now
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Lag statistics since startup, in milliseconds"""
+        return {
+            "samples": self._samples,
+            "avg_lag_ms": round(self._total_lag / max(self._samples, 1) * 1000, 2),
+            "max_lag_ms": round(self._max_lag * 1000, 2),
+            "slow_samples": self._slow_samples,
+        }
+
+
+# Global instance
+loop_monitor = LoopLagMonitor()
+
+logger.info("Loop monitor module loaded successfully")
@@ -4,9 +4,13 @@ import sys
 import signal
 from telegram.ext import ApplicationBuilder
 from config import BOT_TOKEN
+from dispatcher import outbound_dispatcher
+from loop_monitor import loop_monitor
+from snapshots import snapshot_store, restore_active_games
 from handlers import setup_handlers, send_startup_message
 from game import active_games
 from mechanics import cleanup_game_buttons
+from ranking import ranking_manager, action_tracker
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -38,6 +42,11 @@ async def cleanup_and_shutdown():
     
     logger.info('Shutdown complete')
 
+async def post_init(application):
+    """Start background services that need the running event loop"""
+    loop_monitor.start()
+    await restore_active_games(application)
+
 def signal_handler(sig, frame):
     """Handle Ctrl+C gracefully"""
     logger.info('Bot shutdown initiated via signal...')
@@ -60,6 +69,8 @@ def main():
         .write_timeout(30)
         .connect_timeout(30)
         .pool_timeout(30)
+        .rate_limiter(outbound_dispatcher)  # All outbound sends are paced centrally
+        .post_init(post_init)
         .build()
     )
     
@@ -84,4 +95,8 @@ if __name__ == '__main__':
     except Exception as e:
         logger.error(f"Fatal error: {e}")
         import traceback
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
+    finally:
+        action_tracker.flush()
+        ranking_manager.db.close()
+        snapshot_store.db.close()
\ No newline at end of file
@@ -0,0 +1,168 @@
+import logging
+import os
+import sqlite3
+import hashlib
+from typing import Dict, Optional, Tuple
+
+from telegram.error import BadRequest
+
+from config import MEDIA_CACHE_DB_PATH
+
+# Telegram's BadRequest messages for a file_id it will no longer serve
+STALE_FILE_ID_ERRORS = ("wrong file identifier", "file reference expired", "wrong remote file id")
+
+logger = logging.getLogger(__name__)
+
+
+class MediaCache:
+    """
+    Remembers the Telegram file_id returned by the first upload of a local file.
+
+    Entries are keyed by file path and SHA-256 of the file contents, so editing a
+    GIF or image on disk automatically invalidates its cached file_id.
+    """
+
+    def __init__(self, db_path: str = MEDIA_CACHE_DB_PATH):
+        self.db_path = db_path
+        # path -> (mtime_ns, size, sha256) so unchanged files are not re-hashed
+        self._fingerprints: Dict[str, Tuple[int, int, str]] = {}
+        # (path, sha256) -> file_id
+        self._file_ids: Dict[Tuple[str, str], str] = {}
+        self.init_database()
+
+    def init_database(self):
+        """Create the cache table and load existing entries into memory"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS media_cache (
+                    path TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    file_id TEXT NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (path, content_hash)
+                )
+            ''')
+            conn.commit()
+
+            cursor.execute('SELECT path, content_hash, file_id FROM media_cache')
+            for path, content_hash, file_id in cursor.fetchall():
+                self._file_ids[(path, content_hash)] = file_id
+
+        logger.info(f"Media cache loaded with {len(self._file_ids)} entries")
+
+    def _content_hash(self, path: str) -> Optional[str]:
+        """Return SHA-256 of the file, re-hashing only when mtime or size changed"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        cached = self._fingerprints.get(path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+
+        self._fingerprints[path] = (stat.st_mtime_ns, stat.st_size, content_hash)
+        return content_hash
+
+    def get_file_id(self, path: str) -> Optional[str]:
+        """Get cached file_id for the current contents of path"""
+        content_hash = self._content_hash(path)
+        if not content_hash:
+            return None
+        return self._file_ids.get((path, content_hash))
+
+    def store_file_id(self, path: str, file_id: str):
+        """Remember file_id for the current contents of path"""
+        content_hash = self._content_hash(path)
+        if not content_hash or not file_id:
+            return
+
+        self._file_ids[(path, content_hash)] = file_id
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                # Older hashes of the same path are stale once the file changed
+                cursor.execute('DELETE FROM media_cache WHERE path = ? AND content_hash != ?',
+                               (path, content_hash))
+                cursor.execute('''
+                    INSERT OR REPLACE INTO media_cache (path, content_hash, file_id)
+                    VALUES (?, ?, ?)
+                ''', (path, content_hash, file_id))
+                conn.commit()
+            logger.debug(f"Cached file_id for {path}")
+        except Exception as e:
+            logger.error(f"Failed to persist file_id for {path}: {e}")
+
+    def invalidate(self, path: str):
+        """Forget every cached file_id for path (e.g. Telegram rejected it)"""
+        for key in [k for k in self._file_ids if k[0] == path]:
+            del self._file_ids[key]
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute('DELETE FROM media_cache WHERE path = ?', (path,))
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to invalidate media cache for {path}: {e}")
+
+
+def _extract_file_id(message, media_type: str) -> Optional[str]:
+    """Pull the file_id Telegram assigned to an uploaded animation/photo"""
+    if not message:
+        return None
+    if media_type == 'photo':
+        return message.photo[-1].file_id if message.photo else None
+    # MP4s sent via send_animation may come back as animation, video or document
+    for attr in ('animation', 'video', 'document'):
+        media = getattr(message, attr, None)
+        if media:
+            return media.file_id
+    return None
+
+
+async def send_cached_media(bot, media_type: str, chat_id: int, path: str, **kwargs):
+    """
+    Send a local file with send_animation/send_photo, uploading it only once.
+
+    Args:
+        bot: Telegram bot instance
+        media_type: "animation" or "photo"
+        chat_id: Target chat ID
+        path: Local file path
+        **kwargs: Extra arguments (caption, parse_mode, reply_markup, ...)
+
+    Returns:
+        The sent Message. Raises if the upload itself fails.
+    """
+    send = bot.send_photo if media_type == 'photo' else bot.send_animation
+
+    file_id = media_cache.get_file_id(path)
+    if file_id:
+        try:
+            message = await send(chat_id=chat_id, **{media_type: file_id}, **kwargs)
+            logger.debug(f"♻️ Reused cached file_id for {path}")
+            return message
+        except BadRequest as e:
+            # Only a rejected file_id is worth re-uploading; other errors (bad caption, missing chat) propagate
+            if not any(marker in str(e).lower() for marker in STALE_FILE_ID_ERRORS):
+                raise
+            logger.warning(f"⚠️ Cached file_id rejected for {path}, re-uploading: {e}")
+            media_cache.invalidate(path)
+
+    with open(path, 'rb') as media_file:
+        message = await send(chat_id=chat_id, **{media_type: media_file}, **kwargs)
+
+    media_cache.store_file_id(path, _extract_file_id(message, media_type))
+    return message
+
+
+# Global instance
+media_cache = MediaCache()
+
+logger.info("Media cache module loaded successfully")
@@ -0,0 +1,251 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# COMPREHENSIVE SITUATION-SPECIFIC NARRATIVE MESSAGES
+# ============================================================================
+
+DEATH_NARRATIVES = {
+    # ==================== WOLF SCENARIOS ====================
+    "wolf_killed_by_hunter": {
+        "wolf": "💀 **YOU HAVE BEEN KILLED**\n\nYou attacked the Hunter tonight.\nTheir reflexes were faster. An arrow pierced your heart.\n\nYou are now dead and cannot participate further.",
+        "hunter": "🏹⚔️ **YOU WERE ATTACKED!**\n\nA wolf lunged at you in the darkness, but your reflexes were faster!\n\nYour arrow found its mark. The wolf lies dead at your feet.\nYou survived the night.",
+        "pack": "🐺⚠️ **PACK ALERT**\n\nYour packmate {wolf_name} attacked the Hunter and was killed by their arrow.\n\nThe pack must be more careful...",
+        "group": "🏹💀 **DEADLY DEFENSE**\n\n{wolf_name} attacked {hunter_name} in the darkness!\nBut the Hunter was faster—their arrow flew true.\n\nThe wolf lies dead. The Hunter survives."
+    },
+    
+    "wolf_killed_by_serial_killer": {
+        "wolf": "💀 **YOU HAVE BEEN KILLED**\n\nYou attacked the Serial Killer tonight.\nIt was a fatal mistake.\n\nYou are now dead and cannot participate further.",
+        "sk": "🔪⚔️ **YOU WERE ATTACKED!**\n\nThe werewolves tried to hunt you tonight, but you fought back with deadly precision!\n\nOne of the wolves lies dead at your feet. Your bloodlust remains unsatisfied... for now.",
+        "pack": "🐺⚠️ **PACK ALERT**\n\nYour packmate {wolf_name} attacked the Serial Killer and was killed in the confrontation.\n\nThe pack must be more careful...",
+        "group": "🔪⚔️ **A PREDATOR FALLS**\n\n{wolf_name} hunted in the darkness, but encountered something more deadly.\nThe Serial Killer fought back with savage fury.\n\nWhen dawn broke, the wolf lay dead, torn to pieces."
+    },
+    
+    "wolf_normal_kill": {
+        "victim": "💀 **YOU HAVE BEEN KILLED**\n\nThe wolf struck before you could react.\nYour life ends in darkness.\n\nYou are dead.",
+        "wolves": "🐺✅ **SUCCESSFUL HUNT**\n\nThe pack hunted {victim_name} tonight.\nTheir screams echo no more.\n\nAnother threat eliminated.",
+        "group": "🌑 **SLAIN BY WOLVES**\n\nThe howls echoed through the darkness.\nWhen dawn broke, {victim_name} was found torn to pieces by savage claws."
+    },
+    
+    # ==================== HUNTER SCENARIOS ====================
+    "hunter_killed_by_wolves": {
+        "hunter": "💀 **YOU HAVE BEEN KILLED**\n\nThe wolf struck before you could react.\nYour bow falls from your grasp.\n\nYou are dead.",
+        "wolves": "🐺✅ **SUCCESSFUL HUNT**\n\nYou attacked the Hunter tonight.\nAfter a brief struggle, the pack prevailed.\n\nThe Hunter is dead.",
+        "group": "🐺💀 **HUNTER FALLS**\n\n{hunter_name} fought bravely, but the wolves overwhelmed them.\nTheir bow lies shattered in the dirt."
+    },
+    
+    "hunter_revenge_lynch_prompt": {
+        "hunter": "🏹 **YOUR FINAL MOMENT**\n\nThe noose tightens, but you still have one arrow left.\n\nChoose wisely - you have 30 seconds:",
+        "group_waiting": "🏹 {hunter_name} readies their final shot..."
+    },
+    
+    "hunter_revenge_lynch_success": {
+        "hunter": "🏹 You have shot {target_name}.",
+        "group": "🏹💀 {hunter_name}'s arrow flies true and strikes {target_name}!\n\nBoth fall to the ground, dead."
+    },
+    
+    "hunter_revenge_lynch_timeout": {
+        "group": "🏹⏰ Time ran out! {hunter_name}'s final arrow flies wild and strikes {target_name}!"
+    },
+    
+    "hunter_revenge_lynch_no_shot": {
+        "group": "🏹 {hunter_name}'s bow falls from their grasp... no final shot."
+    },
+    
+    "hunter_revenge_night_auto": {
+        "hunter": "🏹⚔️ **AUTO-REVENGE ACTIVATED**\n\nAs you fall, your arrow flies instinctively!\nIt strikes {target_name} dead.\n\nYou take one of them with you.",
+        "group": "🏹💀 **HUNTER'S REVENGE**\n\nAs {hunter_name} fell to the wolves, their final arrow struck {target_name}!\n\nBoth lie dead in the darkness."
+    },
+    
+    # ==================== SERIAL KILLER SCENARIOS ====================
+    "sk_killed_hunter": {
+        "sk": "🔪✅ **SUCCESSFUL KILL**\n\nYou hunted the Hunter tonight.\nYour blade was faster than their arrow.\n\nAnother victim falls to your cunning.",
+        "hunter": "💀 **YOU HAVE BEEN KILLED**\n\nThe Serial Killer struck with deadly efficiency.\nYou reached for your bow, but it was too late.\n\nYour story ends here.",
+        "group": "🔪💀 **BRUTAL MURDER**\n\n{hunter_name} was found in a pool of blood.\nThe wounds are methodical, precise, terrifying.\n\nThe Serial Killer strikes again."
+    },
+    
+    "sk_killed_by_hunter": {
+        "sk": "💀 **YOU HAVE BEEN KILLED**\n\nYou attacked the Hunter tonight.\nTheir reflexes were faster. An arrow found your heart.\n\nYour killing spree has ended.",
+        "hunter": "🏹🔪 **DEADLY ENCOUNTER!**\n\nThe Serial Killer lunged at you with brutal precision!\nBut your hunter instincts kicked in—you fired first!\n\nThe Serial Killer lies dead. You survived the night.",
+        "group": "🏹💀 **PREDATOR SLAIN**\n\n{hunter_name} confronted the Serial Killer in the darkness!\nA single arrow ended the killing spree.\n\n{sk_name} lies dead. The Hunter survives."
+    },
+    
+    "sk_normal_kill": {
+        "victim": "💀 **YOU HAVE BEEN KILLED**\n\nThe Serial Killer found you in the darkness.\nYour death was swift, methodical.\n\nYour story ends here.",
+        "sk": "🔪✅ **ANOTHER VICTIM**\n\nYou hunted {victim_name} tonight.\nYour blade struck true.\n\nThe body count rises.",
+        "group": "🔪 **BRUTAL MURDER**\n\n{victim_name} was found in a pool of blood.\nThe wounds are methodical, precise, terrifying.\n\nThis was no animal attack. A predator stalks the village."
+    },
+    
+    # ==================== VIGILANTE SCENARIOS ====================
+    "vigilante_killed_innocent": {
+        "vigilante": "💀 **YOU KILLED AN INNOCENT**\n\n{victim_name} was a {role_name}—a member of the village.\n\nOverwhelmed by guilt, you take your own life.\n\nYou are now dead.",
+        "victim": "💀 **YOU HAVE BEEN KILLED**\n\nThe Vigilante struck you down in the darkness.\nYou were innocent.\n\nYour story ends here.",
+        "group": "⚔️💀 **VIGILANTE JUSTICE GONE WRONG**\n\nThe Vigilante killed {victim_name} in the shadows.\nBut {victim_name} was a {role_name}—innocent!\n\nOvercome with guilt, the Vigilante took their own life.\n\nTwo bodies lie in the dust."
+    },
+    
+    "vigilante_killed_evil": {
+        "vigilante": "⚔️✅ **JUSTICE SERVED**\n\nYou killed {victim_name} tonight.\nThey were {role_name}—evil purged from the village.\n\nYour conscience is clear.",
+        "victim": "💀 **JUSTICE FINDS YOU**\n\nThe Vigilante's blade found you in the darkness.\nYour evil deeds end here.\n\nYou are dead.",
+        "group": "⚔️💀 **VIGILANTE JUSTICE**\n\nJustice was swift and merciless.\n{victim_name} was executed in the shadows.\n\nThey were the {role_name}."
+    },
+    
+    # ==================== FIRE TEAM SCENARIOS ====================
+    "fire_douse": {
+        "arsonist": "🔥 You have doused {target_name} in gasoline.\nThey reek of accelerant, ready to burn.",
+        "fire_starter": "🔥 You have doused {target_name} in gasoline.\nThey are marked for the flames.",
+        "target": None,  # Target doesn't know
+        "group": None  # Hidden action
+    },
+    
+    "fire_ignite": {
+        "igniter": "🔥 You have ignited the fire! All doused players will burn tonight.",
+        "doused_victim": "💀 **YOU BURN ALIVE**\n\nFlames erupt from nowhere!\nYour skin blisters, your lungs fill with smoke.\n\nYou were doused. Now you burn.\n\nYou are dead.",
+        "group": "🔥💀 **INFERNO UNLEASHED**\n\n{victim_name} bursts into flames!\nTheir screams are drowned by the roaring fire.\n\nOnly ashes remain."
+    },
+    
+    # ==================== WITCH SCENARIOS ====================
+    "witch_poison": {
+        "witch": "☠️✅ **POISON DELIVERED**\n\nYou poisoned {victim_name} tonight.\nThey will not see another dawn.",
+        "victim": "💀 **POISONED**\n\nA foul substance courses through your veins.\nYour vision blurs, your heart slows...\n\nYou are dead.",
+        "group": "☠️💀 **DARK MAGIC**\n\nA foul stench fills the air.\n{victim_name} lies still, poisoned by dark magic."
+    },
+    
+    "witch_heal": {
+        "witch": "💊✅ **LIFE RESTORED**\n\nYou used your heal potion on {target_name}.\nThey were dead, but now they live again.\n\nYour magic saved them.",
+        "healed": "💊✨ **YOU HAVE BEEN REVIVED**\n\nDarkness surrounded you...\nBut a warm light pulled you back!\n\nYou are alive again!",
+        "group": "✨ **MIRACULOUS REVIVAL**\n\n{healed_name} was dead...\nBut the Witch's magic brought them back to life!\n\nThey live once more."
+    },
+    
+    # ==================== DOCTOR/PROTECTION SCENARIOS ====================
+    "doctor_saved": {
+        "doctor": "💊✅ **LIFE SAVED**\n\nYou healed {target_name} tonight.\nThey were attacked, but your medicine saved them.\n\nYou are a hero.",
+        "saved": "💊 **YOU WERE SAVED**\n\nYou felt death's cold touch tonight...\nBut someone intervened. You survived.\n\nThank your guardian angel.",
+        "group": "🙏 **DIVINE INTERVENTION**\n\nDeath came for {target_name}… but a gentle light shielded them.\nThey survived the night."
+    },
+    
+    "doctor_wasted": {
+        "doctor": "💊 **PROTECTION UNUSED**\n\nYou healed {target_name} tonight.\nFortunately, they were not attacked.\n\nYour protection went unused.",
+        "protected": None,  # They don't know
+        "group": None  # Hidden
+    },
+    
+    "bodyguard_sacrifice": {
+        "bodyguard": "💀 **HEROIC SACRIFICE**\n\nYou threw yourself in front of {target_name}!\nThe attack meant for them struck you instead.\n\nYou are now dead. But they live because of you.",
+        "protected": "🛡️ **SOMEONE DIED FOR YOU**\n\nAn attack came in the darkness!\nBut someone leapt in front of you—taking the blow themselves.\n\nYou survived. They did not.",
+        "group": "🛡️💀 **HEROIC SACRIFICE**\n\n{bodyguard_name} threw themselves in front of {target_name}!\nThey took the fatal blow.\n\n{bodyguard_name} is dead. {target_name} lives."
+    },
+    
+    "bodyguard_wasted": {
+        "bodyguard": "🛡️ **GUARD DUTY**\n\nYou guarded {target_name} tonight.\nFortunately, they were not attacked.\n\nYour watch was peaceful.",
+        "protected": None,
+        "group": None
+    },
+    
+    # ==================== PRIEST SCENARIOS ====================
+    "priest_prevented_conversion": {
+        "priest": "⛪✅ **BLESSING SAVED THEM**\n\nYou blessed {target_name} tonight.\nThe wolves tried to convert them, but your blessing blocked it!\n\nThey remain pure.",
+        "blessed": "⛪ **YOU FEEL PROTECTED**\n\nA holy warmth surrounds you.\nYou feel shielded from dark magic.",
+        "group": None  # Hidden
+    },
+    
+    "priest_blessed_but_killed": {
+        "priest": "⛪ **BLESSING INCOMPLETE**\n\nYou blessed {target_name} tonight.\nYour blessing prevented conversion, but they were still killed.\n\nYour magic has limits.",
+        "blessed": "⛪💀 **BLESSED BUT SLAIN**\n\nA holy warmth surrounds you... but it fades.\nThe blessing protected your soul, but not your body.\n\nYou are dead.",
+        "group": None  # Hidden
+    },
+    
+    # ==================== CONVERSION SCENARIOS ====================
+    "alpha_wolf_conversion": {
+        "converted": "🌑 **CURSED TRANSFORMATION**\n\nYour blood burns with the curse of the wolf.\nBy the next moonrise, you will howl with the pack.\n\nYou are now a Werewolf 🐺.",
+        "wolves": "🐺✨ **NEW PACK MEMBER**\n\n{converted_name} has been bitten and turned!\nThey join the pack tonight.\n\nWelcome them, brothers.",
+        "group": None  # Hidden from group
+    },
+    
+    "cursed_villager_conversion": {
+        "converted": "😨🐺 **THE CURSE AWAKENS**\n\nThe wolf's claws tore into you...\nBut instead of dying, something else happened.\n\nThe dormant curse activates. You are now a Werewolf 🐺!",
+        "wolves": "🐺✨ **THE CURSE REVEALED**\n\n{converted_name} was a Cursed Villager!\nThe attack triggered their transformation.\n\nThey join the pack tonight!",
+        "group": None  # Hidden from group
+    },
+    
+    # ==================== PLAGUE SCENARIOS ====================
+    "plague_infected": {
+        "target": "🦠 You feel feverish and weak... something is wrong.\nYou have been **infected with the plague**!\n\nYou will succumb to the disease tomorrow night unless cured.",
+        "plague_doctor": "🦠 You have infected {target_name} with the plague.\nThey will die in two nights unless saved.",
+        "group": None  # Hidden
+    },
+    
+    "plague_death": {
+        "victim": "💀 **THE PLAGUE CLAIMS YOU**\n\nYour body burns with fever.\nThe infection has spread too far.\n\nYou succumb to the disease.",
+        "group": "🦠💀 **PLAGUE VICTIM**\n\nThe disease finally claimed its victim.\n{victim_name} succumbed to the plague."
+    },
+    
+    # ==================== LYNCH SCENARIOS ====================
+    "lynch": {
+        "victim": "💀 **THE VILLAGE HAS CONDEMNED YOU**\n\nThe rope tightens around your neck.\nThe mob's judgment is final.\n\nYour story ends here.",
+        "group": "🔔💀 **LYNCHED**\n\nThe mob surrounds {victim_name}.\nBy the end of the day, the rope swings...\n\n{victim_name} is dead. They were the {role_name}."
+    },
+    
+    "lynch_jester_win": {
+        "jester": "🤡✅ **PERFECT DECEPTION**\n\nThey lynched you!\nYour foolish act was perfect.\n\n**YOU WIN!**",
+        "group": "🔔💀 The mob surrounds {victim_name}.\nBy the end of the day, the rope swings…\n\nThey were the 🤡 **Jester**.\n\n🤡 The villagers laugh as the fool swings…\nYet the Jester grins. His twisted game is complete."
+    },
+    
+    "lynch_executioner_win": {
+        "executioner": "🪓✅ **TARGET ELIMINATED**\n\nYour target has been lynched!\nYour contract is complete.\n\n**YOU WIN!**",
+        "group": "🔔💀 The mob surrounds {victim_name}.\nBy the end of the day, the rope swings…\n\nThey were the {role_name}.\n\n🪓 {executioner_name} smiles coldly. Their target has been eliminated.\nThe Executioner wins!"
+    },
+    
+    # ==================== SPECIAL SCENARIOS ====================
+    "lover_grief": {
+        "lover": "💔 **YOUR BELOVED HAS FALLEN**\n\n{beloved_name} is dead.\nYou cannot bear to live without them.\n\nYou take your own life.\n\nYou are dead.",
+        "group": "💔 {lover_name} dies of grief after {beloved_name}'s death.\n\nThe lovers are reunited in death."
+    },
+    
+    "afk_removal": {
+        "victim": "🚫 **REMOVED FOR INACTIVITY**\n\nYou've been inactive for {afk_count} consecutive rounds.\nYou have been removed from the game.",
+        "group": "⏰ {victim_name} was removed from the game due to inactivity (AFK)."
+    },
+    
+    "seer_inherit": {
+        "apprentice": "🔮 **THE VISIONS COME TO YOU**\n\nThe Seer has fallen. Their visions now flow through you.\n\nYou are now the Seer.",
+        "group": None  # Hidden
+    },
+    
+    "executioner_target_died": {
+        "executioner": "💔 **YOUR TARGET HAS DIED**\n\nYour target died without being lynched.\nYour contract is void.\n\nYou are now a regular Villager.",
+        "group": None  # Hidden
+    },
+    
+    # ==================== PEACEFUL SCENARIOS ====================
+    "no_deaths": {
+        "group": "🌙 The night passed quietly… no blood was spilled.\n\nEveryone survived the night."
+    },
+    
+    "no_lynch_tie": {
+        "group": "🤔 The villagers argue until the sun sets.\nNo one was chosen today. (Tie between: {candidates})\n\nThe shadows return as night begins."
+    },
+    
+    "no_lynch_abstain": {
+        "group": "🤔 The villagers mostly abstained. No one is lynched today.\n\nThe night falls peacefully."
+    }
+}
+
+
+def get_death_narrative(situation: str, role: str, **kwargs) -> str:
+    """Get narrative message for a specific death situation and role"""
+    narratives = DEATH_NARRATIVES.get(situation, {})
+    message = narratives.get(role)
+    
+    if message is None:
+        return None
+    
+    # Format with provided kwargs
+    try:
+        return message.format(**kwargs)
+    except (KeyError, ValueError) as e:
+        logger.warning(f"Failed to format narrative {situation}/{role}: {e}")
+        return message
+
+
+logger.info("Narratives module loaded successfully")
@@ -0,0 +1,123 @@
+import logging
+from typing import Any, Dict, Iterator, List, Optional
+
+from enums import ActionType
+
+logger = logging.getLogger(__name__)
+
+
+class NightAction:
+    """One recorded action: who did what to whom (plus any extra details)"""
+
+    __slots__ = ('kind', 'actor', 'target', 'data')
+
+    def __init__(self, kind: ActionType, actor: int, target: Optional[int] = None, data: Optional[Dict[str, Any]] = None):
+        self.kind = kind
+        self.actor = actor
+        self.target = target
+        self.data = data or {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.data.get(key, default)
+
+    def __repr__(self) -> str:
+        return f"NightAction({self.kind.value}, actor={self.actor}, target={self.target})"
+
+
+class NightActions:
+    """
+    The actions recorded for one night, bucketed by kind.
+
+    Each kind keeps its actions per actor (in recording order), and a second
+    index maps target -> kind -> actions, so "what did X do", "who visited Y"
+    and "which wolves voted for Z" are dictionary lookups instead of scans.
+    """
+
+    def __init__(self):
+        self._by_kind: Dict[ActionType, Dict[int, List[NightAction]]] = {}
+        self._by_target: Dict[int, Dict[ActionType, List[NightAction]]] = {}
+        self._count = 0
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    def set(self, kind: ActionType, actor: int, target: Optional[int] = None, **data) -> NightAction:
+        """Record actor's action of this kind, replacing any earlier choice"""
+        self.remove(kind, actor)
+        return self.add(kind, actor, target, **data)
+
+    def add(self, kind: ActionType, actor: int, target: Optional[int] = None, **data) -> NightAction:
+        """Record another action of this kind for actor (multi-douses, borrows)"""
+        action = NightAction(kind, actor, target, data)
+        self._by_kind.setdefault(kind, {}).setdefault(actor, []).append(action)
+        if target is not None:
+            self._by_target.setdefault(target, {}).setdefault(kind, []).append(action)
+        self._count += 1
+        return action
+
+    def remove(self, kind: ActionType, actor: int) -> bool:
+        """Drop every action of this kind by actor; True if there were any"""
+        actions = self._by_kind.get(kind, {}).pop(actor, None)
+        if not actions:
+            return False
+        for action in actions:
+            if action.target is not None:
+                bucket = self._by_target[action.target][kind]
+                bucket.remove(action)
+                if not bucket:
+                    del self._by_target[action.target][kind]
+        self._count -= len(actions)
+        return True
+
+    def clear(self):
+        self._by_kind.clear()
+        self._by_target.clear()
+        self._count = 0
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def get(self, kind: ActionType, actor: int) -> Optional[NightAction]:
+        """actor's latest action of this kind"""
+        actions = self._by_kind.get(kind, {}).get(actor)
+        return actions[-1] if actions else None
+
+    def has(self, kind: ActionType) -> bool:
+        return bool(self._by_kind.get(kind))
+
+    def of_kind(self, kind: ActionType) -> List[NightAction]:
+        """Every action of this kind, grouped by actor in the order actors first acted"""
+        by_actor = self._by_kind.get(kind)
+        if not by_actor:
+            return []
+        return [action for actions in by_actor.values() for action in actions]
+
+    def by_actor(self, actor: int, kind: ActionType) -> List[NightAction]:
+        return list(self._by_kind.get(kind, {}).get(actor, ()))
+
+    def targeting(self, target: int, kind: Optional[ActionType] = None) -> List[NightAction]:
+        """Actions aimed at target, of one kind or of every kind ("who visited X")"""
+        by_kind = self._by_target.get(target)
+        if not by_kind:
+            return []
+        if kind is not None:
+            return list(by_kind.get(kind, ()))
+        return [action for actions in by_kind.values() for action in actions]
+
+    def actors_targeting(self, target: int, kind: ActionType) -> List[int]:
+        """Actors who aimed an action of this kind at target ("which wolves voted for Y")"""
+        return [action.actor for action in self._by_target.get(target, {}).get(kind, ())]
+
+    def __iter__(self) -> Iterator[NightAction]:
+        for by_actor in self._by_kind.values():
+            for actions in by_actor.values():
+                yield from actions
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __bool__(self) -> bool:
+        return self._count > 0
+
+
+logger.info("Night actions module loaded successfully")
@@ -0,0 +1,581 @@
+import logging
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+from enums import Team, Role, ActionType
+from game import Game, Player
+from night_actions import NightActions
+from narratives import get_death_narrative
+
+logger = logging.getLogger(__name__)
+
+PACK_ROLES = (Role.WEREWOLF, Role.ALPHA_WOLF, Role.WOLF_SHAMAN)
+ATTACKING_WOLF_ROLES = (Role.WEREWOLF, Role.ALPHA_WOLF)
+MIRROR_KILLER_ROLES = (Role.WEREWOLF, Role.ALPHA_WOLF, Role.SERIAL_KILLER, Role.VIGILANTE)
+
+
+class OutboundMessage:
+    """A message the delivery stage should send"""
+
+    __slots__ = ('chat_id', 'text', 'only_if_alive')
+
+    def __init__(self, chat_id: int, text: str, only_if_alive: Optional[int] = None):
+        self.chat_id = chat_id
+        self.text = text
+        # Skip sending if this player is dead by delivery time (e.g. a seer killed tonight)
+        self.only_if_alive = only_if_alive
+
+
+class NightOutcome:
+    """
+    Everything one night decided, with nothing applied yet.
+
+    changes are (user_id, attribute, value) assignments made before deaths are
+    processed; late_changes (thief and mirror role swaps) come after them.
+    messages go out before deaths, reports after.
+    """
+
+    __slots__ = (
+        'killed', 'saved', 'blocked', 'converted', 'revived', 'infected', 'ignited',
+        'changes', 'late_changes', 'messages', 'reports',
+        'protect_events', 'investigate_events', 'game_actions',
+    )
+
+    def __init__(self):
+        self.killed: List[int] = []
+        self.saved: List[int] = []
+        self.blocked: List[int] = []
+        self.converted: List[int] = []
+        self.revived: List[int] = []
+        self.infected: List[int] = []
+        self.ignited = False
+        self.changes: List[Tuple[int, str, Any]] = []
+        self.late_changes: List[Tuple[int, str, Any]] = []
+        self.messages: List[OutboundMessage] = []
+        self.reports: List[OutboundMessage] = []
+        # Ranking hooks: (user_id, target_attacked) and (user_id, target_role, is_evil)
+        self.protect_events: List[Tuple[int, bool]] = []
+        self.investigate_events: List[Tuple[int, Role, bool]] = []
+        # Per-game action counters: (user_id, action, amount)
+        self.game_actions: List[Tuple[int, str, int]] = []
+
+    def kill(self, user_id: int):
+        if user_id not in self.killed:
+            self.killed.append(user_id)
+
+    def spare(self, user_id: int):
+        if user_id in self.killed:
+            self.killed.remove(user_id)
+
+
+class _NightResolver:
+    """One resolution pass; tracks who is alive and which role they hold as decisions unfold"""
+
+    def __init__(self, game: Game, actions: NightActions, rng):
+        self.game = game
+        self.players: Dict[int, Player] = game.players
+        self.actions = actions
+        self.rng = rng
+        self.outcome = NightOutcome()
+        self.alive = {user_id for user_id, player in self.players.items() if player.is_alive}
+        self.roles: Dict[int, Optional[Role]] = {}
+        self.track_stats = not game.custom_game
+
+    # ------------------------------------------------------------------
+    # View helpers
+    # ------------------------------------------------------------------
+    def role_of(self, user_id: int) -> Optional[Role]:
+        role = self.roles.get(user_id)
+        return role if role is not None else self.players[user_id].role
+
+    def set_role(self, user_id: int, role: Role, late: bool = False):
+        self.roles[user_id] = role
+        (self.outcome.late_changes if late else self.outcome.changes).append((user_id, 'role', role))
+
+    def alive_in_order(self, ids) -> List[int]:
+        return [user_id for user_id in self.players if user_id in ids]
+
+    def pack(self, exclude: int) -> List[int]:
+        return [user_id for user_id in self.alive_in_order(self.alive)
+                if user_id != exclude and self.role_of(user_id) in PACK_ROLES]
+
+    def send(self, chat_id: int, text: Optional[str]):
+        if text:
+            self.outcome.messages.append(OutboundMessage(chat_id, text))
+
+    def report(self, chat_id: int, text: str, only_if_alive: Optional[int] = None):
+        self.outcome.reports.append(OutboundMessage(chat_id, text, only_if_alive))
+
+    def count(self, user_id: int, action: str, amount: int = 1):
+        if self.track_stats:
+            self.outcome.game_actions.append((user_id, action, amount))
+
+    # ------------------------------------------------------------------
+    # Resolution, in the order the night has always been processed
+    # ------------------------------------------------------------------
+    def resolve(self) -> NightOutcome:
+        blocked = self.outcome.blocked
+        for kind in (ActionType.SHAMAN_BLOCK, ActionType.FIRE_STARTER_BLOCK):
+            for action in self.actions.of_kind(kind):
+                blocked.append(action.target)
+
+        wolf_victim = self.resolve_wolf_hunt()
+        self.resolve_webkeepers()
+        self.resolve_protection()
+        self.resolve_priests(wolf_victim)
+        self.resolve_serial_killers()
+        self.resolve_vigilantes()
+        self.resolve_witches()
+        self.resolve_fire_team()
+        self.resolve_doppelgangers()
+        self.resolve_conversions()
+        self.resolve_plague()
+
+        # Everything below sees the night's deaths
+        self.alive.difference_update(self.outcome.killed)
+        self.resolve_investigations()
+        self.resolve_thieves()
+        self.resolve_mirror_phantoms()
+        self.resolve_oracles()
+        return self.outcome
+
+    def resolve_wolf_hunt(self) -> Optional[int]:
+        voters: Dict[int, List[int]] = {}
+        for action in self.actions.of_kind(ActionType.WOLF_HUNT):
+            if action.target is not None and action.target not in voters:
+                voters[action.target] = self.actions.actors_targeting(action.target, ActionType.WOLF_HUNT)
+        if not voters:
+            return None
+
+        max_votes = max(len(ids) for ids in voters.values())
+        candidates = [target_id for target_id, ids in voters.items() if len(ids) == max_votes]
+        wolf_victim = self.rng.choice(candidates) if len(candidates) > 1 else candidates[0]
+        outcome = self.outcome
+
+        # The attacking wolf (for Hunter/SK counters): a Werewolf before an Alpha Wolf
+        attackers = [actor_id for actor_id in voters[wolf_victim]
+                     if actor_id in self.alive and self.role_of(actor_id) in ATTACKING_WOLF_ROLES]
+        attackers.sort(key=lambda actor_id: 0 if self.role_of(actor_id) == Role.WEREWOLF else 1)
+        attacker_id = attackers[0] if attackers else voters[wolf_victim][0]
+        attacker = self.players[attacker_id]
+
+        alpha_alive = any(self.role_of(user_id) == Role.ALPHA_WOLF for user_id in self.alive)
+        victim_role = self.role_of(wolf_victim)
+        handled = False
+
+        # HUNTER - 50% chance to counter-kill attacker
+        if victim_role == Role.HUNTER and wolf_victim in self.alive:
+            if self.rng.random() < 0.5:
+                self.alive.discard(attacker_id)
+                outcome.kill(attacker_id)
+                self.send(wolf_victim, get_death_narrative("wolf_killed_by_hunter", "hunter"))
+                self.send(attacker_id, get_death_narrative("wolf_killed_by_hunter", "wolf"))
+                for wolf_id in self.pack(attacker_id):
+                    self.send(wolf_id, get_death_narrative("wolf_killed_by_hunter", "pack", wolf_name=attacker.first_name))
+            else:
+                outcome.kill(wolf_victim)
+                self.send(wolf_victim, get_death_narrative("hunter_killed_by_wolves", "hunter"))
+            handled = True
+
+        # CURSED VILLAGER - always converts
+        elif victim_role == Role.CURSED_VILLAGER:
+            outcome.converted.append(wolf_victim)
+            handled = True
+
+        # SERIAL KILLER - 65% chance to kill the attacking wolf
+        elif victim_role == Role.SERIAL_KILLER and wolf_victim in self.alive:
+            if self.rng.random() < 0.65:
+                self.alive.discard(attacker_id)
+                outcome.kill(attacker_id)
+                self.send(wolf_victim, (
+                    "🔪⚔️ **YOU WERE ATTACKED!**\n\n"
+                    "The werewolves tried to hunt you tonight, "
+                    "but you fought back with deadly precision!\n\n"
+                    "One of the wolves lies dead at your feet. "
+                    "Your bloodlust remains unsatisfied... for now."
+                ))
+                self.send(attacker_id, (
+                    "💀 **YOU HAVE BEEN KILLED**\n\n"
+                    "You attacked the Serial Killer tonight.\n"
+                    "It was a fatal mistake.\n\n"
+                    "You are now dead and cannot participate further."
+                ))
+                for wolf_id in self.pack(attacker_id):
+                    self.send(wolf_id, (
+                        "🐺⚠️ **PACK ALERT**\n\n"
+                        f"Your packmate {attacker.first_name} attacked the Serial Killer "
+                        "and was killed in the confrontation.\n\n"
+                        "The pack must be more careful..."
+                    ))
+            else:
+                outcome.kill(wolf_victim)
+                self.send(wolf_victim, (
+                    "💀 **YOU HAVE BEEN KILLED**\n\n"
+                    "The werewolf pack surrounded you tonight.\n"
+                    "You fought viciously, but there were too many.\n\n"
+                    "Your reign of terror has ended."
+                ))
+                self.send(attacker_id, (
+                    "🐺✅ **SUCCESSFUL HUNT**\n\n"
+                    "You attacked the Serial Killer tonight.\n"
+                    "After a vicious struggle, the pack prevailed.\n\n"
+                    "The Serial Killer is dead."
+                ))
+            handled = True
+
+        # ALPHA WOLF CONVERSION (20% chance, not Cursed or SK)
+        if not handled and alpha_alive and self.rng.random() < 0.2:
+            outcome.converted.append(wolf_victim)
+            handled = True
+
+        if not handled:
+            outcome.kill(wolf_victim)
+        return wolf_victim
+
+    def resolve_webkeepers(self):
+        blocked = self.outcome.blocked
+        for web_action in self.actions.of_kind(ActionType.WEBKEEPER_MARK):
+            webkeeper_id = web_action.actor
+            if webkeeper_id not in self.alive:
+                continue
+            guarded_ids = [user_id for user_id in self.alive_in_order(self.alive)
+                           if self.role_of(user_id).team == Team.KILLER] + [webkeeper_id]
+            for guarded_id in guarded_ids:
+                for visit in self.actions.targeting(guarded_id):
+                    if visit.actor and visit.actor not in blocked:
+                        blocked.append(visit.actor)
+
+    def resolve_protection(self):
+        outcome = self.outcome
+        for action in self.actions.of_kind(ActionType.DOCTOR):
+            if action.actor in outcome.blocked:
+                continue
+            attacked = action.target in outcome.killed
+            if attacked:
+                outcome.spare(action.target)
+                outcome.saved.append(action.target)
+            if self.track_stats:
+                outcome.protect_events.append((action.actor, attacked))
+            self.count(action.actor, 'successful_protection' if attacked else 'wasted_protection')
+
+        for action in self.actions.of_kind(ActionType.BODYGUARD):
+            if action.actor in outcome.blocked:
+                continue
+            attacked = action.target in outcome.killed
+            if attacked:
+                outcome.spare(action.target)
+                outcome.saved.append(action.target)
+                # Dies in the protected player's place, unless they were shielding a wolf
+                if self.role_of(action.target).team != Team.WOLF:
+                    outcome.kill(action.actor)
+            if self.track_stats:
+                outcome.protect_events.append((action.actor, attacked))
+            if attacked:
+                self.count(action.actor, 'successful_protection', 3)  # Extra points for sacrifice
+            else:
+                self.count(action.actor, 'wasted_protection')
+
+    def resolve_priests(self, wolf_victim: Optional[int]):
+        outcome = self.outcome
+        for action in self.actions.of_kind(ActionType.PRIEST):
+            if action.actor in outcome.blocked or action.target not in self.players:
+                continue
+            outcome.changes.append((action.target, 'is_blessed', True))
+            if action.target in outcome.converted:
+                outcome.converted.remove(action.target)
+                # Still killed by wolves if attacked
+                if wolf_victim == action.target:
+                    outcome.kill(action.target)
+
+    def resolve_serial_killers(self):
+        outcome = self.outcome
+        for action in self.actions.of_kind(ActionType.SERIAL_KILLER_KILL):
+            sk_id, victim_id = action.actor, action.target
+            if sk_id in outcome.blocked or victim_id not in self.players or victim_id not in self.alive:
+                continue
+
+            if self.role_of(victim_id) != Role.HUNTER:
+                outcome.kill(victim_id)
+            elif self.rng.random() < 0.5:
+                # Hunter survives AND kills SK
+                self.alive.discard(sk_id)
+                outcome.kill(sk_id)
+                self.send(victim_id, (
+                    "🏹🔪 **DEADLY ENCOUNTER!**\n\n"
+                    "The Serial Killer lunged at you with brutal precision!\n"
+                    "But your hunter instincts kicked in—you fired first!\n\n"
+                    "The Serial Killer lies dead. You survived the night."
+                ))
+                self.send(sk_id, (
+                    "💀 **YOU HAVE BEEN KILLED**\n\n"
+                    "You attacked the Hunter tonight.\n"
+                    "Their reflexes were faster. An arrow found your heart.\n\n"
+                    "Your killing spree has ended."
+                ))
+            else:
+                outcome.kill(victim_id)
+                self.send(victim_id, (
+                    "💀 **YOU HAVE BEEN KILLED**\n\n"
+                    "The Serial Killer struck with deadly efficiency.\n"
+                    "You reached for your bow, but it was too late.\n\n"
+                    "Your story ends here."
+                ))
+                self.send(sk_id, (
+                    "🔪✅ **SUCCESSFUL KILL**\n\n"
+                    "You hunted the Hunter tonight.\n"
+                    "Your blade was faster than their arrow.\n\n"
+                    "Another victim falls to your cunning."
+                ))
+
+    def resolve_vigilantes(self):
+        outcome = self.outcome
+        for action in self.actions.of_kind(ActionType.VIGILANTE_KILL):
+            vigilante_id, victim_id = action.actor, action.target
+            if vigilante_id in outcome.blocked:
+                continue
+            if self.role_of(victim_id).team == Team.VILLAGER:
+                # Killed an innocent: takes their own life too
+                outcome.changes.append((vigilante_id, 'vigilante_killed_innocent', True))
+                outcome.kill(vigilante_id)
+                outcome.kill(victim_id)
+                self.count(vigilante_id, 'vigilante_kill_village')
+            else:
+                outcome.kill(victim_id)
+                self.count(vigilante_id, 'lynch_evil', 2)
+
+    def resolve_witches(self):
+        outcome = self.outcome
+        for action in self.actions.of_kind(ActionType.WITCH_POISON):
+            if action.target in self.players and action.target in self.alive:
+                outcome.kill(action.target)
+                if self.role_of(action.target).team != Team.VILLAGER:
+                    self.count(action.actor, 'witch_poison_evil', 2)
+                else:
+                    self.count(action.actor, 'major_mistake')
+
+        for action in self.actions.of_kind(ActionType.WITCH_HEAL):
+            if action.target in self.players and action.target not in self.alive:
+                self.alive.add(action.target)
+                outcome.revived.append(action.target)
+
+    def resolve_fire_team(self):
+        outcome = self.outcome
+        players = self.players
+        blocked = outcome.blocked
+        doused: List[int] = []
+
+        boosted = any(action.actor not in blocked for action in self.actions.of_kind(ActionType.ACCELERANT_BOOST))
+        if boosted:
+            # The arsonist gets up to 3 douses of their own choosing
+            for action in self.actions.of_kind(ActionType.ARSONIST_DOUSE):
+                if action.actor not in blocked and action.get("number", 1) <= 3:
+                    target_id = action.target
+                    if target_id in self.alive and not players[target_id].is_doused:
+                        doused.append(target_id)
+        else:
+            # Normal mode: Fire Team votes on ONE target
+            douse_votes: Dict[int, int] = {}
+            for kind in (ActionType.ARSONIST_DOUSE, ActionType.FIRE_STARTER_DOUSE):
+                for action in self.actions.of_kind(kind):
+                    if action.actor not in blocked:
+                        douse_votes[action.target] = douse_votes.get(action.target, 0) + 1
+
+            if douse_votes:
+                max_votes = max(douse_votes.values())
+                valid = [target_id for target_id, count in douse_votes.items()
+                         if count == max_votes and target_id in self.alive and not players[target_id].is_doused]
+                if valid:
+                    doused.append(self.rng.choice(valid))
+
+            # Blazebringer's 40% bonus douse (one per night)
+            for action in self.actions.of_kind(ActionType.FIRE_STARTER_DOUSE):
+                if action.actor not in blocked and self.rng.random() < 0.4:
+                    not_doused = [user_id for user_id in self.alive_in_order(self.alive)
+                                  if user_id not in doused and not players[user_id].is_doused]
+                    if not_doused:
+                        doused.append(self.rng.choice(not_doused))
+                    break
+
+        doused_now = set()
+        for target_id in doused:
+            if target_id not in doused_now and target_id in self.alive:
+                doused_now.add(target_id)
+                outcome.changes.append((target_id, 'is_doused', True))
+
+        if self.actions.has(ActionType.IGNITE):
+            outcome.ignited = True
+            for user_id in self.alive_in_order(self.alive):
+                if user_id in doused_now or players[user_id].is_doused:
+                    outcome.kill(user_id)
+
+    def resolve_doppelgangers(self):
+        for user_id in self.alive_in_order(self.alive):
+            player = self.players[user_id]
+            if self.role_of(user_id) != Role.DOPPELGANGER or player.doppelganger_copied_role is not None:
+                continue
+            target_id = player.doppelganger_target_id
+            if not target_id or target_id not in self.players or target_id in self.alive:
+                continue
+            copied = self.role_of(target_id)
+            if copied:
+                self.outcome.changes.append((user_id, 'doppelganger_copied_role', copied))
+                self.set_role(user_id, copied)
+                self.send(user_id, f"🎭 Your target {self.players[target_id].first_name} has died!\n\n"
+                                   f"You have become the {copied.emoji} {copied.role_name}.")
+
+    def resolve_conversions(self):
+        for user_id in self.outcome.converted:
+            self.set_role(user_id, Role.WEREWOLF)
+            self.send(user_id, "🌑 Your blood burns with the curse of the wolf.\n"
+                               "By the next moonrise, you will howl with the pack.\n\nYou are now a Werewolf 🐺.")
+            mention = self.players[user_id].mention
+            for wolf_id in self.alive_in_order(self.alive):
+                if wolf_id != user_id and self.role_of(wolf_id).team == Team.WOLF:
+                    self.send(wolf_id, f"🐺 {mention} has joined the pack!")
+
+    def resolve_plague(self):
+        players = self.players
+        infected = self.outcome.infected
+
+        for action in self.actions.of_kind(ActionType.PLAGUE_INFECT):
+            target_id = action.target
+            if target_id in self.alive and not players[target_id].is_plagued and target_id not in infected:
+                infected.append(target_id)
+
+        # Already-plagued players die tonight, after passing the disease on to whoever they met
+        carriers = [user_id for user_id in self.alive_in_order(self.alive)
+                    if players[user_id].is_plagued and user_id not in infected]
+        for carrier_id in carriers:
+            carrier = players[carrier_id]
+            for contact_id in (*carrier.night_visits, *carrier.visited_players):
+                if (contact_id in self.alive and not players[contact_id].is_plagued
+                        and contact_id not in infected):
+                    infected.append(contact_id)
+
+        for user_id in infected:
+            self.outcome.changes.append((user_id, 'is_plagued', True))
+        for carrier_id in carriers:
+            self.outcome.kill(carrier_id)
+
+    def resolve_investigations(self):
+        outcome = self.outcome
+        for user_id in outcome.infected:
+            self.report(user_id, "🦠 You feel feverish and weak... something is wrong.\n"
+                                 "You have been **infected with the plague**!\n"
+                                 "You will succumb to the disease tomorrow night unless cured.", only_if_alive=user_id)
+
+        for action in self.actions.of_kind(ActionType.SEER):
+            if action.actor not in self.alive or action.target not in self.players:
+                continue
+            target_role = self.role_of(action.target)
+            is_evil = target_role.team != Team.VILLAGER
+            self.report(action.actor, f"🔮 **VISION REVEALED**\n\nYou see that {self.players[action.target].first_name} "
+                                      f"is aligned with the **{'Evil' if is_evil else 'Villager'}** team.",
+                        only_if_alive=action.actor)
+            if self.track_stats:
+                outcome.investigate_events.append((action.actor, target_role, is_evil))
+            self.count(action.actor, 'investigate_evil' if is_evil else 'investigate_wrong')
+
+    def resolve_oracles(self):
+        outcome = self.outcome
+        for action in self.actions.of_kind(ActionType.ORACLE):
+            if action.actor not in self.alive or action.target not in self.players:
+                continue
+            target_role = self.role_of(action.target)
+            not_role = self.rng.choice([role for role in Role if role != target_role])
+            self.report(action.actor, f"🌟 **DIVINATION REVEALED**\n\nYou divine that {self.players[action.target].first_name} "
+                                      f"is **NOT** the {not_role.emoji} {not_role.role_name}.",
+                        only_if_alive=action.actor)
+            if self.track_stats:
+                outcome.investigate_events.append((action.actor, target_role, True))
+            self.count(action.actor, 'investigate_evil')
+
+    def resolve_thieves(self):
+        for action in self.actions.of_kind(ActionType.THIEF_STEAL):
+            if action.get("success", False) and action.actor in self.players and action.target in self.players:
+                stolen = self.role_of(action.target)
+                self.outcome.late_changes.append((action.actor, 'thief_stolen_role', stolen))
+                self.set_role(action.actor, stolen, late=True)
+
+    def resolve_mirror_phantoms(self):
+        late = self.outcome.late_changes
+        for user_id in self.alive_in_order(self.alive):
+            player = self.players[user_id]
+            if self.role_of(user_id) != Role.MIRROR_PHANTOM or player.mirror_ability_used or not player.night_visits:
+                continue
+            visitor_id = player.night_visits[0]
+            if visitor_id not in self.players:
+                continue
+            visitor = self.players[visitor_id]
+            stolen = self.role_of(visitor_id)
+            if not stolen or stolen == Role.VILLAGER:
+                continue
+
+            # A killer visiting has a 50% chance to shatter the Mirror Phantom instead
+            if stolen in MIRROR_KILLER_ROLES and self.rng.random() < 0.5:
+                self.outcome.kill(user_id)
+                self.report(user_id, "🪞💀 **YOU WERE KILLED**\n\nA killer's strike shattered your reflection...")
+                continue
+
+            # Role exchange: the phantom takes the visitor's role, the visitor is cursed
+            late.append((user_id, 'mirror_stolen_role', stolen))
+            self.set_role(user_id, stolen, late=True)
+            late.append((user_id, 'mirror_ability_used', True))
+            late.append((user_id, 'mirror_win_condition', stolen.team))
+            self.set_role(visitor_id, Role.MIRROR_PHANTOM, late=True)
+            late.append((visitor_id, 'mirror_ability_used', False))
+
+            self.report(user_id, f"🪞✨ **REFLECTION STOLEN!**\n\n"
+                                 f"{visitor.first_name} visited you!\n\n"
+                                 f"You absorbed their essence and became:\n"
+                                 f"{stolen.emoji} **{stolen.role_name}**\n\n"
+                                 f"They are now cursed as a Mirror Phantom.")
+            self.report(visitor_id, "🪞💀 **YOU HAVE BEEN CURSED!**\n\n"
+                                    "You visited the Mirror Phantom and your reflection was stolen!\n\n"
+                                    "You are now a **Mirror Phantom** yourself.\n"
+                                    "You cannot win - you can only observe and steal from visitors.\n\n"
+                                    "⚠️ **You lost your original role and win condition.**")
+
+
+def resolve_night(game: Game, actions: Optional[NightActions] = None, rng=random) -> NightOutcome:
+    """
+    Decide the outcome of a night without touching the game or sending anything.
+
+    rng only needs random()/choice(); pass a seeded random.Random for reproducible runs.
+    """
+    return _NightResolver(game, game.night_actions if actions is None else actions, rng).resolve()
+
+
+def _apply_changes(game: Game, changes: List[Tuple[int, str, Any]]):
+    for user_id, name, value in changes:
+        setattr(game.players[user_id], name, value)
+
+
+def apply_night_outcome(game: Game, outcome: NightOutcome):
+    """Apply everything decided before deaths: revives, statuses, conversions and stats"""
+    for user_id in outcome.revived:
+        player = game.players[user_id]
+        player.is_alive = True
+        if player in game.dead_players:
+            game.dead_players.remove(player)
+    if outcome.ignited:
+        game.arsonist_ignited = True
+    _apply_changes(game, outcome.changes)
+
+    if outcome.protect_events or outcome.investigate_events:
+        from ranking import on_player_protect, on_player_investigate
+        for user_id, attacked in outcome.protect_events:
+            on_player_protect(user_id, attacked)
+        for user_id, target_role, is_evil in outcome.investigate_events:
+            on_player_investigate(user_id, target_role, is_evil)
+    for user_id, action, amount in outcome.game_actions:
+        actions = game.players[user_id].game_actions
+        actions[action] = actions.get(action, 0) + amount
+
+
+def apply_late_changes(game: Game, outcome: NightOutcome):
+    """Apply the role swaps that happen after the night's deaths (Thief, Mirror Phantom)"""
+    _apply_changes(game, outcome.late_changes)
+
+
+logger.info("Night resolution module loaded successfully")
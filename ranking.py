@@ -1,13 +1,15 @@
 import logging
-import sqlite3
 import json
-import asyncio
+import threading
+import bisect
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
 from enum import Enum
 
 from enums import Team, Role
+from config import RANKINGS_DB_PATH
+from database import ConnectionManager
 from telegram import Update
 from telegram.ext import ContextTypes
 
@@ -42,73 +44,225 @@ class GameResult:
     actions: Dict[str, int] = None
     penalties: Dict[str, bool] = None
 
+# Columns the leaderboard needs from player_stats
+LEADERBOARD_COLUMNS = (
+    "user_id, username, first_name, total_points, current_tier, "
+    "games_played, wins, current_streak, mvp_awards"
+)
+
+class LeaderboardIndex:
+    """
+    In-memory leaderboard of players with at least one game, ordered by points.
+
+    Keys are (-total_points, user_id) kept sorted with bisect, overall and per
+    tier, so top-N, a player's position and per-tier tops are binary searches
+    instead of an ORDER BY over player_stats.
+    """
+
+    def __init__(self):
+        self._entries: Dict[int, Dict] = {}
+        self._keys: List[Tuple[int, int]] = []
+        self._tier_keys: Dict[str, List[Tuple[int, int]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(entry: Dict) -> Tuple[int, int]:
+        return (-entry['total_points'], entry['user_id'])
+
+    def load(self, rows: List[Dict]):
+        """Replace the index contents (startup)"""
+        with self._lock:
+            self._entries.clear()
+            self._keys.clear()
+            self._tier_keys.clear()
+            for row in rows:
+                self._insert(dict(row))
+            self._keys.sort()
+            for keys in self._tier_keys.values():
+                keys.sort()
+
+    def upsert(self, entry: Dict):
+        """Insert or move one player (players without games are removed)"""
+        with self._lock:
+            self._remove(entry['user_id'])
+            if entry['games_played'] > 0:
+                self._insert(dict(entry), keep_sorted=True)
+
+    def _insert(self, entry: Dict, keep_sorted: bool = False):
+        key = self._key(entry)
+        self._entries[entry['user_id']] = entry
+        tier_keys = self._tier_keys.setdefault(entry['current_tier'], [])
+        if keep_sorted:
+            bisect.insort(self._keys, key)
+            bisect.insort(tier_keys, key)
+        else:
+            self._keys.append(key)
+            tier_keys.append(key)
+
+    def _remove(self, user_id: int):
+        old = self._entries.pop(user_id, None)
+        if not old:
+            return
+        key = self._key(old)
+        for keys in (self._keys, self._tier_keys.get(old['current_tier'], [])):
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+
+    def top(self, limit: int, tier: Optional[str] = None) -> List[Dict]:
+        """Highest-scoring players, optionally within one tier"""
+        with self._lock:
+            keys = self._keys if tier is None else self._tier_keys.get(tier, [])
+            return [dict(self._entries[user_id]) for _, user_id in keys[:limit]]
+
+    def position(self, user_id: int) -> Optional[int]:
+        """1-based leaderboard position, or None if the player has no games"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if not entry:
+                return None
+            return bisect.bisect_left(self._keys, self._key(entry)) + 1
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
 class RankingManager:
+    def _migrate_legacy_columns(self, cursor):
+        """v1: columns added after the first release, and the 100-point starting balance"""
+        # Check if points_earned column exists in game_history
+        cursor.execute("PRAGMA table_info(game_history)")
+        columns = [column[1] for column in cursor.fetchall()]
+        
+        if 'points_earned' not in columns:
+            logger.info("Adding points_earned column to game_history table")
+            cursor.execute('ALTER TABLE game_history ADD COLUMN points_earned INTEGER DEFAULT 0')
+        
+        if 'was_mvp' not in columns:
+            logger.info("Adding was_mvp column to game_history table")
+            cursor.execute('ALTER TABLE game_history ADD COLUMN was_mvp BOOLEAN DEFAULT FALSE')
+        
+        if 'actions_performed' not in columns:
+            logger.info("Adding actions_performed column to game_history table")
+            cursor.execute('ALTER TABLE game_history ADD COLUMN actions_performed TEXT DEFAULT "{}"')
+        
+        # Check player_stats table columns
+        cursor.execute("PRAGMA table_info(player_stats)")
+        player_columns = [column[1] for column in cursor.fetchall()]
+        
+        missing_player_columns = [
+            ('mvp_awards', 'INTEGER DEFAULT 0'),
+            ('investigations_correct', 'INTEGER DEFAULT 0'),
+            ('investigations_wrong', 'INTEGER DEFAULT 0'),
+            ('protections_successful', 'INTEGER DEFAULT 0'),
+            ('protections_wasted', 'INTEGER DEFAULT 0'),
+            ('evil_eliminated', 'INTEGER DEFAULT 0'),
+            ('village_mislynched', 'INTEGER DEFAULT 0'),
+            ('early_deaths', 'INTEGER DEFAULT 0'),
+            ('total_penalties', 'INTEGER DEFAULT 0'),
+            ('favorite_role', 'TEXT DEFAULT "Villager"'),
+            ('role_stats', 'TEXT DEFAULT "{}"'),
+            ('highest_game', 'INTEGER DEFAULT 0'),
+            ('lowest_ever', 'INTEGER DEFAULT 0'),
+            ('points_lost_penalties', 'INTEGER DEFAULT 0'),
+            ('tier_changes', 'INTEGER DEFAULT 0')
+        ]
+        
+        for col_name, col_def in missing_player_columns:
+            if col_name not in player_columns:
+                logger.info(f"Adding {col_name} column to player_stats table")
+                cursor.execute(f'ALTER TABLE player_stats ADD COLUMN {col_name} {col_def}')
+        
+        # Update existing players with 0 points to start with 100 points
+        cursor.execute('''
+            UPDATE player_stats 
+            SET total_points = 100, current_tier = 'Villager' 
+            WHERE total_points = 0
+        ''')
+        affected_rows = cursor.rowcount
+        if affected_rows > 0:
+            logger.info(f"Updated {affected_rows} existing players to start with 100 points")
+
+    def _migrate_add_indexes(self, cursor):
+        """v2: indexes for history lookups, role stats, cleanup and the leaderboard"""
+        # Per-player history, newest first
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_history_user_date ON game_history (user_id, game_date)')
+        # Covers get_role_performance_stats without touching the table
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_history_role ON game_history (role, won, points_earned)')
+        # cleanup_old_games range delete
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_history_date ON game_history (game_date)')
+        # MVP award targets one game's row
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_history_game_user ON game_history (game_id, user_id)')
+        # Leaderboard: WHERE games_played > 0 ORDER BY total_points DESC
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_player_points ON player_stats (total_points DESC)
+            WHERE games_played > 0
+        ''')
+
+    def _migrate_role_stats_table(self, cursor):
+        """v3: per-player-per-role aggregates, seeded from the role_stats JSON"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS player_role_stats (
+                user_id INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                games INTEGER DEFAULT 0,
+                wins INTEGER DEFAULT 0,
+                points INTEGER DEFAULT 0,
+                PRIMARY KEY (user_id, role)
+            ) WITHOUT ROWID
+        ''')
+        # Per-role leaderboards and get_role_performance_stats
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_role_stats_role ON player_role_stats (role, points DESC)')
+        
+        # The JSON only kept games/wins; points come from whatever history is left
+        cursor.execute('SELECT user_id, role, SUM(points_earned) FROM game_history GROUP BY user_id, role')
+        history_points = {(user_id, role): points or 0 for user_id, role, points in cursor.fetchall()}
+        
+        rows = []
+        cursor.execute("SELECT user_id, role_stats FROM player_stats WHERE role_stats IS NOT NULL AND role_stats != '{}'")
+        for user_id, role_stats in cursor.fetchall():
+            try:
+                parsed = json.loads(role_stats)
+            except (TypeError, ValueError):
+                logger.warning(f"Skipping unreadable role_stats for user {user_id}")
+                continue
+            for role, data in parsed.items():
+                rows.append((user_id, role, data.get('games', 0), data.get('wins', 0),
+                             history_points.get((user_id, role), 0)))
+        
+        cursor.executemany(
+            'INSERT OR IGNORE INTO player_role_stats (user_id, role, games, wins, points) VALUES (?, ?, ?, ?, ?)',
+            rows
+        )
+        logger.info(f"Moved {len(rows)} role records out of role_stats JSON")
+
     def migrate_database(self):
-        """Migrate database to latest schema"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Check if points_earned column exists in game_history
-            cursor.execute("PRAGMA table_info(game_history)")
-            columns = [column[1] for column in cursor.fetchall()]
-            
-            if 'points_earned' not in columns:
-                logger.info("Adding points_earned column to game_history table")
-                cursor.execute('ALTER TABLE game_history ADD COLUMN points_earned INTEGER DEFAULT 0')
-            
-            if 'was_mvp' not in columns:
-                logger.info("Adding was_mvp column to game_history table")
-                cursor.execute('ALTER TABLE game_history ADD COLUMN was_mvp BOOLEAN DEFAULT FALSE')
-            
-            if 'actions_performed' not in columns:
-                logger.info("Adding actions_performed column to game_history table")
-                cursor.execute('ALTER TABLE game_history ADD COLUMN actions_performed TEXT DEFAULT "{}"')
-            
-            # Check player_stats table columns
-            cursor.execute("PRAGMA table_info(player_stats)")
-            player_columns = [column[1] for column in cursor.fetchall()]
-            
-            missing_player_columns = [
-                ('mvp_awards', 'INTEGER DEFAULT 0'),
-                ('investigations_correct', 'INTEGER DEFAULT 0'),
-                ('investigations_wrong', 'INTEGER DEFAULT 0'),
-                ('protections_successful', 'INTEGER DEFAULT 0'),
-                ('protections_wasted', 'INTEGER DEFAULT 0'),
-                ('evil_eliminated', 'INTEGER DEFAULT 0'),
-                ('village_mislynched', 'INTEGER DEFAULT 0'),
-                ('early_deaths', 'INTEGER DEFAULT 0'),
-                ('total_penalties', 'INTEGER DEFAULT 0'),
-                ('favorite_role', 'TEXT DEFAULT "Villager"'),
-                ('role_stats', 'TEXT DEFAULT "{}"'),
-                ('highest_game', 'INTEGER DEFAULT 0'),
-                ('lowest_ever', 'INTEGER DEFAULT 0'),
-                ('points_lost_penalties', 'INTEGER DEFAULT 0'),
-                ('tier_changes', 'INTEGER DEFAULT 0')
-            ]
-            
-            for col_name, col_def in missing_player_columns:
-                if col_name not in player_columns:
-                    logger.info(f"Adding {col_name} column to player_stats table")
-                    cursor.execute(f'ALTER TABLE player_stats ADD COLUMN {col_name} {col_def}')
-            
-            conn.commit()
-            
-            # Update existing players with 0 points to start with 100 points
-            cursor.execute('''
-                UPDATE player_stats 
-                SET total_points = 100, current_tier = 'Villager' 
-                WHERE total_points = 0
-            ''')
-            affected_rows = cursor.rowcount
-            if affected_rows > 0:
-                logger.info(f"Updated {affected_rows} existing players to start with 100 points")
+        """Apply schema migrations newer than the database's PRAGMA user_version"""
+        migrations = [
+            (1, "legacy columns", self._migrate_legacy_columns),
+            (2, "indexes", self._migrate_add_indexes),
+            (3, "player_role_stats", self._migrate_role_stats_table),
+        ]
+        
+        with self.db.write() as conn:
+            current_version = conn.execute('PRAGMA user_version').fetchone()[0]
+        
+        for version, description, migration in migrations:
+            if version <= current_version:
+                continue
             
-            conn.commit()
-            logger.info("Database migration completed successfully")
+            # One transaction per step: the schema change and the version bump land together
+            with self.db.write() as conn:
+                conn.execute('BEGIN')
+                migration(conn.cursor())
+                conn.execute(f'PRAGMA user_version = {version}')
+            logger.info(f"Migrated rankings database to version {version} ({description})")
+            current_version = version
+        
+        logger.info(f"Rankings database schema at version {current_version}")
 
     def init_database(self):
         """Initialize SQLite database with migration support"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.db.write() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -166,16 +320,21 @@ class RankingManager:
                 )
             ''')
             
-            conn.commit()
             logger.info("Database tables created successfully")
-            
-            # Run migration to add any missing columns
-            self.migrate_database()
+        
+        # Run migrations to add any missing columns and indexes
+        self.migrate_database()
 
-    def __init__(self, db_path: str = "werewolf_rankings.db"):
+    def __init__(self, db_path: str = RANKINGS_DB_PATH):
         self.db_path = db_path
+        self.db = ConnectionManager(db_path)
         self.init_database()
         
+        # Ordered in-memory leaderboard and the last rendered /leaderboard message
+        self.leaderboard = LeaderboardIndex()
+        self._leaderboard_message: Optional[Tuple[tuple, str]] = None
+        self.load_leaderboard()
+        
         # Tier system with lower point values for gradual progression
         self.TIER_SYSTEM = {
             Tier.PEASANT: {"range": (0, 49), "emoji": "🟤", "multiplier": 2.0, "penalty_reduction": 0.5},
@@ -363,9 +522,93 @@ class RankingManager:
     # Minimum -5 points per game
         return max(-5, final_points)
 
+    # Shared by update_player_stats and apply_game_results
+    PLAYER_STATS_UPDATE_SQL = '''
+        UPDATE player_stats SET
+            username = ?, first_name = ?, total_points = ?, current_tier = ?,
+            games_played = games_played + 1, wins = ?, losses = ?,
+            current_streak = ?, best_streak = CASE WHEN ? > best_streak THEN ? ELSE best_streak END,
+            worst_streak = CASE WHEN ? < worst_streak THEN ? ELSE worst_streak END,
+            last_game = ?, highest_game = CASE WHEN ? > highest_game THEN ? ELSE highest_game END,
+            lowest_ever = CASE WHEN ? < lowest_ever THEN ? ELSE lowest_ever END,
+            tier_changes = CASE WHEN ? THEN tier_changes + 1 ELSE tier_changes END
+        WHERE user_id = ?
+    '''
+
+    GAME_HISTORY_INSERT_SQL = '''
+        INSERT INTO game_history (game_id, user_id, role, team, won, points_earned, actions_performed)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    '''
+
+    ROLE_STATS_UPSERT_SQL = '''
+        INSERT INTO player_role_stats (user_id, role, games, wins, points)
+        VALUES (?, ?, 1, ?, ?)
+        ON CONFLICT (user_id, role) DO UPDATE SET
+            games = games + 1,
+            wins = wins + excluded.wins,
+            points = points + excluded.points
+    '''
+
+    def _compute_stats_update(self, result: GameResult, player_dict: Dict, game_id: str) -> Tuple[tuple, tuple, tuple, int, Tier, bool]:
+        """
+        Work out a player's new stats in memory.
+
+        Returns:
+            (player_stats UPDATE params, game_history INSERT params, player_role_stats UPSERT params,
+             points_earned, new_tier, tier_changed)
+        """
+    # Calculate points earned
+        points_earned = self.calculate_game_points(result, player_dict['total_points'])
+        new_total = player_dict['total_points'] + points_earned
+    
+    # Update streak
+        if result.won:
+            new_streak = max(0, player_dict['current_streak']) + 1
+            new_wins = player_dict['wins'] + 1
+            new_losses = player_dict['losses']
+        else:
+            new_streak = min(0, player_dict['current_streak']) - 1
+            new_wins = player_dict['wins']
+            new_losses = player_dict['losses'] + 1
+    
+    # Update tier
+        new_tier = self.get_player_tier(new_total)
+        tier_changed = new_tier.value != player_dict['current_tier']
+    
+    # Convert team and role to strings for database storage
+        team_str = result.team
+        if hasattr(result.team, 'value'):
+            team_str = result.team.value
+        elif hasattr(result.team, 'name'):
+            team_str = result.team.name
+        else:
+            team_str = str(result.team)
+    
+        role_str = result.role
+        if hasattr(result.role, 'value'):
+            role_str = result.role.value
+        elif hasattr(result.role, 'name'):
+            role_str = result.role.name
+        else:
+            role_str = str(result.role)
+    
+        update_params = (
+            result.username, result.first_name, new_total, new_tier.value,
+            new_wins, new_losses, new_streak, new_streak, new_streak,
+            new_streak, new_streak, datetime.now().isoformat(),
+            points_earned, points_earned, new_total, new_total,
+            tier_changed, result.user_id
+        )
+        history_params = (
+            game_id, result.user_id, role_str, team_str,
+            result.won, points_earned, json.dumps(result.actions or {})
+        )
+        role_params = (result.user_id, role_str, int(bool(result.won)), points_earned)
+        return update_params, history_params, role_params, points_earned, new_tier, tier_changed
+
     def update_player_stats(self, result: GameResult):
         """Update player statistics after a game"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.db.write() as conn:
             cursor = conn.cursor()
         
         # Get or create player
@@ -386,117 +629,149 @@ class RankingManager:
             columns = [desc[0] for desc in cursor.description]
             player_dict = dict(zip(columns, player))
         
-        # Calculate points earned
-            points_earned = self.calculate_game_points(result, player_dict['total_points'])
-            new_total = player_dict['total_points'] + points_earned
-        
-        # Update streak
-            if result.won:
-                new_streak = max(0, player_dict['current_streak']) + 1
-                new_wins = player_dict['wins'] + 1
-                new_losses = player_dict['losses']
-            else:
-                new_streak = min(0, player_dict['current_streak']) - 1
-                new_wins = player_dict['wins']
-                new_losses = player_dict['losses'] + 1
-        
-        # Update tier
-            new_tier = self.get_player_tier(new_total)
-            tier_changed = new_tier.value != player_dict['current_tier']
-        
-        # Role statistics - handle both string and enum roles
-            role_stats = json.loads(player_dict.get('role_stats', '{}'))
-        
-        # Convert role to string for storage
-            if hasattr(result.role, 'value'):
-                role_key = result.role.value
-            elif hasattr(result.role, 'name'):
-                role_key = result.role.name
-            else:
-                role_key = str(result.role)
-        
-            if role_key not in role_stats:
-                role_stats[role_key] = {"games": 0, "wins": 0}
-            role_stats[role_key]["games"] += 1
-            if result.won:
-                role_stats[role_key]["wins"] += 1
-        
-        # Convert team and role to strings for database storage
-            team_str = result.team
-            if hasattr(result.team, 'value'):
-                team_str = result.team.value
-            elif hasattr(result.team, 'name'):
-                team_str = result.team.name
-            else:
-                team_str = str(result.team)
-        
-            role_str = result.role
-            if hasattr(result.role, 'value'):
-                role_str = result.role.value
-            elif hasattr(result.role, 'name'):
-                role_str = result.role.name
-            else:
-                role_str = str(result.role)
-        
-        # Update database
-            cursor.execute('''
-                UPDATE player_stats SET
-                    username = ?, first_name = ?, total_points = ?, current_tier = ?,
-                    games_played = games_played + 1, wins = ?, losses = ?,
-                    current_streak = ?, best_streak = CASE WHEN ? > best_streak THEN ? ELSE best_streak END,
-                    worst_streak = CASE WHEN ? < worst_streak THEN ? ELSE worst_streak END,
-                    last_game = ?, highest_game = CASE WHEN ? > highest_game THEN ? ELSE highest_game END,
-                    lowest_ever = CASE WHEN ? < lowest_ever THEN ? ELSE lowest_ever END,
-                    role_stats = ?,
-                    tier_changes = CASE WHEN ? THEN tier_changes + 1 ELSE tier_changes END
-                WHERE user_id = ?
-            ''', (
-                result.username, result.first_name, new_total, new_tier.value,
-                new_wins, new_losses, new_streak, new_streak, new_streak,
-                new_streak, new_streak, datetime.now().isoformat(),
-                points_earned, points_earned, new_total, new_total,
-                json.dumps(role_stats), tier_changed, result.user_id
-            ))
-        
-        # Record game history - use string versions
-            cursor.execute('''
-                INSERT INTO game_history (game_id, user_id, role, team, won, points_earned, actions_performed)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                f"game_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-                result.user_id, role_str, team_str,
-                result.won, points_earned, json.dumps(result.actions or {})
-            ))
-        
-            conn.commit()
+            update_params, history_params, role_params, points_earned, new_tier, tier_changed = self._compute_stats_update(
+                result, player_dict, f"game_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            )
+            cursor.execute(self.PLAYER_STATS_UPDATE_SQL, update_params)
+            cursor.execute(self.GAME_HISTORY_INSERT_SQL, history_params)
+            cursor.execute(self.ROLE_STATS_UPSERT_SQL, role_params)
         
             logger.info(f"Updated stats for {result.first_name}: {points_earned:+d} points, tier: {new_tier.value}")
-            return points_earned, new_tier, tier_changed
+        
+        self.refresh_leaderboard([result.user_id])
+        return points_earned, new_tier, tier_changed
+
+    def apply_game_results(self, conn, game_id: str, results: List[GameResult]) -> Dict[int, Tuple[int, Tier, bool]]:
+        """
+        Update every participant of one game using a handful of statements.
+
+        Runs on the caller's write() connection so the whole game end (and the
+        MVP award) is one transaction.
+
+        Returns:
+            user_id -> (points_earned, new_tier, tier_changed)
+        """
+        if not results:
+            return {}
+
+        cursor = conn.cursor()
+        cursor.executemany(
+            'INSERT OR IGNORE INTO player_stats (user_id, username, first_name) VALUES (?, ?, ?)',
+            [(r.user_id, r.username, r.first_name) for r in results]
+        )
 
+        user_ids = [r.user_id for r in results]
+        placeholders = ','.join('?' * len(user_ids))
+        cursor.execute(f'SELECT * FROM player_stats WHERE user_id IN ({placeholders})', user_ids)
+        columns = [desc[0] for desc in cursor.description]
+        players = {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+
+        updates = []
+        history = []
+        role_rows = []
+        outcomes = {}
+        for result in results:
+            update_params, history_params, role_params, points_earned, new_tier, tier_changed = self._compute_stats_update(
+                result, players[result.user_id], game_id
+            )
+            updates.append(update_params)
+            history.append(history_params)
+            role_rows.append(role_params)
+            outcomes[result.user_id] = (points_earned, new_tier, tier_changed)
+
+        cursor.executemany(self.PLAYER_STATS_UPDATE_SQL, updates)
+        cursor.executemany(self.GAME_HISTORY_INSERT_SQL, history)
+        cursor.executemany(self.ROLE_STATS_UPSERT_SQL, role_rows)
+
+        logger.info(f"Updated stats for {len(results)} players in game {game_id}")
+        return outcomes
+
+    def award_mvp(self, conn, user_id: int, game_id: str):
+        """Give the MVP bonus and flag the player's history row for game_id"""
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE player_stats 
+            SET mvp_awards = mvp_awards + 1,
+                total_points = total_points + 10
+            WHERE user_id = ?
+        ''', (user_id,))
+        cursor.execute('''
+            UPDATE game_history 
+            SET was_mvp = TRUE,
+                points_earned = points_earned + 10
+            WHERE user_id = ? AND game_id = ?
+        ''', (user_id, game_id))
+        cursor.execute('''
+            UPDATE player_role_stats
+            SET points = points + 10
+            WHERE user_id = ? AND role = (
+                SELECT role FROM game_history WHERE user_id = ? AND game_id = ? LIMIT 1
+            )
+        ''', (user_id, user_id, game_id))
+        logger.info(f"Awarded MVP to user {user_id} (+10 points)")
 
     def get_player_stats(self, user_id: int) -> Optional[Dict]:
         """Get player statistics"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with self.db.read() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM player_stats WHERE user_id = ?', (user_id,))
             row = cursor.fetchone()
             return dict(row) if row else None
 
+    def load_leaderboard(self):
+        """Build the in-memory leaderboard from player_stats (startup)"""
+        with self.db.read() as conn:
+            rows = conn.execute(
+                f'SELECT {LEADERBOARD_COLUMNS} FROM player_stats WHERE games_played > 0'
+            ).fetchall()
+        self.leaderboard.load(rows)
+        logger.info(f"Loaded {len(self.leaderboard)} players into the leaderboard")
+
+    def refresh_leaderboard(self, user_ids: List[int]):
+        """Re-read the given players after a committed write and move them in the leaderboard"""
+        if not user_ids:
+            return
+        placeholders = ','.join('?' * len(user_ids))
+        with self.db.read() as conn:
+            rows = conn.execute(
+                f'SELECT {LEADERBOARD_COLUMNS} FROM player_stats WHERE user_id IN ({placeholders})',
+                list(user_ids)
+            ).fetchall()
+        for row in rows:
+            self.leaderboard.upsert(dict(row))
+
     def get_leaderboard(self, limit: int = 20) -> List[Dict]:
         """Get leaderboard"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT user_id, username, first_name, total_points, current_tier, 
-                       games_played, wins, current_streak, mvp_awards
-                FROM player_stats 
-                WHERE games_played > 0
-                ORDER BY total_points DESC 
+        return self.leaderboard.top(limit)
+
+    def get_best_role(self, user_id: int, min_games: int = 2) -> Optional[Dict]:
+        """Player's role with the highest win rate (at least min_games played)"""
+        with self.db.read() as conn:
+            row = conn.execute('''
+                SELECT role, games, wins, points
+                FROM player_role_stats
+                WHERE user_id = ? AND games >= ? AND wins > 0
+                ORDER BY CAST(wins AS REAL) / games DESC, games DESC
+                LIMIT 1
+            ''', (user_id, min_games)).fetchone()
+            return dict(row) if row else None
+
+    def get_role_leaderboard(self, role: str, limit: int = 10) -> List[Dict]:
+        """Top players of one role by points earned with it"""
+        with self.db.read() as conn:
+            rows = conn.execute('''
+                SELECT r.user_id, p.first_name, r.games, r.wins, r.points
+                FROM player_role_stats r
+                JOIN player_stats p ON p.user_id = r.user_id
+                WHERE r.role = ?
+                ORDER BY r.points DESC
                 LIMIT ?
-            ''', (limit,))
-            return [dict(row) for row in cursor.fetchall()]
+            ''', (role, limit)).fetchall()
+            return [dict(row) for row in rows]
+
+    def get_leaderboard_position(self, user_id: int) -> Optional[int]:
+        """Player's 1-based position on the leaderboard"""
+        return self.leaderboard.position(user_id)
 
     def format_stats_message(self, user_id: int, username: str) -> str:
         """Format player stats message"""
@@ -533,20 +808,19 @@ class RankingManager:
             streak_text = "None"
     
     # Role statistics
-        role_stats = json.loads(stats.get('role_stats', '{}'))
         favorite_role = "Villager"
         best_winrate = 0
-    
-        for role_name, data in role_stats.items():
-            if data['games'] >= 2:
-                winrate = (data['wins'] / data['games']) * 100
-                if winrate > best_winrate:
-                    best_winrate = winrate
-                    favorite_role = role_name
+        best_role = self.get_best_role(user_id)
+        if best_role:
+            favorite_role = best_role['role']
+            best_winrate = (best_role['wins'] / best_role['games']) * 100
     
     # Build message WITHOUT special markdown formatting
         message = f"🌙 {stats['first_name']}'s Village Chronicle 🌙\n\n"
         message += f"Rank: {tier_info['emoji']} {tier.value} ({stats['total_points']} ⭐)\n"
+        position = self.get_leaderboard_position(user_id)
+        if position:
+            message += f"Leaderboard: #{position} of {len(self.leaderboard)}\n"
         message += f"Multiplier: {tier_info['multiplier']}x • Penalty Reduction: {tier_info['penalty_reduction']}x\n"
 
         if next_tier and points_needed > 0:
@@ -578,17 +852,22 @@ class RankingManager:
         return message
 
     def format_leaderboard_message(self) -> str:
-        """Format leaderboard message"""
+        """Format leaderboard message (re-rendered only when the shown entries changed)"""
         leaderboard = self.get_leaderboard(15)
         
         if not leaderboard:
             return "No players have completed games yet. Be the first!"
         
-        message = "🏆 **Village Hall of Fame** 🏆\n\n"
-        
         # Top players by tier
-        ancients = [p for p in leaderboard if p['current_tier'] == 'Ancient'][:3]
-        shadows = [p for p in leaderboard if p['current_tier'] == 'Shadow Walker'][:3]
+        ancients = self.leaderboard.top(3, Tier.ANCIENT.value)
+        shadows = self.leaderboard.top(3, Tier.SHADOW_WALKER.value)
+        
+        signature = tuple(tuple(p.values()) for p in leaderboard + ancients + shadows)
+        cached = self._leaderboard_message
+        if cached and cached[0] == signature:
+            return cached[1]
+        
+        message = "🏆 **Village Hall of Fame** 🏆\n\n"
         
         if ancients:
             message += "**🔴 Ancient Legends**\n"
@@ -620,6 +899,7 @@ class RankingManager:
         message += f"\n**🏅 Active Players:** {len(leaderboard)}\n"
         message += f"**📈 Tier Multipliers:** Peasant 2.0x • Ancient 0.6x"
         
+        self._leaderboard_message = (signature, message)
         return message
 
     def format_rank_info_message(self) -> str:
@@ -660,7 +940,9 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     
     try:
-        message = ranking_manager.format_stats_message(user.id, user.first_name or user.username or "Unknown")
+        message = await ranking_manager.db.run_read(
+            ranking_manager.format_stats_message, user.id, user.first_name or user.username or "Unknown"
+        )
         # REMOVE parse_mode completely - send as plain text with emojis
         await update.message.reply_text(message)
     except Exception as e:
@@ -670,7 +952,7 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def leaderboard_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /leaderboard command"""
     try:
-        message = ranking_manager.format_leaderboard_message()
+        message = await ranking_manager.db.run_read(ranking_manager.format_leaderboard_message)
         await update.message.reply_text(message, parse_mode='Markdown')
     except Exception as e:
         logger.error(f"Error in leaderboard command: {e}")
@@ -688,7 +970,7 @@ async def rank_info_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 def record_batch_game_results(game_id: str, total_players: int, results: List[Dict]) -> List[Dict]:
     """Process game results for ranking system"""
     processed_results = []
-    player_breakdowns = {}
+    game_results = []
     
     for result_data in results:
         # Safely convert team and role
@@ -708,8 +990,6 @@ def record_batch_game_results(game_id: str, total_players: int, results: List[Di
         else:
             role = str(role)
         logger.info(f"DEBUG record_batch - Converted role: {role}, type: {type(role)}")
-
-        is_alive = result_data.get('is_alive', False)
         
         # Convert to GameResult object
         result = GameResult(
@@ -723,23 +1003,31 @@ def record_batch_game_results(game_id: str, total_players: int, results: List[Di
             actions=result_data.get('actions', {}),
             penalties=result_data.get('penalties', {})
         )
+        game_results.append(result)
+    
+    # One transaction for every player's stats, history row and the MVP award
+    with ranking_manager.db.write() as conn:
+        outcomes = ranking_manager.apply_game_results(conn, game_id, game_results)
         
-        # Update player stats and get results
-        points_earned, new_tier, tier_changed = ranking_manager.update_player_stats(result)
+        for result in game_results:
+            points_earned, new_tier, tier_changed = outcomes[result.user_id]
+            processed_results.append({
+                'user_id': result.user_id,
+                'first_name': result.first_name,
+                'points_earned': points_earned,
+                'new_tier': new_tier.value,
+                'tier_changed': tier_changed,
+                'won': result.won,
+                'role': result.role,
+                'team': result.team,
+                'is_alive': result.is_alive
+            })
         
-        processed_results.append({
-            'user_id': result.user_id,
-            'first_name': result.first_name,
-            'points_earned': points_earned,
-            'new_tier': new_tier.value,
-            'tier_changed': tier_changed,
-            'won': result.won,
-            'role': role,
-            'team': team,
-            'is_alive': is_alive
-        })
+        mvp_user_id = select_mvp(processed_results)
+        if mvp_user_id is not None:
+            ranking_manager.award_mvp(conn, mvp_user_id, game_id)
     
-    mvp_user_id = calculate_and_award_mvp(processed_results)
+    ranking_manager.refresh_leaderboard([r.user_id for r in game_results])
     
     # Mark MVP in processed results
     for result in processed_results:
@@ -945,33 +1233,96 @@ def process_game_end_rankings(game_data: Dict) -> str:
         logger.error(f"Traceback: {traceback.format_exc()}")
         return "Game ended! Rankings could not be processed at this time."
 
+class ActionTracker:
+    """
+    In-game action counters, kept in memory and written once per game.
+
+    Hooks fire for every vote, investigation and death, so instead of an
+    UPDATE + commit each time they bump a per-player counter here. flush() is
+    called when the game is removed (finished or aborted) and writes all
+    counters in a single transaction; if that fails the counters are put back
+    and go out with the next flush.
+    """
+
+    # (action, success) -> player_stats column
+    ACTION_COLUMNS = {
+        ("investigate", True): "investigations_correct",
+        ("investigate", False): "investigations_wrong",
+        ("protect", True): "protections_successful",
+        ("protect", False): "protections_wasted",
+        ("eliminate_evil", True): "evil_eliminated",
+        ("mislynch_village", True): "village_mislynched",
+        ("early_death", True): "early_deaths",
+    }
+
+    def __init__(self):
+        # user_id -> column -> count
+        self._pending: Dict[int, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, user_id: int, action: str, success: bool = True) -> bool:
+        """Count one action; returns False for actions without a stats column"""
+        # Only investigations and protections have a failure column
+        outcome = bool(success) if action in ("investigate", "protect") else True
+        column = self.ACTION_COLUMNS.get((action, outcome))
+        if not column:
+            return False
+        with self._lock:
+            counters = self._pending.setdefault(user_id, {})
+            counters[column] = counters.get(column, 0) + 1
+        return True
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(sum(c.values()) for c in self._pending.values())
+
+    def flush(self, user_ids=None) -> int:
+        """
+        Write buffered counters for user_ids (all players if None).
+
+        Returns:
+            Number of actions written (0 if nothing was pending or the write failed)
+        """
+        with self._lock:
+            ids = list(self._pending) if user_ids is None else [u for u in user_ids if u in self._pending]
+            batch = {user_id: self._pending.pop(user_id) for user_id in ids}
+        if not batch:
+            return 0
+
+        by_column: Dict[str, List[Tuple[int, int]]] = {}
+        for user_id, counters in batch.items():
+            for column, count in counters.items():
+                by_column.setdefault(column, []).append((count, user_id))
+
+        try:
+            with ranking_manager.db.write() as conn:
+                for column, rows in by_column.items():
+                    conn.executemany(f'UPDATE player_stats SET {column} = {column} + ? WHERE user_id = ?', rows)
+        except Exception as e:
+            # The transaction rolled back, so re-queue everything for the next flush
+            self._merge(batch)
+            logger.error(f"Error flushing tracked actions for {len(batch)} players, kept in memory: {e}")
+            return 0
+
+        written = sum(sum(c.values()) for c in batch.values())
+        logger.debug(f"Flushed {written} tracked actions for {len(batch)} players")
+        return written
+
+    def _merge(self, batch: Dict[int, Dict[str, int]]):
+        with self._lock:
+            for user_id, counters in batch.items():
+                pending = self._pending.setdefault(user_id, {})
+                for column, count in counters.items():
+                    pending[column] = pending.get(column, 0) + count
+
+
+# Global instance
+action_tracker = ActionTracker()
+
 def track_player_action(user_id: int, action: str, success: bool = True):
-    """Track individual player actions during gameplay for detailed analytics"""
-    try:
-        with sqlite3.connect(ranking_manager.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Update action counters
-            if action == "investigate" and success:
-                cursor.execute('UPDATE player_stats SET investigations_correct = investigations_correct + 1 WHERE user_id = ?', (user_id,))
-            elif action == "investigate" and not success:
-                cursor.execute('UPDATE player_stats SET investigations_wrong = investigations_wrong + 1 WHERE user_id = ?', (user_id,))
-            elif action == "protect" and success:
-                cursor.execute('UPDATE player_stats SET protections_successful = protections_successful + 1 WHERE user_id = ?', (user_id,))
-            elif action == "protect" and not success:
-                cursor.execute('UPDATE player_stats SET protections_wasted = protections_wasted + 1 WHERE user_id = ?', (user_id,))
-            elif action == "eliminate_evil":
-                cursor.execute('UPDATE player_stats SET evil_eliminated = evil_eliminated + 1 WHERE user_id = ?', (user_id,))
-            elif action == "mislynch_village":
-                cursor.execute('UPDATE player_stats SET village_mislynched = village_mislynched + 1 WHERE user_id = ?', (user_id,))
-            elif action == "early_death":
-                cursor.execute('UPDATE player_stats SET early_deaths = early_deaths + 1 WHERE user_id = ?', (user_id,))
-            
-            conn.commit()
-            logger.debug(f"Tracked action {action} for user {user_id}: {'success' if success else 'failure'}")
-            
-    except Exception as e:
-        logger.error(f"Error tracking player action: {e}")
+    """Track individual player actions during gameplay (buffered until the game ends)"""
+    if action_tracker.record(user_id, action, success):
+        logger.debug(f"Tracked action {action} for user {user_id}: {'success' if success else 'failure'}")
 
 def get_player_quick_stats(user_id: int) -> Dict:
     """Get basic player stats for quick display"""
@@ -1291,12 +1642,9 @@ async def send_player_breakdowns(context: ContextTypes.DEFAULT_TYPE, processed_r
                 logger.info(f"Sent sanitized breakdown to {result['first_name']}")
             except Exception as e2:
                 logger.error(f"Failed even with sanitized message: {e2}")
-        
-        # Small delay to avoid rate limiting
-        await asyncio.sleep(0.3)
 
-def calculate_and_award_mvp(game_results: List[Dict]) -> Optional[int]:
-    """Calculate MVP and award bonus points"""
+def select_mvp(game_results: List[Dict]) -> Optional[int]:
+    """Pick the MVP from processed game results (no database writes)"""
     if len(game_results) < 3:
         return None  # Too few players for meaningful MVP
     
@@ -1345,32 +1693,18 @@ def calculate_and_award_mvp(game_results: List[Dict]) -> Optional[int]:
     if mvp_score < 5:
         return None
     
-    # Award MVP in database
+    return mvp_user_id
+
+def calculate_and_award_mvp(game_results: List[Dict], game_id: str) -> Optional[int]:
+    """Calculate MVP and award bonus points in its own transaction"""
+    mvp_user_id = select_mvp(game_results)
+    if mvp_user_id is None:
+        return None
+    
     try:
-        with sqlite3.connect(ranking_manager.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Award MVP bonus points (10 points)
-            cursor.execute('''
-                UPDATE player_stats 
-                SET mvp_awards = mvp_awards + 1,
-                    total_points = total_points + 10
-                WHERE user_id = ?
-            ''', (mvp_user_id,))
-            
-            # Mark in game history
-            cursor.execute('''
-                UPDATE game_history 
-                SET was_mvp = TRUE,
-                    points_earned = points_earned + 10
-                WHERE user_id = ? 
-                ORDER BY game_date DESC 
-                LIMIT 1
-            ''', (mvp_user_id,))
-            
-            conn.commit()
-            logger.info(f"Awarded MVP to user {mvp_user_id} (+10 points)")
-            
+        with ranking_manager.db.write() as conn:
+            ranking_manager.award_mvp(conn, mvp_user_id, game_id)
+        ranking_manager.refresh_leaderboard([mvp_user_id])
     except Exception as e:
         logger.error(f"Error awarding MVP: {e}")
     
@@ -1379,37 +1713,37 @@ def calculate_and_award_mvp(game_results: List[Dict]) -> Optional[int]:
 def get_role_performance_stats(role: Role) -> Dict:
     """Get performance statistics for a specific role"""
     try:
-        with sqlite3.connect(ranking_manager.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with ranking_manager.db.read() as conn:
             cursor = conn.cursor()
             
+            # Roles are stored by enum name (see record_batch_game_results)
             cursor.execute('''
-                SELECT COUNT(*) as total_games,
-                       SUM(CASE WHEN won = 1 THEN 1 ELSE 0 END) as wins,
-                       AVG(points_earned) as avg_points
-                FROM game_history 
+                SELECT SUM(games) as total_games,
+                       SUM(wins) as wins,
+                       SUM(points) as total_points
+                FROM player_role_stats 
                 WHERE role = ?
-            ''', (role.value,))
+            ''', (role.name,))
             
             result = cursor.fetchone()
-            if result and result['total_games'] > 0:
+            if result and result['total_games']:
                 return {
                     'total_games': result['total_games'],
                     'wins': result['wins'],
                     'win_rate': (result['wins'] / result['total_games']) * 100,
-                    'avg_points': round(result['avg_points'], 1)
+                    'avg_points': round(result['total_points'] / result['total_games'], 1)
                 }
             else:
                 return {'total_games': 0, 'wins': 0, 'win_rate': 0, 'avg_points': 0}
                 
     except Exception as e:
-        logger.error(f"Error getting role stats for {role.value}: {e}")
+        logger.error(f"Error getting role stats for {role.name}: {e}")
         return {'total_games': 0, 'wins': 0, 'win_rate': 0, 'avg_points': 0}
 
 def cleanup_old_games(days_old: int = 90):
     """Clean up game history older than specified days"""
     try:
-        with sqlite3.connect(ranking_manager.db_path) as conn:
+        with ranking_manager.db.write() as conn:
             cursor = conn.cursor()
             
             cutoff_date = datetime.now() - timedelta(days=days_old)
@@ -1458,6 +1792,7 @@ __all__ = [
     'send_player_breakdowns',
     'process_game_end_rankings',
     'track_player_action',
+    'action_tracker',
     'get_player_quick_stats',
     'send_tier_notification',
     'calculate_mvp_candidates',
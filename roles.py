@@ -2,9 +2,10 @@ import logging
 import random
 from typing import Optional, Dict
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from enums import Team, Role, GamePhase
+from enums import Team, Role, GamePhase, ActionType
 from game import Game, Player
 from config import MIN_PLAYERS, EVIL_TEAM_RATIO
+from callbacks import stamp_keyboard
 
 logger = logging.getLogger(__name__)
 
@@ -403,14 +404,52 @@ def assign_roles(game) -> bool:
     
     return True
 
-def get_role_action_buttons(player: Player, game: Game, current_phase: GamePhase) -> Optional[InlineKeyboardMarkup]:
-    """Generate action buttons for a player's role during night phase"""
-    if not player.role or not player.is_alive:
+# Marks "nothing cached yet" (None is a valid cached result: the player has no menu)
+_NOT_CACHED = object()
+
+def _action_keyboard_key(player: Player, game: Game, current_phase: GamePhase, role: Optional[Role]) -> tuple:
+    """Everything _build_role_action_buttons reads, so equal keys always build equal keyboards"""
+    douses = None
+    if role == Role.ARSONIST:
+        first_douse = game.night_actions.get(ActionType.ARSONIST_DOUSE, player.user_id)
+        douses = (first_douse.target if first_douse else None,
+                  game.night_actions.get(ActionType.ARSONIST_DOUSE_SECOND, player.user_id) is not None)
+    return (
+        'action', player.user_id, role, player.is_alive, current_phase, game.phase,
+        game.phase_epoch, game.roster_version, game.day_number,
+        player.has_acted, player.is_mayor_revealed,
+        tuple(value for _, value in player.role_state_items()),
+        douses,
+    )
+
+def get_role_action_buttons(player: Player, game: Game, current_phase: GamePhase,
+                            role: Optional[Role] = None) -> Optional[InlineKeyboardMarkup]:
+    """
+    Action buttons for a player's role, stamped with the game's phase epoch.
+    Pass role to build the menu of a role the player acts as without holding it
+    (the Grave Robber's borrowed role), leaving player.role and the roster alone.
+
+    Keyboards are memoized in game.keyboard_cache for the current epoch, so the
+    repeated lookups of a phase share one immutable markup until a death, role
+    change or the player's own state changes the key.
+    """
+    role = role or player.role
+    key = _action_keyboard_key(player, game, current_phase, role)
+    markup = game.keyboard_cache.get(key, _NOT_CACHED)
+    if markup is _NOT_CACHED:
+        markup = _build_role_action_buttons(player, game, current_phase, role)
+        markup = stamp_keyboard(markup, game.phase_epoch) if markup else None
+        game.keyboard_cache[key] = markup
+    return markup
+
+def _build_role_action_buttons(player: Player, game: Game, current_phase: GamePhase,
+                               role: Optional[Role]) -> Optional[InlineKeyboardMarkup]:
+    """Generate action buttons for a player acting as role (their own, or a borrowed one) during night phase"""
+    if not role or not player.is_alive:
         return None
 
     alive_players = [p for p in game.get_alive_players() if p.user_id != player.user_id]
     buttons = []
-    role = player.role
 
     logger.debug(f"Generating action buttons for {player.first_name} ({role.role_name})")
 
@@ -533,9 +572,10 @@ def get_role_action_buttons(player: Player, game: Game, current_phase: GamePhase
             buttons = []
 
     # If accelerant boost active and first douse chosen, show buttons for second douse
-            if hasattr(player, "accelerant_boost") and player.accelerant_boost:  
+            if player.accelerant_boost:  
         # If first douse not chosen
-                if "arsonist_douse" not in game.night_actions:
+                first_douse = game.night_actions.get(ActionType.ARSONIST_DOUSE, player.user_id)
+                if first_douse is None:
                     buttons = [
                         [InlineKeyboardButton(f"🔥 Douse {p.first_name}", callback_data=f"arsonist_douse_{p.user_id}")]
                         for p in alive_players if not p.is_doused
@@ -543,8 +583,8 @@ def get_role_action_buttons(player: Player, game: Game, current_phase: GamePhase
                     buttons.append([InlineKeyboardButton("❌ Skip", callback_data="arsonist_skip")])
                     return InlineKeyboardMarkup(buttons)
         # After first douse, for second douse
-                elif "arsonist_douse" in game.night_actions and "arsonist_douse_second" not in game.night_actions:
-                    excluded_ids = [game.night_actions["arsonist_douse"]["target"]]
+                elif game.night_actions.get(ActionType.ARSONIST_DOUSE_SECOND, player.user_id) is None:
+                    excluded_ids = [first_douse.target]
                     buttons = [
                         [InlineKeyboardButton(f"🔥 Douse {p.first_name}", callback_data=f"arsonist_douse_second_{p.user_id}")]
                         for p in alive_players if p.user_id not in excluded_ids and not p.is_doused
@@ -565,13 +605,13 @@ def get_role_action_buttons(player: Player, game: Game, current_phase: GamePhase
 
 
         # In get_role_action_buttons function, add:
-        elif player.role == Role.BLAZEBRINGER and current_phase == GamePhase.NIGHT:
+        elif role == Role.BLAZEBRINGER and current_phase == GamePhase.NIGHT:
             return InlineKeyboardMarkup([
                 [InlineKeyboardButton("🔥 Choose Action", callback_data="fire_starter_action_choice")]
             ])
 
-        elif player.role == Role.ACCELERANT_EXPERT and current_phase == GamePhase.NIGHT:
-            if not getattr(player, "accelerant_used", False):
+        elif role == Role.ACCELERANT_EXPERT and current_phase == GamePhase.NIGHT:
+            if not player.accelerant_used:
                 return InlineKeyboardMarkup([
                     [InlineKeyboardButton("⚡ Use Accelerant", callback_data="accelerant_expert_use")],
                     [InlineKeyboardButton("❌ Skip", callback_data="accelerant_expert_skip")]
@@ -585,7 +625,7 @@ def get_role_action_buttons(player: Player, game: Game, current_phase: GamePhase
                 for p in alive_players
             ]
 
-        elif player.role == Role.WEBKEEPER:
+        elif role == Role.WEBKEEPER:
             if not player.has_acted:
                 alive_players = [p for p in game.get_alive_players() if p.user_id != player.user_id]
                 buttons = [
@@ -596,7 +636,7 @@ def get_role_action_buttons(player: Player, game: Game, current_phase: GamePhase
                 return InlineKeyboardMarkup(buttons)
     
     # Stray - observe who visited target
-        elif player.role == Role.STRAY:
+        elif role == Role.STRAY:
             if not player.has_acted:
                 alive_players = [p for p in game.get_alive_players() if p.user_id != player.user_id]
                 buttons = [
@@ -607,15 +647,15 @@ def get_role_action_buttons(player: Player, game: Game, current_phase: GamePhase
             return InlineKeyboardMarkup(buttons)
     
     # Mirror Phantom - passive (waits for visitors)
-        elif player.role == Role.MIRROR_PHANTOM:
-            if not getattr(player, 'mirror_ability_used', False):
+        elif role == Role.MIRROR_PHANTOM:
+            if not player.mirror_ability_used:
             # Show status message instead of buttons
                 buttons = [[InlineKeyboardButton("✓ Waiting for Visitors", callback_data="mirror_phantom_wait")]]
                 return InlineKeyboardMarkup(buttons)
     
     # Thief - steal ability
-        elif player.role == Role.THIEF:
-            if not getattr(player, 'thief_ability_used', False) and not player.has_acted:
+        elif role == Role.THIEF:
+            if not player.thief_ability_used and not player.has_acted:
                 alive_players = [p for p in game.get_alive_players() if p.user_id != player.user_id]
                 buttons = [
                 [InlineKeyboardButton(f"🗝️ Steal from {p.first_name}", callback_data=f"thief_steal_{p.user_id}")]
@@ -682,7 +722,7 @@ def get_role_action_buttons(player: Player, game: Game, current_phase: GamePhase
         
             elif borrowed_role == Role.VIGILANTE:
             # Check if original player (not borrowed role) killed innocent
-                if not getattr(player, 'vigilante_killed_innocent', False):
+                if not player.vigilante_killed_innocent:
                     buttons = [
                         [InlineKeyboardButton(f"⚔️ Kill {p.first_name}", 
                                             callback_data=f"vigilante_kill_{p.user_id}")]
@@ -694,12 +734,12 @@ def get_role_action_buttons(player: Player, game: Game, current_phase: GamePhase
         
             elif borrowed_role == Role.WITCH:
             # Use player's own witch status, not borrowed
-                if not getattr(player, 'witch_heal_used', False):
+                if not player.witch_heal_used:
                     buttons.append([InlineKeyboardButton("🧙♀️ Heal Potion", callback_data="witch_heal_menu")])
-                if not getattr(player, 'witch_poison_used', False):
+                if not player.witch_poison_used:
                     buttons.append([InlineKeyboardButton("🧙♀️ Poison Potion", callback_data="witch_poison_menu")])
             
-                if getattr(player, 'witch_heal_used', False) and getattr(player, 'witch_poison_used', False):
+                if player.witch_heal_used and player.witch_poison_used:
                      return None  # No actions available
         
             elif borrowed_role in [Role.WEREWOLF, Role.ALPHA_WOLF]:
@@ -720,13 +760,13 @@ def get_role_action_buttons(player: Player, game: Game, current_phase: GamePhase
         
             elif borrowed_role == Role.ARSONIST:
             # Get doused players
-                doused_players = [p for p in alive_players if getattr(p, 'is_doused', False)]
+                doused_players = [p for p in alive_players if p.is_doused]
                 doused_count = len(doused_players)
             
                 buttons = [
                     [InlineKeyboardButton(f"🔥 Douse {p.first_name}", 
                                         callback_data=f"arsonist_douse_{p.user_id}")]
-                    for p in alive_players if not getattr(p, 'is_doused', False)
+                    for p in alive_players if not p.is_doused
                 ]
             
                 if doused_count >= 1:
@@ -741,7 +781,7 @@ def get_role_action_buttons(player: Player, game: Game, current_phase: GamePhase
                     buttons = [
                         [InlineKeyboardButton(f"🦠 Infect {p.first_name}", 
                                             callback_data=f"plague_doctor_infect_{p.user_id}")]
-                        for p in alive_players if not getattr(p, 'is_plagued', False)
+                        for p in alive_players if not p.is_plagued
                     ]
                     buttons.append([InlineKeyboardButton("❌ Skip Infect", callback_data="plague_doctor_skip")])
                 else:
@@ -767,7 +807,7 @@ def get_role_action_buttons(player: Player, game: Game, current_phase: GamePhase
                 return None
 
     elif current_phase == GamePhase.DAY:
-        if role == Role.DETECTIVE and not getattr(player, "detective_acted_today", False):
+        if role == Role.DETECTIVE and not player.detective_acted_today:
             buttons = [
                 [InlineKeyboardButton(f"🕵️ Investigate {p.first_name}", callback_data=f"detective_check_{p.user_id}")]
                 for p in alive_players
@@ -786,7 +826,14 @@ def get_role_action_buttons(player: Player, game: Game, current_phase: GamePhase
     return None
 
 def get_voting_buttons(game: Game, voter_id: int) -> InlineKeyboardMarkup:
-    """Generate voting buttons for day phase"""
+    """Voting buttons for day phase (memoized per epoch and roster, like get_role_action_buttons)"""
+    key = ('vote', voter_id, game.phase_epoch, game.roster_version)
+    markup = game.keyboard_cache.get(key)
+    if markup is None:
+        markup = game.keyboard_cache[key] = _build_voting_buttons(game, voter_id)
+    return markup
+
+def _build_voting_buttons(game: Game, voter_id: int) -> InlineKeyboardMarkup:
     alive_players = [p for p in game.get_alive_players() if p.user_id != voter_id]
     
     buttons = [
@@ -796,6 +843,6 @@ def get_voting_buttons(game: Game, voter_id: int) -> InlineKeyboardMarkup:
     buttons.append([InlineKeyboardButton("❌ Abstain", callback_data="vote_abstain")])
     
     logger.debug(f"Generated voting buttons for player {voter_id}: {len(buttons)} options")
-    return InlineKeyboardMarkup(buttons)
+    return stamp_keyboard(InlineKeyboardMarkup(buttons), game.phase_epoch)
 
 logger.info("Roles module loaded successfully")
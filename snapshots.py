@@ -0,0 +1,304 @@
+import logging
+import json
+import threading
+import time
+import zlib
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+from enums import GamePhase, Team, Role, ActionType
+from game import Game, Player, active_games, player_game_index
+from night_actions import NightActions
+from database import ConnectionManager
+from config import SNAPSHOT_DB_PATH, SNAPSHOT_RESUME_GRACE
+
+logger = logging.getLogger(__name__)
+
+# Enums that may appear anywhere in game or player state
+SNAPSHOT_ENUMS = {cls.__name__: cls for cls in (GamePhase, Team, Role, ActionType)}
+
+# Runtime-only Game attributes that are rebuilt by the constructor
+GAME_TRANSIENT_ATTRS = {'players', '_phase_lock', '_phase_lock_owner', '_phase_lock_depth', '_phase_transitioning',
+                        '_alive', '_alive_by_team', '_alive_by_role',
+                        'roster_version', 'keyboard_cache', 'undelivered_menus'}
+
+# Player role components are snapshotted through their flat attribute names;
+# the game back-reference is restored by Game.reindex_players()
+PLAYER_TRANSIENT_ATTRS = {'_components', '_game'}
+
+
+# ============================================================================
+# ENCODING
+# ============================================================================
+
+def _encode(value: Any) -> Any:
+    """Turn game state into JSON-safe data (enums, datetimes, sets, night actions and Player references are tagged)"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Enum) and type(value).__name__ in SNAPSHOT_ENUMS:
+        return {"$enum": [type(value).__name__, value.name]}
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, Player):
+        return {"$player": value.user_id}
+    if isinstance(value, NightActions):
+        return {"$actions": [[_encode(a.kind), a.actor, a.target, _encode(a.data)] for a in value]}
+    if isinstance(value, (set, frozenset)):
+        return {"$set": [_encode(v) for v in value]}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    if isinstance(value, dict):
+        if all(isinstance(k, str) for k in value):
+            return {k: _encode(v) for k, v in value.items()}
+        # JSON objects only have string keys; keep int/enum keys intact
+        return {"$map": [[_encode(k), _encode(v)] for k, v in value.items()]}
+    raise TypeError(f"cannot snapshot {type(value).__name__}")
+
+
+def _decode(value: Any, players: Dict[int, Player]) -> Any:
+    if isinstance(value, list):
+        return [_decode(v, players) for v in value]
+    if not isinstance(value, dict):
+        return value
+
+    if len(value) == 1:
+        tag, payload = next(iter(value.items()))
+        if tag == "$enum":
+            return SNAPSHOT_ENUMS[payload[0]][payload[1]]
+        if tag == "$dt":
+            return datetime.fromisoformat(payload)
+        if tag == "$player":
+            return players.get(payload)
+        if tag == "$set":
+            return {_hashable(_decode(v, players)) for v in payload}
+        if tag == "$map":
+            return {_hashable(_decode(k, players)): _decode(v, players) for k, v in payload}
+        if tag == "$actions":
+            actions = NightActions()
+            for kind, actor, target, data in payload:
+                actions.add(_decode(kind, players), actor, target, **_decode(data, players))
+            return actions
+    return {k: _decode(v, players) for k, v in value.items()}
+
+
+def _hashable(value: Any) -> Any:
+    return tuple(value) if isinstance(value, list) else value
+
+
+def _object_state(obj: Any, skip=()) -> Dict[str, Any]:
+    """Encode every instance attribute of obj (both __dict__ and __slots__)"""
+    names = list(getattr(obj, '__dict__', {}))
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if name not in names and name != '__dict__' and hasattr(obj, name):
+                names.append(name)
+
+    state = {}
+    for name in names:
+        if name in skip:
+            continue
+        try:
+            state[name] = _encode(getattr(obj, name))
+        except TypeError as e:
+            logger.debug(f"Not snapshotting {type(obj).__name__}.{name}: {e}")
+
+    if isinstance(obj, Player):
+        for name, value in obj.role_state_items():
+            state[name] = _encode(value)
+    return state
+
+
+def _pack(state: Dict[str, Any]) -> bytes:
+    return zlib.compress(json.dumps(state, separators=(',', ':')).encode('utf-8'))
+
+
+def _unpack(data: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+class SnapshotStore:
+    """
+    Persists running games so they survive a restart.
+
+    A game is one row for its own state plus one row per player. Only rows whose
+    packed bytes changed since the last save are written, and the write itself
+    runs on the database writer thread, so save() costs the encoding only.
+    """
+
+    def __init__(self, db_path: str = SNAPSHOT_DB_PATH):
+        self.db = ConnectionManager(db_path, read_pool_size=1)
+        # (group_id, user_id or None for the game row) -> hash of the last written bytes
+        self._written: Dict[Tuple[int, Optional[int]], int] = {}
+        self._written_lock = threading.Lock()
+        # False turns save() into a no-op (headless simulations have nothing to resume)
+        self.enabled = True
+        self.init_database()
+
+    def init_database(self):
+        with self.db.write() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS game_snapshots (
+                    group_id INTEGER PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS player_snapshots (
+                    group_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    data BLOB NOT NULL,
+                    PRIMARY KEY (group_id, user_id)
+                ) WITHOUT ROWID
+            ''')
+
+    def save(self, game: Game):
+        """Snapshot game (call at each phase transition)"""
+        if not self.enabled:
+            return
+        group_id = game.group_id
+        try:
+            game_row = _pack(_object_state(game, skip=GAME_TRANSIENT_ATTRS))
+            player_rows = [(user_id, _pack(_object_state(player, skip=PLAYER_TRANSIENT_ATTRS))) for user_id, player in game.players.items()]
+        except Exception as e:
+            logger.error(f"Failed to encode snapshot for game {group_id}: {e}")
+            return
+
+        changed_game = None
+        changed_players = []
+        with self._written_lock:
+            if self._written.get((group_id, None)) != hash(game_row):
+                changed_game = game_row
+                self._written[(group_id, None)] = hash(game_row)
+
+            for user_id, data in player_rows:
+                if self._written.get((group_id, user_id)) != hash(data):
+                    changed_players.append((group_id, user_id, data))
+                    self._written[(group_id, user_id)] = hash(data)
+
+        if changed_game is None and not changed_players:
+            return
+
+        self.db.submit_write(self._write, group_id, changed_game, changed_players)
+        logger.debug(f"Snapshot queued for game {group_id} ({len(changed_players)} players changed)")
+
+    def _write(self, group_id: int, game_row: Optional[bytes], player_rows: List[Tuple[int, int, bytes]]):
+        try:
+            with self.db.write() as conn:
+                if game_row is not None:
+                    conn.execute(
+                        'INSERT OR REPLACE INTO game_snapshots (group_id, data, updated_at) VALUES (?, ?, ?)',
+                        (group_id, game_row, time.time())
+                    )
+                conn.executemany(
+                    'INSERT OR REPLACE INTO player_snapshots (group_id, user_id, data) VALUES (?, ?, ?)',
+                    player_rows
+                )
+        except Exception:
+            # Force a full rewrite next time rather than trusting rows that never landed
+            self.forget(group_id)
+            raise
+
+    def forget(self, group_id: int):
+        with self._written_lock:
+            for key in [k for k in self._written if k[0] == group_id]:
+                del self._written[key]
+
+    def delete(self, group_id: int):
+        """Drop a finished or aborted game's snapshot"""
+        self.forget(group_id)
+        self.db.submit_write(self._delete, group_id)
+
+    def _delete(self, group_id: int):
+        with self.db.write() as conn:
+            conn.execute('DELETE FROM game_snapshots WHERE group_id = ?', (group_id,))
+            conn.execute('DELETE FROM player_snapshots WHERE group_id = ?', (group_id,))
+
+    def load_all(self) -> List[Game]:
+        """Rebuild every snapshotted game (startup)"""
+        games = []
+        with self.db.read() as conn:
+            game_rows = conn.execute('SELECT group_id, data FROM game_snapshots').fetchall()
+            player_rows = conn.execute('SELECT group_id, user_id, data FROM player_snapshots').fetchall()
+
+        players_by_game: Dict[int, List[Tuple[int, bytes]]] = {}
+        for row in player_rows:
+            players_by_game.setdefault(row['group_id'], []).append((row['user_id'], row['data']))
+
+        for row in game_rows:
+            group_id = row['group_id']
+            try:
+                games.append(self._rebuild(group_id, _unpack(row['data']), players_by_game.get(group_id, [])))
+            except Exception as e:
+                logger.error(f"Discarding unreadable snapshot for game {group_id}: {e}")
+                self._delete(group_id)
+        return games
+
+    def _rebuild(self, group_id: int, game_state: Dict[str, Any], player_rows: List[Tuple[int, bytes]]) -> Game:
+        game = Game(group_id, game_state.get('group_name', ''))
+
+        # Create every Player first so references between players and from the game resolve
+        player_states = {}
+        for user_id, data in player_rows:
+            state = _unpack(data)
+            player_states[user_id] = state
+            game.players[user_id] = Player(user_id, state.get('username', ''), state.get('first_name', ''))
+
+        for user_id, state in player_states.items():
+            player = game.players[user_id]
+            for name, value in state.items():
+                setattr(player, name, _decode(value, game.players))
+
+        for name, value in game_state.items():
+            setattr(game, name, _decode(value, game.players))
+        game.reindex_players()
+        return game
+
+
+# Global instance
+snapshot_store = SnapshotStore()
+
+
+async def restore_active_games(application) -> int:
+    """
+    Reload snapshotted games into active_games, re-arm their phase deadlines
+    and let each group know play is resuming.
+    """
+    from mechanics import schedule_phase_deadline
+
+    restored = 0
+    for game in snapshot_store.load_all():
+        if game.group_id in active_games or game.phase in (GamePhase.LOBBY, GamePhase.ENDED):
+            snapshot_store.delete(game.group_id)
+            continue
+
+        active_games[game.group_id] = game
+        for user_id in game.players:
+            player_game_index[user_id] = game.group_id
+
+        remaining = (game.phase_end_time or 0) - datetime.now().timestamp()
+        schedule_phase_deadline(application, game, max(remaining, SNAPSHOT_RESUME_GRACE))
+        restored += 1
+
+        try:
+            await application.bot.send_message(
+                chat_id=game.group_id,
+                text=f"♻️ The bot restarted, but your game survived!\n"
+                     f"Resuming {game.phase.value} of day {game.day_number} "
+                     f"({int(max(remaining, SNAPSHOT_RESUME_GRACE))}s left). "
+                     f"Buttons sent before the restart still work."
+            )
+        except Exception as e:
+            logger.error(f"Failed to announce resumed game {game.group_id}: {e}")
+
+    if restored:
+        logger.info(f"♻️ Restored {restored} games from snapshots")
+    return restored
+
+
+logger.info("Snapshots module loaded successfully")